@@ -1,39 +1,97 @@
 import os
+import tempfile
 from datetime import timedelta
-from fastapi_cache.decorator import cache
+from functools import lru_cache
+from typing import Any, Dict
+
+import httpx
 
 from app.domain.flight_graph import FlightGraph
 from app.domain.journey.journey_finder import JourneyFinder
 from app.domain.journey.validators import DefaultJourneyValidator
 from app.domain.journey.builders import DefaultJourneyPathBuilder
 from app.domain.journey.sorters import TimeAndConnectionsSorter
+from app.domain.journey.searchers import SearchMode
+from app.domain.journey.cache import JourneyCache
 from app.services.flight_events import (
     FlightEventsAPIService,
     FlightEventsConfigError,
 )
+from app.services.flight_events.resilience import (
+    CircuitBreaker,
+    HedgePolicy,
+    RetryPolicy,
+)
+from app.services.graph_provider import (
+    FlightGraphProvider,
+    SharedFlightGraphProvider,
+)
+
+from fastapi import Depends, Request
 
-from fastapi import Depends
+
+def create_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client shared by the app, closed on shutdown"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(
+                os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+            ),
+            keepalive_expiry=float(
+                os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")
+            ),
+        ),
+        timeout=httpx.Timeout(
+            float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "30")),
+            connect=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5")),
+        ),
+        http2=os.getenv("HTTP2_ENABLED", "false").lower() == "true",
+    )
 
 
-def get_flight_events_service() -> FlightEventsAPIService:
+def create_flight_events_service(
+    client: httpx.AsyncClient,
+) -> FlightEventsAPIService:
     api_url = os.getenv("FLIGHT_EVENTS_URL")
     if not api_url:
         raise FlightEventsConfigError(
             "FLIGHT_EVENTS_URL environment variable is required"
         )
-    return FlightEventsAPIService(api_url=api_url)
-
-
-@cache(expire=int(os.getenv("CACHE_TTL_SECONDS", "600")))
-async def get_flight_graph(
-    service: FlightEventsAPIService = Depends(get_flight_events_service),
-) -> FlightGraph:
-    """Get flight graph with 10 minute cache"""
-    graph = FlightGraph()
-    events = await service.get_flight_events()
-    for event in events:
-        graph.add_flight(event)
-    return graph
+    start_param, end_param = os.getenv(
+        "FLIGHT_EVENTS_WINDOW_PARAMS", "departure_from,departure_to"
+    ).split(",")
+    hedge_percentile = float(os.getenv("FLIGHT_EVENTS_HEDGE_PERCENTILE", "0"))
+    return FlightEventsAPIService(
+        api_url=api_url,
+        client=client,
+        window_days=int(os.getenv("FLIGHT_EVENTS_WINDOW_DAYS", "0")),
+        horizon_days=int(os.getenv("FLIGHT_EVENTS_HORIZON_DAYS", "30")),
+        concurrency=int(os.getenv("FLIGHT_EVENTS_FETCH_CONCURRENCY", "4")),
+        retry=RetryPolicy(
+            retries=int(os.getenv("FLIGHT_EVENTS_FETCH_RETRIES", "2")),
+            backoff=float(
+                os.getenv("FLIGHT_EVENTS_RETRY_BACKOFF_SECONDS", "0.5")
+            ),
+            max_backoff=float(
+                os.getenv("FLIGHT_EVENTS_RETRY_MAX_BACKOFF_SECONDS", "10")
+            ),
+        ),
+        hedge=(
+            HedgePolicy(percentile=hedge_percentile)
+            if hedge_percentile > 0
+            else None
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=int(
+                os.getenv("FLIGHT_EVENTS_CIRCUIT_FAILURES", "5")
+            ),
+            reset_timeout=float(
+                os.getenv("FLIGHT_EVENTS_CIRCUIT_RESET_SECONDS", "60")
+            ),
+        ),
+        window_params=(start_param.strip(), end_param.strip()),
+    )
 
 
 def get_journey_validator() -> DefaultJourneyValidator:
@@ -50,9 +108,60 @@ def get_journey_validator() -> DefaultJourneyValidator:
     )
 
 
+def create_graph_provider(client: httpx.AsyncClient) -> FlightGraphProvider:
+    """Graph provider shared by the app, started and stopped with it"""
+    validator = get_journey_validator()
+    service = create_flight_events_service(client)
+    settings: Dict[str, Any] = dict(
+        ttl=float(os.getenv("CACHE_TTL_SECONDS", "600")),
+        connection_windows=[
+            (validator.min_connection_time, validator.max_connection_time)
+        ],
+        delta=os.getenv("DELTA_GRAPH_REFRESH", "true").lower() == "true",
+        stream=os.getenv("STREAM_FLIGHT_EVENTS", "false").lower() == "true",
+        refresh_ahead=float(os.getenv("GRAPH_REFRESH_AHEAD_SECONDS", "60")),
+        retry_interval=float(os.getenv("GRAPH_REFRESH_RETRY_SECONDS", "30")),
+    )
+    snapshot_path = os.getenv("GRAPH_SNAPSHOT_PATH") or None
+    if os.getenv("SHARED_FLIGHT_GRAPH", "false").lower() == "true":
+        return SharedFlightGraphProvider(
+            service,
+            snapshot_path=snapshot_path
+            or os.path.join(tempfile.gettempdir(), "flight-graph.snapshot"),
+            poll_interval=float(os.getenv("SHARED_GRAPH_POLL_SECONDS", "1")),
+            wait_timeout=float(os.getenv("SHARED_GRAPH_WAIT_SECONDS", "30")),
+            **settings,
+        )
+    return FlightGraphProvider(
+        service, snapshot_path=snapshot_path, **settings
+    )
+
+
+def get_flight_graph_provider(request: Request) -> FlightGraphProvider:
+    provider: FlightGraphProvider = request.app.state.graph_provider
+    return provider
+
+
+async def get_flight_graph(
+    provider: FlightGraphProvider = Depends(get_flight_graph_provider),
+) -> FlightGraph:
+    """Get the flight graph, refreshed in the background"""
+    return await provider.get_graph()
+
+
+@lru_cache
+def get_journey_cache() -> JourneyCache:
+    """Search result cache shared by every request of the process"""
+    return JourneyCache(
+        max_entries=int(os.getenv("JOURNEY_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(float(os.getenv("JOURNEY_CACHE_MAX_MB", "64")) * 2**20),
+    )
+
+
 def get_journey_finder(
     graph: FlightGraph = Depends(get_flight_graph),
     validator: DefaultJourneyValidator = Depends(get_journey_validator),
+    cache: JourneyCache = Depends(get_journey_cache),
 ) -> JourneyFinder:
     return JourneyFinder(
         flight_graph=graph,
@@ -60,4 +169,9 @@ def get_journey_finder(
         path_builder=DefaultJourneyPathBuilder(),
         sorter=TimeAndConnectionsSorter(),
         max_flight_events=int(os.getenv("MAX_FLIGHT_EVENTS", "2")),
+        search_mode=SearchMode(os.getenv("JOURNEY_SEARCH_MODE", "time_aware")),
+        vectorized_validation=(
+            os.getenv("VECTORIZED_PATH_VALIDATION", "false").lower() == "true"
+        ),
+        cache=cache if cache.max_entries > 0 else None,
     )
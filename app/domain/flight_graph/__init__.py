@@ -1,2 +1,2 @@
-from .graph import FlightGraph
+from .graph import FlightChanges, FlightGraph
 from .types import FlightNode, FlightEdge
@@ -4,15 +4,21 @@ class FlightGraphError(Exception):
     pass
 
 
-class EdgeNotFoundError(FlightGraphError):
-    """Raised when trying to access a non-existent edge in the graph"""
+class FlightNotFoundError(FlightGraphError):
+    """Raised when trying to access a non-existent flight in the graph"""
 
-    def __init__(self, edge: tuple):
-        self.edge = edge
-        super().__init__(f"Edge {edge} does not exist in the graph")
+    def __init__(self, flight_id: int):
+        self.flight_id = flight_id
+        super().__init__(f"Flight {flight_id} does not exist in the graph")
 
 
 class AirportNotFoundError(FlightGraphError):
     """Raised when trying to access a non-existent airport in the graph"""
 
     pass
+
+
+class SnapshotError(FlightGraphError):
+    """Raised when a graph snapshot cannot be read"""
+
+    pass
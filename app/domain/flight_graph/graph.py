@@ -1,8 +1,36 @@
 import networkx as nx
-from typing import List, Tuple
+from itertools import repeat
+import numpy as np
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from app.services.flight_events import FlightEvent
-from .exceptions import EdgeNotFoundError, AirportNotFoundError
+from .exceptions import FlightNotFoundError, AirportNotFoundError
+from .indexes import (
+    ArrivalIndex,
+    ConnectionTimetable,
+    DepartureIndex,
+    TransferIndex,
+)
+from .snapshot import read_snapshot, write_snapshot
+from .store import FlightStore, to_epoch, to_epochs, to_offsets
+
+
+class FlightChanges(NamedTuple):
+    """Number of flights changed when applying a new feed"""
+
+    inserted: int
+    updated: int
+    removed: int
 
 
 class FlightGraph:
@@ -10,16 +38,66 @@ class FlightGraph:
     Manages the flight network using a MultiDiGraph.
     Multiple flights can exist between the same cities.
     Flights are directional (from origin to destination).
+
+    Flights get dense integer ids on insertion. Their data lives in a
+    columnar FlightStore and edges are keyed by the flight id.
     """
 
-    def __init__(self) -> None:
-        """Initialize the flight graph"""
-        self.graph: nx.MultiDiGraph = nx.MultiDiGraph()
+    def __init__(self, flights: Optional[FlightStore] = None) -> None:
+        """
+        Initialize the flight graph
 
-    def _create_edge_key(self, flight: FlightEvent) -> str:
-        """Creates a unique key for a flight edge"""
-        departure_datetime_iso = flight.departure_datetime.isoformat()
-        return f"{flight.flight_number}_{departure_datetime_iso}"
+        Args:
+            flights: Existing flights, e.g. restored from a snapshot. The
+                networkx graph and the duplicate lookup are then built on
+                first use.
+        """
+        self.flights = flights if flights is not None else FlightStore()
+        self._graph: Optional[nx.MultiDiGraph] = (
+            None if flights is not None else nx.MultiDiGraph()
+        )
+        # (flight number, departure epoch) -> flight id, to detect duplicates
+        self._flight_keys: Optional[Dict[Tuple[str, float], int]] = (
+            None if flights is not None else {}
+        )
+        self._version: Optional[int] = None
+        self._departure_index: Optional[DepartureIndex] = None
+        self._arrival_index: Optional[ArrivalIndex] = None
+        self._connection_timetable: Optional[ConnectionTimetable] = None
+        self._transfer_indexes: Dict[
+            Tuple[timedelta, timedelta], TransferIndex
+        ] = {}
+
+    @property
+    def graph(self) -> nx.MultiDiGraph:
+        """Airports as nodes and flights as edges keyed by flight id"""
+        if self._graph is None:
+            flights = self.flights
+            graph: nx.MultiDiGraph = nx.MultiDiGraph()
+            graph.add_nodes_from(flights.airports)
+            edges: List[Any] = [
+                (flights.airports[origin], flights.airports[destination], key)
+                for key, (origin, destination) in enumerate(
+                    zip(flights.origins, flights.destinations)
+                )
+            ]
+            graph.add_edges_from(edges)
+            self._graph = graph
+        return self._graph
+
+    @property
+    def read_only(self) -> bool:
+        """Whether the flights were restored from a snapshot"""
+        return self.flights.read_only
+
+    def _keys(self) -> Dict[Tuple[str, float], int]:
+        if self._flight_keys is None:
+            flights = self.flights
+            self._flight_keys = {
+                (flights.flight_number(flight_id), departure): flight_id
+                for flight_id, departure in enumerate(flights.departures)
+            }
+        return self._flight_keys
 
     def _ensure_nodes_exist(self, flight: FlightEvent) -> None:
         """Ensures both cities exist as nodes in the graph"""
@@ -28,28 +106,434 @@ class FlightGraph:
         if not self.graph.has_node(flight.arrival_city):
             self.graph.add_node(flight.arrival_city)
 
-    def add_flight(self, flight: FlightEvent) -> None:
-        """Add a flight to the graph"""
+    def add_flight(self, flight: FlightEvent) -> int:
+        """
+        Add a flight to the graph and return its id
+
+        A flight with the same number and departure as an existing one
+        replaces it and keeps its id.
+        """
         self._ensure_nodes_exist(flight)
-        edge_key = self._create_edge_key(flight)
+        departure = to_epoch(flight.departure_datetime)
+        flight_key = (flight.flight_number, departure)
+        flight_id = self._keys().get(flight_key)
 
+        if flight_id is None:
+            flight_id = self.flights.add(flight, departure)
+            self._keys()[flight_key] = flight_id
+        else:
+            self.graph.remove_edge(
+                self.flights.origin(flight_id),
+                self.flights.destination(flight_id),
+                key=flight_id,
+            )
+            self.flights.update(flight_id, flight)
         self.graph.add_edge(
-            flight.departure_city,
-            flight.arrival_city,
-            key=edge_key,
-            flight_event=flight,
+            flight.departure_city, flight.arrival_city, key=flight_id
         )
+        self._invalidate()
+        return flight_id
 
-    def get_flight_details(self, edge: Tuple[str, str, str]) -> FlightEvent:
-        """Get complete flight information for an edge"""
-        try:
-            return self.graph.edges[edge]["flight_event"]  # type: ignore
-        except KeyError:
-            raise EdgeNotFoundError(edge)
+    def add_flights(
+        self,
+        flights: Iterable[FlightEvent],
+        connection_windows: Sequence[Tuple[timedelta, timedelta]] = (),
+    ) -> int:
+        """
+        Add many flights at once and return how many were new
+
+        Flights repeating the number and departure of a flight of the
+        graph, or of an earlier one in flights, replace it: the last one
+        wins and keeps the first id. Only the columnar store is filled
+        here; the networkx graph is rebuilt from it on first use and the
+        indexes in a single pass at the end.
+
+        Args:
+            flights: Flights to add
+            connection_windows: (min, max) connection times to build
+                transfer indexes for
+        """
+        store = self.flights
+        keys = self._keys()
+        added = 0
+        for flight in flights:
+            departure = to_epoch(flight.departure_datetime)
+            flight_key = (flight.flight_number, departure)
+            flight_id = keys.get(flight_key)
+            if flight_id is None:
+                keys[flight_key] = store.add(flight, departure)
+                added += 1
+            else:
+                store.update(flight_id, flight)
+        self._graph = None
+        self._invalidate()
+        self.build_indexes(connection_windows)
+        return added
+
+    def _invalidate(self) -> None:
+        """Drop the version and indexes after the flights changed"""
+        self._version = None
+        self._departure_index = None
+        self._arrival_index = None
+        self._connection_timetable = None
+        self._transfer_indexes.clear()
+
+    def remove_flight(self, flight_id: int) -> None:
+        """
+        Remove a flight from the graph
+
+        The last flight takes the id of the removed one, so ids stay dense.
+        """
+        flights = self.flights
+        self.graph.remove_edge(
+            flights.origin(flight_id),
+            flights.destination(flight_id),
+            key=flight_id,
+        )
+        moved_id = self._remove(flight_id)
+        if moved_id is not None:
+            origin = flights.origin(flight_id)
+            destination = flights.destination(flight_id)
+            self.graph.remove_edge(origin, destination, key=moved_id)
+            self.graph.add_edge(origin, destination, key=flight_id)
+        self._invalidate()
+
+    def _remove(self, flight_id: int) -> Optional[int]:
+        """Remove a flight from the store and the duplicate lookup"""
+        flights = self.flights
+        keys = self._keys()
+        del keys[
+            (flights.flight_number(flight_id), flights.departures[flight_id])
+        ]
+        moved_id = flights.remove(flight_id)
+        if moved_id is not None:
+            keys[
+                (
+                    flights.flight_number(flight_id),
+                    flights.departures[flight_id],
+                )
+            ] = flight_id
+        return moved_id
+
+    def with_flights(
+        self,
+        flights: Iterable[FlightEvent],
+        connection_windows: Sequence[Tuple[timedelta, timedelta]] = (),
+    ) -> Tuple["FlightGraph", FlightChanges]:
+        """
+        New graph holding exactly the given flights, derived from this one
+
+        Flights are matched by number and departure against the store in
+        bulk: new ones are added, changed ones updated and missing ones
+        removed, the last repeated flight winning. This graph is never
+        modified, so it can still be searched meanwhile, and is returned
+        as is if nothing changed. Otherwise the new graph gets a copy of
+        the store, indexes rebuilt only for the airports of the changed
+        flights, and its networkx graph on first use.
+
+        Args:
+            flights: Flights of the new graph
+            connection_windows: (min, max) connection times to build
+                transfer indexes for, besides those of this graph
+        """
+        events = list(flights)
+        flight_numbers = [flight.flight_number for flight in events]
+        departures = to_epochs(flight.departure_datetime for flight in events)
+        keys = self._keys()
+        matched = np.fromiter(
+            map(keys.get, zip(flight_numbers, departures), repeat(-1)),
+            np.int64,
+            len(events),
+        )
+        # Position in flights of the last flight of every key
+        known = np.flatnonzero(matched >= 0)[::-1]
+        flight_ids, last = np.unique(matched[known], return_index=True)
+        positions = known[last]
+        inserted = list(
+            {
+                (flight_numbers[position], departures[position]): position
+                for position in np.flatnonzero(matched < 0).tolist()
+            }.values()
+        )
+
+        store = self.flights
+        feed = {
+            "origins": store.airport_ids(
+                flight.departure_city for flight in events
+            ),
+            "destinations": store.airport_ids(
+                flight.arrival_city for flight in events
+            ),
+            "arrivals": to_epochs(
+                flight.arrival_datetime for flight in events
+            ),
+            "departure_offsets": to_offsets(
+                flight.departure_datetime for flight in events
+            ),
+            "arrival_offsets": to_offsets(
+                flight.arrival_datetime for flight in events
+            ),
+        }
+        # Number and departure already match, as they make the key
+        changed = np.zeros(len(flight_ids), bool)
+        for name, values in feed.items():
+            changed |= (
+                np.asarray(getattr(store, name))[flight_ids]
+                != np.asarray(values)[positions]
+            )
+        removed = np.ones(len(store), bool)
+        removed[flight_ids] = False
+        changes = FlightChanges(
+            len(inserted), int(changed.sum()), int(removed.sum())
+        )
+        if not any(changes):
+            return self, changes
+
+        graph = FlightGraph(store.copy())
+        graph._flight_keys = dict(keys)
+        for flight_id, position in zip(
+            flight_ids[changed].tolist(), positions[changed].tolist()
+        ):
+            graph.flights.update(flight_id, events[position])
+        # Highest ids first, so moved flights are never pending removal
+        for flight_id in np.flatnonzero(removed)[::-1].tolist():
+            graph._remove(flight_id)
+        for position in inserted:
+            graph._flight_keys[
+                (flight_numbers[position], departures[position])
+            ] = graph.flights.add(events[position], departures[position])
+        graph._update_indexes(self, connection_windows)
+        return graph, changes
+
+    def _update_indexes(
+        self,
+        previous: "FlightGraph",
+        connection_windows: Sequence[Tuple[timedelta, timedelta]],
+    ) -> None:
+        """
+        Build the indexes from those of a previous version of the graph,
+        as far as it has them
+        """
+        changed = self.flights.changed_ids(previous.flights)
+        departure_index = previous._departure_index
+        arrival_index = previous._arrival_index
+        timetable = previous._connection_timetable
+        self._departure_index = (
+            DepartureIndex(self.flights)
+            if departure_index is None
+            else departure_index.updated(self.flights, changed)
+        )
+        self._arrival_index = (
+            ArrivalIndex(self.flights)
+            if arrival_index is None
+            else arrival_index.updated(self.flights, changed)
+        )
+        self._connection_timetable = (
+            ConnectionTimetable(self.flights)
+            if timetable is None
+            else timetable.updated(self.flights, changed)
+        )
+        # Transfer indexes only exist along the departure index
+        for window, index in list(previous._transfer_indexes.items()):
+            self._transfer_indexes[window] = index.updated(
+                self._departure_index, changed
+            )
+        for min_connection_time, max_connection_time in connection_windows:
+            self.transfer_index(min_connection_time, max_connection_time)
+
+    @property
+    def version(self) -> int:
+        """
+        Version of the flight data, derived from its content
+
+        Graphs built from the same flights share a version, and any change
+        to the flights produces a new one.
+        """
+        if self._version is None:
+            self._version = self.flights.fingerprint()
+        return self._version
+
+    def find_flight_id(
+        self, flight_number: str, departure_datetime: datetime
+    ) -> Optional[int]:
+        """Get the id of a flight by number and departure, None if unknown"""
+        return self._keys().get((flight_number, to_epoch(departure_datetime)))
+
+    def build_indexes(
+        self, connection_windows: Sequence[Tuple[timedelta, timedelta]] = ()
+    ) -> None:
+        """
+        Build the lookup indexes once the graph is fully loaded
+
+        Args:
+            connection_windows: (min, max) connection times to precompute
+                transfer indexes for
+        """
+        self._departure_index = DepartureIndex(self.flights)
+        self._arrival_index = ArrivalIndex(self.flights)
+        self._connection_timetable = ConnectionTimetable(self.flights)
+        self._transfer_indexes.clear()
+        for min_connection_time, max_connection_time in connection_windows:
+            self.transfer_index(min_connection_time, max_connection_time)
+
+    @property
+    def departure_index(self) -> DepartureIndex:
+        """Per-airport departure index, built on first use"""
+        if self._departure_index is None:
+            self._departure_index = DepartureIndex(self.flights)
+        return self._departure_index
+
+    @property
+    def arrival_index(self) -> ArrivalIndex:
+        """Per-airport arrival index, built on first use"""
+        if self._arrival_index is None:
+            self._arrival_index = ArrivalIndex(self.flights)
+        return self._arrival_index
+
+    @property
+    def connection_timetable(self) -> ConnectionTimetable:
+        """Time-sorted array of all flights, built on first use"""
+        if self._connection_timetable is None:
+            self._connection_timetable = ConnectionTimetable(self.flights)
+        return self._connection_timetable
+
+    def transfer_index(
+        self, min_connection_time: timedelta, max_connection_time: timedelta
+    ) -> TransferIndex:
+        """Transfer index for a connection window, built on first use"""
+        window = (min_connection_time, max_connection_time)
+        index = self._transfer_indexes.get(window)
+        if index is None:
+            index = TransferIndex(
+                self.departure_index,
+                min_connection_time,
+                max_connection_time,
+            )
+            self._transfer_indexes[window] = index
+        return index
+
+    def save_snapshot(
+        self, path: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Write the flights and their indexes to a binary snapshot
+
+        Args:
+            path: Snapshot file, replaced atomically
+            metadata: JSON data stored along, returned by load_snapshot
+        """
+        columns: Dict[str, Any] = {
+            f"flights.{name}": column
+            for name, column in self.flights.columns().items()
+        }
+        indexes: List[Tuple[str, Any]] = [
+            ("departures", self.departure_index),
+            ("arrivals", self.arrival_index),
+            ("timetable", self.connection_timetable),
+        ]
+        windows = []
+        for position, (window, index) in enumerate(
+            self._transfer_indexes.items()
+        ):
+            windows.append([limit.total_seconds() for limit in window])
+            indexes.append((f"transfers.{position}", index))
+        for prefix, index in indexes:
+            for name, column in index.to_columns().items():
+                columns[f"{prefix}.{name}"] = column
+
+        write_snapshot(
+            path,
+            columns,
+            {
+                "airports": self.flights.airports,
+                "flight_numbers": self.flights.flight_numbers,
+                "version": self.version,
+                "transfer_windows": windows,
+                "metadata": metadata or {},
+            },
+        )
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> Tuple["FlightGraph", Dict[str, Any]]:
+        """
+        Load a graph saved with save_snapshot, and its metadata
+
+        The file is memory-mapped and its columns and indexes are used in
+        place, without being copied or rebuilt. Loading is still O(N): the
+        whole file is checksummed, and airports and flight numbers are
+        interned again. The loaded graph is read-only.
+
+        Raises:
+            SnapshotError: If the file is not a valid snapshot
+        """
+        info, columns = read_snapshot(path)
+
+        def section(prefix: str) -> Dict[str, memoryview]:
+            start = len(prefix) + 1
+            return {
+                name[start:]: column
+                for name, column in columns.items()
+                if name.startswith(f"{prefix}.")
+            }
+
+        graph = cls(
+            FlightStore.from_columns(
+                info["airports"], info["flight_numbers"], section("flights")
+            )
+        )
+        graph._version = info["version"]
+        graph._departure_index = DepartureIndex.from_columns(
+            graph.flights, section("departures")
+        )
+        graph._arrival_index = ArrivalIndex.from_columns(
+            graph.flights, section("arrivals")
+        )
+        graph._connection_timetable = ConnectionTimetable.from_columns(
+            section("timetable")
+        )
+        for position, (low, high) in enumerate(info["transfer_windows"]):
+            window = (timedelta(seconds=low), timedelta(seconds=high))
+            graph._transfer_indexes[window] = TransferIndex.from_columns(
+                graph._departure_index,
+                *window,
+                section(f"transfers.{position}"),
+            )
+        return graph, info["metadata"]
+
+    def get_flight_details(self, flight_id: int) -> FlightEvent:
+        """Get complete flight information for a flight id"""
+        if not 0 <= flight_id < len(self.flights):
+            raise FlightNotFoundError(flight_id)
+        return self.flights.get(flight_id)
+
+    def check_airports(self, origin: str, destination: str) -> None:
+        """
+        Check that both airports exist in the graph
+
+        An airport exists while a flight leaves or arrives at it. Airports
+        stay interned after their last flight is removed, so the indexes
+        are checked rather than the store.
+
+        Raises:
+            AirportNotFoundError: If origin or destination city doesn't exist
+        """
+        if not self._has_airport(origin):
+            raise AirportNotFoundError(f"Origin city '{origin}' not found")
+        if not self._has_airport(destination):
+            raise AirportNotFoundError(
+                f"Destination city '{destination}' not found"
+            )
+
+    def _has_airport(self, code: str) -> bool:
+        airport_id = self.flights.airport_id(code)
+        return airport_id is not None and (
+            self.departure_index.has_flights(airport_id)
+            or self.arrival_index.has_flights(airport_id)
+        )
 
     def find_paths(
         self, origin: str, destination: str, max_flights: int
-    ) -> List[List[Tuple[str, str, str]]]:
+    ) -> List[List[int]]:
         """
         Find all possible paths between origin and destination
 
@@ -59,24 +543,17 @@ class FlightGraph:
             max_flights: Maximum number of flights in path
 
         Returns:
-            List of paths, where each path is a list of edges
-            Each edge is a tuple of (from_city, to_city, edge_key)
+            List of paths, where each path is a list of flight ids
 
         Raises:
             AirportNotFoundError: If origin or destination city doesn't exist
         """
-        if not self.graph.has_node(origin):
-            raise AirportNotFoundError(f"Origin city '{origin}' not found")
-        if not self.graph.has_node(destination):
-            raise AirportNotFoundError(
-                f"Destination city '{destination}' not found"
-            )
+        self.check_airports(origin, destination)
 
-        return list(
-            nx.all_simple_edge_paths(  # type: ignore[arg-type]
-                self.graph,
-                origin,  # type: ignore[arg-type]
-                destination,  # type: ignore[arg-type]
-                cutoff=max_flights,
+        edge_paths: List[Any] = list(
+            nx.all_simple_edge_paths(
+                self.graph, origin, destination, cutoff=max_flights
             )
         )
+        # Edges of a MultiDiGraph are (from_city, to_city, flight_id)
+        return [[edge[2] for edge in path] for path in edge_paths]
@@ -0,0 +1,563 @@
+import numpy as np
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Mapping, Sequence, Tuple, cast
+
+from .store import (
+    EPOCH_ORDINAL,
+    NAIVE_OFFSET,
+    SECONDS_PER_DAY,
+    FlightStore,
+    to_epoch,
+)
+
+# Widest UTC offset in use, local dates can start up to this far from UTC
+MAX_UTC_OFFSET = timedelta(hours=14)
+
+
+def day_bounds(day: date) -> Tuple[float, float]:
+    """
+    Epoch range that contains every instant of a local date, whatever
+    the UTC offset of the flight is
+    """
+    start = to_epoch(datetime.combine(day, time.min) - MAX_UTC_OFFSET)
+    end = start + SECONDS_PER_DAY + 2 * MAX_UTC_OFFSET.total_seconds()
+    return start, end
+
+
+def _to_array(code: str, values: np.ndarray) -> array:
+    """Copy NumPy values into a typed array"""
+    return array(code, np.ascontiguousarray(values, np.dtype(code)).tobytes())
+
+
+def _sort_by_airport(
+    airports: np.ndarray, times: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flight ids sorted by airport and then time, keeping the id order of
+    simultaneous flights, with the airports found and the bounds of their
+    flights in the sorted ids
+    """
+    order = np.lexsort((times, airports))
+    found, starts = np.unique(airports[order], return_index=True)
+    return order, found, np.append(starts, len(order))
+
+
+def _split(
+    code: str, values: np.ndarray, airports: np.ndarray, bounds: np.ndarray
+) -> Dict[int, array]:
+    """Typed array of every airport from values sorted by airport"""
+    return {
+        int(airport_id): _to_array(code, values[bounds[i] : bounds[i + 1]])
+        for i, airport_id in enumerate(airports)
+    }
+
+
+def _changed_airports(
+    previous: Sequence[int], current: Sequence[int], changed: np.ndarray
+) -> np.ndarray:
+    """Airports of the changed flights in either version of a column"""
+    previous_ids = np.asarray(previous)
+    current_ids = np.asarray(current)
+    return np.union1d(
+        previous_ids[changed[changed < len(previous_ids)]],
+        current_ids[changed[changed < len(current_ids)]],
+    )
+
+
+def _without(
+    groups: Dict[int, array], airports: np.ndarray
+) -> Dict[int, array]:
+    """Per-airport arrays, except those of the given airports"""
+    excluded = set(airports.tolist())
+    return {
+        airport_id: values
+        for airport_id, values in groups.items()
+        if airport_id not in excluded
+    }
+
+
+def _resized(values: Sequence[int], size: int) -> np.ndarray:
+    """Copy of per-flight values, truncated or padded with zeros"""
+    resized = np.zeros(size, np.uint32)
+    common = min(size, len(values))
+    resized[:common] = np.asarray(values)[:common]
+    return resized
+
+
+def _flatten(groups: Dict[int, array], code: str) -> Tuple[array, ...]:
+    """Concatenate per-airport arrays into (airports, bounds, values)"""
+    airports = array("I", sorted(groups))
+    bounds = array("Q", [0])
+    values = array(code)
+    for airport_id in airports:
+        values.extend(groups[airport_id])
+        bounds.append(len(values))
+    return airports, bounds, values
+
+
+def _unflatten(
+    airports: memoryview, bounds: memoryview, values: memoryview
+) -> Dict[int, array]:
+    """Per-airport slices of flattened values, without copying them"""
+    return {
+        airport_id: cast(array, values[bounds[i] : bounds[i + 1]])
+        for i, airport_id in enumerate(airports)
+    }
+
+
+class DepartureIndex:
+    """
+    Outgoing flights of every airport sorted by departure time.
+
+    Flight ids and departure times (epoch seconds) are stored in typed
+    arrays, so a time-bounded lookup is a binary search plus a slice
+    instead of a scan of every outgoing edge of the airport.
+    """
+
+    def __init__(self, store: FlightStore) -> None:
+        """Build the index from the flights of a store"""
+        self.store = store
+        self._flight_ids: Dict[int, array] = {}
+        self._departures: Dict[int, array] = {}
+        self._days: Dict[int, array] = {}
+        positions = np.zeros(len(store), np.uint32)
+        self._index(np.arange(len(store)), positions)
+        self._positions: "array[int]" = _to_array("I", positions)
+
+    def _index(self, flight_ids: np.ndarray, positions: np.ndarray) -> None:
+        """
+        Index the given flights, which must be all the flights leaving
+        their airports, and fill in their positions
+        """
+        store = self.store
+        departures = np.asarray(store.departures)[flight_ids]
+        order, airports, bounds = _sort_by_airport(
+            np.asarray(store.origins)[flight_ids], departures
+        )
+        offsets = np.asarray(store.departure_offsets, np.int64)[flight_ids]
+        offsets[offsets == NAIVE_OFFSET] = 0
+        days = EPOCH_ORDINAL + (departures + offsets) // SECONDS_PER_DAY
+        sorted_ids = flight_ids[order]
+        positions[sorted_ids] = np.arange(len(order)) - np.repeat(
+            bounds[:-1], np.diff(bounds)
+        )
+
+        self._flight_ids.update(_split("I", sorted_ids, airports, bounds))
+        self._departures.update(
+            _split("d", departures[order], airports, bounds)
+        )
+        self._days.update(_split("l", days[order], airports, bounds))
+
+    def updated(
+        self, store: FlightStore, changed: np.ndarray
+    ) -> "DepartureIndex":
+        """
+        Index of a new version of the store, given the ids that changed
+
+        Only the airports the changed flights leave from, before or after
+        the change, are indexed again; the others are shared.
+        """
+        airports = _changed_airports(
+            self.store.origins, store.origins, changed
+        )
+        index = DepartureIndex.__new__(DepartureIndex)
+        index.store = store
+        index._flight_ids = _without(self._flight_ids, airports)
+        index._departures = _without(self._departures, airports)
+        index._days = _without(self._days, airports)
+        positions = _resized(self._positions, len(store))
+        index._index(
+            np.flatnonzero(np.isin(np.asarray(store.origins), airports)),
+            positions,
+        )
+        index._positions = _to_array("I", positions)
+        return index
+
+    def to_columns(self) -> Dict[str, array]:
+        """Flat arrays holding the index, as stored in snapshots"""
+        airports, bounds, flight_ids = _flatten(self._flight_ids, "I")
+        departures = _flatten(self._departures, "d")[2]
+        days = _flatten(self._days, "l")[2]
+        return {
+            "airports": airports,
+            "bounds": bounds,
+            "flight_ids": flight_ids,
+            "departures": departures,
+            "days": days,
+            "positions": self._positions,
+        }
+
+    @classmethod
+    def from_columns(
+        cls, store: FlightStore, columns: Mapping[str, memoryview]
+    ) -> "DepartureIndex":
+        """Restore an index from the arrays of to_columns"""
+        index = cls.__new__(cls)
+        index.store = store
+        airports, bounds = columns["airports"], columns["bounds"]
+        index._flight_ids = _unflatten(airports, bounds, columns["flight_ids"])
+        index._departures = _unflatten(airports, bounds, columns["departures"])
+        index._days = _unflatten(airports, bounds, columns["days"])
+        index._positions = cast(array, columns["positions"])
+        return index
+
+    def position(self, flight_id: int) -> int:
+        """Position of a flight among the departures of its airport"""
+        return self._positions[flight_id]
+
+    def has_flights(self, airport_id: int) -> bool:
+        """Whether any flight leaves an airport"""
+        return airport_id in self._flight_ids
+
+    def airport_departures(self, airport_id: int) -> Tuple[array, array]:
+        """Sorted flight ids and departure epochs of an airport"""
+        return (
+            self._flight_ids.get(airport_id, array("I")),
+            self._departures.get(airport_id, array("d")),
+        )
+
+    def departures(self, airport: str) -> array:
+        """Ids of all flights leaving an airport, sorted by departure"""
+        airport_id = self.store.airport_id(airport)
+        if airport_id is None:
+            return array("I")
+        return self.airport_departures(airport_id)[0]
+
+    def departures_between(
+        self, airport: str, start: datetime, end: datetime
+    ) -> array:
+        """Ids of flights leaving an airport between start and end"""
+        airport_id = self.store.airport_id(airport)
+        if airport_id is None or airport_id not in self._departures:
+            return array("I")
+        departures = self._departures[airport_id]
+        low = bisect_left(departures, to_epoch(start))
+        high = bisect_right(departures, to_epoch(end))
+        return self._flight_ids[airport_id][low:high]
+
+    def departures_on(self, airport: str, day: date) -> List[int]:
+        """Ids of flights leaving an airport on a given (local) date"""
+        airport_id = self.store.airport_id(airport)
+        if airport_id is None or airport_id not in self._departures:
+            return []
+        # Departure dates are local to each flight, so the search window is
+        # widened by the largest UTC offset and then filtered by date.
+        start, end = day_bounds(day)
+        departures = self._departures[airport_id]
+        low = bisect_left(departures, start)
+        high = bisect_left(departures, end)
+
+        days = self._days[airport_id]
+        flight_ids = self._flight_ids[airport_id]
+        ordinal = day.toordinal()
+        return [flight_ids[i] for i in range(low, high) if days[i] == ordinal]
+
+    def departures_by_day(
+        self, airport: str, first_day: date, last_day: date
+    ) -> Dict[date, List[int]]:
+        """
+        Ids of flights leaving an airport on each (local) date of a range,
+        found with a single scan of the index
+        """
+        days: Dict[date, List[int]] = {
+            first_day + timedelta(days=offset): []
+            for offset in range((last_day - first_day).days + 1)
+        }
+        airport_id = self.store.airport_id(airport)
+        if airport_id is None or airport_id not in self._departures:
+            return days
+        departures = self._departures[airport_id]
+        low = bisect_left(departures, day_bounds(first_day)[0])
+        high = bisect_left(departures, day_bounds(last_day)[1])
+
+        ordinals = self._days[airport_id]
+        flight_ids = self._flight_ids[airport_id]
+        by_ordinal = {
+            day.toordinal(): flights for day, flights in days.items()
+        }
+        for i in range(low, high):
+            flights = by_ordinal.get(ordinals[i])
+            if flights is not None:
+                flights.append(flight_ids[i])
+        return days
+
+
+class ArrivalIndex:
+    """
+    Incoming flights of every airport sorted by arrival time, the mirror
+    of DepartureIndex used to expand journeys backwards.
+    """
+
+    def __init__(self, store: FlightStore) -> None:
+        """Build the index from the flights of a store"""
+        self.store = store
+        self._flight_ids: Dict[int, array] = {}
+        self._arrivals: Dict[int, array] = {}
+        self._index(np.arange(len(store)))
+
+    def _index(self, flight_ids: np.ndarray) -> None:
+        """
+        Index the given flights, which must be all the flights arriving at
+        their airports
+        """
+        arrivals = np.asarray(self.store.arrivals)[flight_ids]
+        order, airports, bounds = _sort_by_airport(
+            np.asarray(self.store.destinations)[flight_ids], arrivals
+        )
+        self._flight_ids.update(
+            _split("I", flight_ids[order], airports, bounds)
+        )
+        self._arrivals.update(_split("d", arrivals[order], airports, bounds))
+
+    def updated(
+        self, store: FlightStore, changed: np.ndarray
+    ) -> "ArrivalIndex":
+        """
+        Index of a new version of the store, given the ids that changed,
+        indexing again only the airports the changed flights arrive at
+        """
+        airports = _changed_airports(
+            self.store.destinations, store.destinations, changed
+        )
+        index = ArrivalIndex.__new__(ArrivalIndex)
+        index.store = store
+        index._flight_ids = _without(self._flight_ids, airports)
+        index._arrivals = _without(self._arrivals, airports)
+        index._index(
+            np.flatnonzero(np.isin(np.asarray(store.destinations), airports))
+        )
+        return index
+
+    def to_columns(self) -> Dict[str, array]:
+        """Flat arrays holding the index, as stored in snapshots"""
+        airports, bounds, flight_ids = _flatten(self._flight_ids, "I")
+        return {
+            "airports": airports,
+            "bounds": bounds,
+            "flight_ids": flight_ids,
+            "arrivals": _flatten(self._arrivals, "d")[2],
+        }
+
+    @classmethod
+    def from_columns(
+        cls, store: FlightStore, columns: Mapping[str, memoryview]
+    ) -> "ArrivalIndex":
+        """Restore an index from the arrays of to_columns"""
+        index = cls.__new__(cls)
+        index.store = store
+        airports, bounds = columns["airports"], columns["bounds"]
+        index._flight_ids = _unflatten(airports, bounds, columns["flight_ids"])
+        index._arrivals = _unflatten(airports, bounds, columns["arrivals"])
+        return index
+
+    def has_flights(self, airport_id: int) -> bool:
+        """Whether any flight arrives at an airport"""
+        return airport_id in self._flight_ids
+
+    def arrivals_between(
+        self, airport_id: int, start: float, end: float
+    ) -> array:
+        """Ids of flights arriving at an airport between two epochs"""
+        if airport_id not in self._arrivals:
+            return array("I")
+        arrivals = self._arrivals[airport_id]
+        low = bisect_left(arrivals, start)
+        high = bisect_right(arrivals, end)
+        return self._flight_ids[airport_id][low:high]
+
+
+class TransferIndex:
+    """
+    Feasible connections of every arriving flight.
+
+    For each flight, stores the range of departures of its arrival airport
+    (positions in the DepartureIndex) that leave inside the connection
+    window. Ranges are computed with a two-pointer sweep over the sorted
+    arrivals and departures of each airport.
+    """
+
+    def __init__(
+        self,
+        departure_index: DepartureIndex,
+        min_connection_time: timedelta,
+        max_connection_time: timedelta,
+    ) -> None:
+        """Build the index for a [min, max] connection time window"""
+        self.departure_index = departure_index
+        self.min_connection_time = min_connection_time
+        self.max_connection_time = max_connection_time
+
+        lows = np.zeros(len(departure_index.store), np.uint32)
+        highs = np.zeros(len(departure_index.store), np.uint32)
+        self._index(np.arange(len(lows)), lows, highs)
+        self._lows: "array[int]" = _to_array("I", lows)
+        self._highs: "array[int]" = _to_array("I", highs)
+
+    def _index(
+        self, flight_ids: np.ndarray, lows: np.ndarray, highs: np.ndarray
+    ) -> None:
+        """Fill in the departure ranges of the given flights"""
+        store = self.departure_index.store
+        arrivals = np.asarray(store.arrivals)[flight_ids]
+        order, airports, bounds = _sort_by_airport(
+            np.asarray(store.destinations)[flight_ids], arrivals
+        )
+        min_seconds = self.min_connection_time.total_seconds()
+        max_seconds = self.max_connection_time.total_seconds()
+        for i, airport_id in enumerate(airports):
+            group = order[bounds[i] : bounds[i + 1]]
+            departures = np.asarray(
+                self.departure_index.airport_departures(int(airport_id))[1]
+            )
+            low = np.searchsorted(
+                departures, arrivals[group] + min_seconds, "left"
+            )
+            high = np.searchsorted(
+                departures, arrivals[group] + max_seconds, "right"
+            )
+            lows[flight_ids[group]] = low
+            highs[flight_ids[group]] = np.maximum(high, low)
+
+    def updated(
+        self, departure_index: DepartureIndex, changed: np.ndarray
+    ) -> "TransferIndex":
+        """
+        Index over the departure index of a new version of the store,
+        given the ids that changed
+
+        Only the changed flights and those arriving where departures
+        changed get their ranges computed again.
+        """
+        store = departure_index.store
+        airports = _changed_airports(
+            self.departure_index.store.origins, store.origins, changed
+        )
+        index = TransferIndex.__new__(TransferIndex)
+        index.departure_index = departure_index
+        index.min_connection_time = self.min_connection_time
+        index.max_connection_time = self.max_connection_time
+        lows = _resized(self._lows, len(store))
+        highs = _resized(self._highs, len(store))
+        stale = np.isin(np.asarray(store.destinations), airports)
+        stale[changed[changed < len(store)]] = True
+        index._index(np.flatnonzero(stale), lows, highs)
+        index._lows = _to_array("I", lows)
+        index._highs = _to_array("I", highs)
+        return index
+
+    def to_columns(self) -> Dict[str, array]:
+        """Arrays holding the index, as stored in snapshots"""
+        return {"lows": self._lows, "highs": self._highs}
+
+    @classmethod
+    def from_columns(
+        cls,
+        departure_index: DepartureIndex,
+        min_connection_time: timedelta,
+        max_connection_time: timedelta,
+        columns: Mapping[str, memoryview],
+    ) -> "TransferIndex":
+        """Restore an index from the arrays of to_columns"""
+        index = cls.__new__(cls)
+        index.departure_index = departure_index
+        index.min_connection_time = min_connection_time
+        index.max_connection_time = max_connection_time
+        index._lows = cast(array, columns["lows"])
+        index._highs = cast(array, columns["highs"])
+        return index
+
+    def transfers(self, flight_id: int) -> array:
+        """Ids of connecting flights inside the window, sorted by departure"""
+        flight_ids, _ = self.departure_index.airport_departures(
+            self.departure_index.store.destinations[flight_id]
+        )
+        return flight_ids[self._lows[flight_id] : self._highs[flight_id]]
+
+    def is_transfer(self, flight_id: int, next_flight_id: int) -> bool:
+        """Check if next_flight_id is a valid connection after flight_id"""
+        store = self.departure_index.store
+        if store.destinations[flight_id] != store.origins[next_flight_id]:
+            return False
+        position = self.departure_index.position(next_flight_id)
+        return self._lows[flight_id] <= position < self._highs[flight_id]
+
+
+class ConnectionTimetable:
+    """
+    Every flight of the graph in a single array sorted by departure time,
+    as used by the Connection Scan Algorithm.
+    """
+
+    def __init__(self, store: FlightStore) -> None:
+        """Build the timetable from the flights of a store"""
+        departures = np.asarray(store.departures)
+        order = np.argsort(departures, kind="stable")
+        self.flight_ids = _to_array("I", order)
+        self.departures = _to_array("d", departures[order])
+
+    def updated(
+        self, store: FlightStore, changed: np.ndarray
+    ) -> "ConnectionTimetable":
+        """
+        Timetable of a new version of the store, given the ids that
+        changed, merging their new departures into the unchanged ones
+        """
+        flight_ids = np.asarray(self.flight_ids)
+        stale = np.zeros(max(len(flight_ids), len(store)), bool)
+        stale[changed] = True
+        kept = ~stale[flight_ids]
+        flight_ids = flight_ids[kept]
+        departures = np.asarray(self.departures)[kept]
+
+        new_ids = changed[changed < len(store)]
+        new_departures = np.asarray(store.departures)[new_ids]
+        order = np.argsort(new_departures, kind="stable")
+        new_ids = new_ids[order]
+        new_departures = new_departures[order]
+        # Simultaneous flights stay in id order, as in a full build
+        positions = np.searchsorted(departures, new_departures, "left")
+        ties = np.searchsorted(departures, new_departures, "right")
+        for i in np.flatnonzero(ties > positions).tolist():
+            positions[i] += np.searchsorted(
+                flight_ids[positions[i] : ties[i]], new_ids[i]
+            )
+        timetable = ConnectionTimetable.__new__(ConnectionTimetable)
+        timetable.flight_ids = _to_array(
+            "I", np.insert(flight_ids, positions, new_ids)
+        )
+        timetable.departures = _to_array(
+            "d", np.insert(departures, positions, new_departures)
+        )
+        return timetable
+
+    def __len__(self) -> int:
+        return len(self.flight_ids)
+
+    def to_columns(self) -> Dict[str, array]:
+        """Arrays holding the timetable, as stored in snapshots"""
+        return {"flight_ids": self.flight_ids, "departures": self.departures}
+
+    @classmethod
+    def from_columns(
+        cls, columns: Mapping[str, memoryview]
+    ) -> "ConnectionTimetable":
+        """Restore a timetable from the arrays of to_columns"""
+        timetable = cls.__new__(cls)
+        timetable.flight_ids = cast(array, columns["flight_ids"])
+        timetable.departures = cast(array, columns["departures"])
+        return timetable
+
+    def day_range(self, day: date) -> Tuple[int, int]:
+        """
+        Range of positions that may depart on a given (local) date
+
+        The range is widened by the largest UTC offset, so it has to be
+        filtered by the flight's own departure date.
+        """
+        start, end = day_bounds(day)
+        return (
+            bisect_left(self.departures, start),
+            bisect_left(self.departures, end),
+        )
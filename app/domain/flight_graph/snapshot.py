@@ -0,0 +1,137 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from typing import Any, Dict, Mapping, NamedTuple, Union
+
+from .exceptions import SnapshotError
+
+SNAPSHOT_MAGIC = b"FLTGRAPH"
+SNAPSHOT_VERSION = 1
+
+# Magic, format version, CRC32 of everything after the header and length
+# of the JSON table of contents that follows it
+_HEADER = struct.Struct("<8sIIQ")
+# Columns start at multiples of 8 bytes, so they can be used in place
+_ALIGNMENT = 8
+
+
+class Snapshot(NamedTuple):
+    """Contents of a snapshot file"""
+
+    metadata: Dict[str, Any]
+    columns: Dict[str, memoryview]
+
+
+def _typecode(column: Union[array, memoryview]) -> str:
+    if isinstance(column, array):
+        return column.typecode
+    return str(column.format)
+
+
+def _padding(position: int) -> bytes:
+    return bytes(-position % _ALIGNMENT)
+
+
+def write_snapshot(
+    path: str,
+    columns: Mapping[str, Union[array, memoryview]],
+    metadata: Dict[str, Any],
+) -> None:
+    """
+    Write typed columns and JSON metadata to a snapshot file
+
+    The file is written next to its destination and then renamed, so
+    readers never see a partial snapshot.
+    """
+    table: Dict[str, Any] = {}
+    offset = 0
+    for name, column in columns.items():
+        table[name] = [_typecode(column), offset, len(column)]
+        offset += len(column) * column.itemsize
+        offset += len(_padding(offset))
+    toc = json.dumps(
+        {"byteorder": sys.byteorder, "metadata": metadata, "columns": table}
+    ).encode()
+    # Padded with spaces, which are still valid JSON
+    toc += b" " * len(_padding(_HEADER.size + len(toc)))
+    data_start = _HEADER.size + len(toc)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        try:
+            file.seek(_HEADER.size)
+            file.write(toc)
+            checksum = zlib.crc32(toc)
+            for name, column in columns.items():
+                data = memoryview(column).cast("B")
+                file.seek(data_start + table[name][1])
+                file.write(data)
+                checksum = zlib.crc32(data, checksum)
+                padding = _padding(len(data))
+                file.write(padding)
+                checksum = zlib.crc32(padding, checksum)
+            file.seek(0)
+            file.write(
+                _HEADER.pack(
+                    SNAPSHOT_MAGIC, SNAPSHOT_VERSION, checksum, len(toc)
+                )
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """
+    Memory-map a snapshot file
+
+    Columns are read-only memoryviews over the mapped file, so nothing is
+    copied. The checksum is still verified over the whole file, which
+    reads every page once: opening a snapshot is O(file size).
+
+    Raises:
+        SnapshotError: If the file is not a valid snapshot of this format
+            version, or is corrupted
+    """
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < _HEADER.size:
+                raise SnapshotError(f"Snapshot {path} is truncated")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        raise SnapshotError(f"Cannot read snapshot {path}: {e}") from e
+
+    view = memoryview(mapped)
+    magic, version, checksum, toc_length = _HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError(f"{path} is not a flight graph snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+    if zlib.crc32(view[_HEADER.size :]) != checksum:
+        raise SnapshotError(f"Snapshot {path} is corrupted")
+
+    data_start = _HEADER.size + toc_length
+    try:
+        toc = json.loads(bytes(view[_HEADER.size : data_start]))
+    except ValueError as e:
+        raise SnapshotError(f"Snapshot {path} is corrupted") from e
+    if toc["byteorder"] != sys.byteorder:
+        raise SnapshotError(f"Snapshot {path} has another byte order")
+
+    columns: Dict[str, memoryview] = {}
+    for name, (code, offset, length) in toc["columns"].items():
+        start = data_start + offset
+        end = start + length * array(code).itemsize
+        if end > size:
+            raise SnapshotError(f"Snapshot {path} is truncated")
+        columns[name] = view[start:end].cast(code)
+    return Snapshot(toc["metadata"], columns)
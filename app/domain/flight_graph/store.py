@@ -0,0 +1,302 @@
+import hashlib
+import numpy as np
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from app.services.flight_events import FlightEvent
+
+# UTC offset stored for naive datetimes
+NAIVE_OFFSET = -(2**31)
+NAIVE_EPOCH = datetime(1970, 1, 1)
+UTC_EPOCH = NAIVE_EPOCH.replace(tzinfo=timezone.utc)
+EPOCH_ORDINAL = NAIVE_EPOCH.toordinal()
+SECONDS_PER_DAY = 86400
+
+# Typed arrays holding the data of every flight, in snapshot order
+COLUMNS = (
+    "flight_number_ids",
+    "origins",
+    "destinations",
+    "departures",
+    "arrivals",
+    "departure_offsets",
+    "arrival_offsets",
+)
+
+
+def to_epoch(value: datetime) -> float:
+    """Seconds since the Unix epoch, naive datetimes are treated as UTC"""
+    # Same arithmetic as datetime.timestamp, without a tz-aware copy
+    if value.tzinfo is None:
+        return (value - NAIVE_EPOCH).total_seconds()
+    return (value - UTC_EPOCH).total_seconds()
+
+
+def to_offset(value: datetime) -> int:
+    """UTC offset in seconds, or NAIVE_OFFSET for naive datetimes"""
+    offset = value.utcoffset()
+    if offset is None:
+        return NAIVE_OFFSET
+    return int(offset.total_seconds())
+
+
+def to_epochs(values: Iterable[datetime]) -> List[float]:
+    """to_epoch of many datetimes at once"""
+    return [
+        (
+            value - (NAIVE_EPOCH if value.tzinfo is None else UTC_EPOCH)
+        ).total_seconds()
+        for value in values
+    ]
+
+
+def to_offsets(values: Iterable[datetime]) -> List[int]:
+    """to_offset of many datetimes at once"""
+    return [
+        NAIVE_OFFSET if offset is None else int(offset.total_seconds())
+        for offset in map(datetime.utcoffset, values)
+    ]
+
+
+def from_epoch(epoch: float, offset: int) -> datetime:
+    """Rebuild a datetime stored with to_epoch and to_offset"""
+    if offset == NAIVE_OFFSET:
+        return NAIVE_EPOCH + timedelta(seconds=epoch)
+    return datetime.fromtimestamp(epoch, timezone(timedelta(seconds=offset)))
+
+
+def local_ordinal(epoch: float, offset: int) -> int:
+    """Proleptic ordinal of the local date of a stored datetime"""
+    if offset == NAIVE_OFFSET:
+        offset = 0
+    return EPOCH_ORDINAL + int((epoch + offset) // SECONDS_PER_DAY)
+
+
+class FlightStore:
+    """
+    Column-oriented storage of flights addressed by integer ids.
+
+    Airports and flight numbers are interned to integer ids, and departure
+    and arrival times are kept as epoch seconds (plus their UTC offset) in
+    typed arrays. FlightEvent objects are only created on request.
+
+    A store restored from a snapshot holds read-only memoryviews instead
+    of arrays and cannot be modified.
+    """
+
+    def __init__(self) -> None:
+        self.airports: List[str] = []
+        self._airport_ids: Dict[str, int] = {}
+        self._flight_numbers: List[str] = []
+        self._flight_number_ids: Dict[str, int] = {}
+
+        self.flight_number_ids = array("I")
+        self.origins = array("I")
+        self.destinations = array("I")
+        self.departures = array("d")
+        self.arrivals = array("d")
+        self.departure_offsets = array("i")
+        self.arrival_offsets = array("i")
+        self.read_only = False
+
+    @classmethod
+    def from_columns(
+        cls,
+        airports: Sequence[str],
+        flight_numbers: Sequence[str],
+        columns: Mapping[str, memoryview],
+    ) -> "FlightStore":
+        """Read-only store over existing columns, without copying them"""
+        store = cls()
+        for code in airports:
+            store.intern_airport(code)
+        for flight_number in flight_numbers:
+            store._intern_flight_number(flight_number)
+        for name in COLUMNS:
+            # Memoryviews support the read-only subset of the array API
+            setattr(store, name, cast(array, columns[name]))
+        store.read_only = True
+        return store
+
+    def copy(self) -> "FlightStore":
+        """Writable copy of the store, also of a read-only one"""
+        store = FlightStore()
+        store.airports = list(self.airports)
+        store._airport_ids = dict(self._airport_ids)
+        store._flight_numbers = list(self._flight_numbers)
+        store._flight_number_ids = dict(self._flight_number_ids)
+        for name in COLUMNS:
+            getattr(store, name).frombytes(
+                memoryview(getattr(self, name)).cast("B")
+            )
+        return store
+
+    @property
+    def flight_numbers(self) -> List[str]:
+        """Interned flight numbers, indexed by flight_number_ids"""
+        return self._flight_numbers
+
+    def columns(self) -> Dict[str, array]:
+        """Columns of the store by name"""
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise TypeError(
+                "A flight store restored from a snapshot is read-only"
+            )
+
+    def __len__(self) -> int:
+        return len(self.departures)
+
+    def _columns(self) -> Tuple[array, ...]:
+        return tuple(getattr(self, name) for name in COLUMNS)
+
+    def intern_airport(self, code: str) -> int:
+        """Get the id of an airport, registering it if needed"""
+        airport_id = self._airport_ids.get(code)
+        if airport_id is None:
+            airport_id = len(self.airports)
+            self._airport_ids[code] = airport_id
+            self.airports.append(code)
+        return airport_id
+
+    def airport_id(self, code: str) -> Optional[int]:
+        """Get the id of an airport, None if it is unknown"""
+        return self._airport_ids.get(code)
+
+    def airport_ids(self, codes: Iterable[str]) -> List[int]:
+        """Get the ids of many airports, -1 for unknown ones"""
+        airport_ids = self._airport_ids
+        return [airport_ids.get(code, -1) for code in codes]
+
+    def _intern_flight_number(self, flight_number: str) -> int:
+        flight_number_id = self._flight_number_ids.get(flight_number)
+        if flight_number_id is None:
+            flight_number_id = len(self._flight_numbers)
+            self._flight_number_ids[flight_number] = flight_number_id
+            self._flight_numbers.append(flight_number)
+        return flight_number_id
+
+    def add(
+        self, flight: FlightEvent, departure: Optional[float] = None
+    ) -> int:
+        """
+        Append a flight and return its id
+
+        Args:
+            flight: Flight to store
+            departure: Departure epoch of the flight, if already known
+        """
+        self._check_writable()
+        if departure is None:
+            departure = to_epoch(flight.departure_datetime)
+        self.flight_number_ids.append(
+            self._intern_flight_number(flight.flight_number)
+        )
+        self.origins.append(self.intern_airport(flight.departure_city))
+        self.destinations.append(self.intern_airport(flight.arrival_city))
+        self.departures.append(departure)
+        self.arrivals.append(to_epoch(flight.arrival_datetime))
+        self.departure_offsets.append(to_offset(flight.departure_datetime))
+        self.arrival_offsets.append(to_offset(flight.arrival_datetime))
+        return len(self.departures) - 1
+
+    def update(self, flight_id: int, flight: FlightEvent) -> None:
+        """Overwrite the stored data of a flight"""
+        self._check_writable()
+        self.flight_number_ids[flight_id] = self._intern_flight_number(
+            flight.flight_number
+        )
+        self.origins[flight_id] = self.intern_airport(flight.departure_city)
+        self.destinations[flight_id] = self.intern_airport(flight.arrival_city)
+        self.departures[flight_id] = to_epoch(flight.departure_datetime)
+        self.arrivals[flight_id] = to_epoch(flight.arrival_datetime)
+        self.departure_offsets[flight_id] = to_offset(
+            flight.departure_datetime
+        )
+        self.arrival_offsets[flight_id] = to_offset(flight.arrival_datetime)
+
+    def remove(self, flight_id: int) -> Optional[int]:
+        """
+        Remove a flight, moving the last flight into its id
+
+        Returns the previous id of the moved flight, None if the removed
+        flight was the last one.
+        """
+        self._check_writable()
+        last_id = len(self) - 1
+        for column in self._columns():
+            column[flight_id] = column[last_id]
+            column.pop()
+        if flight_id == last_id:
+            return None
+        return last_id
+
+    def changed_ids(self, previous: "FlightStore") -> np.ndarray:
+        """
+        Sorted ids whose data differs from a previous version of the
+        store, such as the one it was copied from, including the ids only
+        one of them holds. Both versions must share their interned ids.
+        """
+        common = min(len(self), len(previous))
+        changed = np.zeros(common, bool)
+        for name in COLUMNS:
+            changed |= (
+                np.asarray(getattr(self, name))[:common]
+                != np.asarray(getattr(previous, name))[:common]
+            )
+        return np.concatenate(
+            [
+                np.flatnonzero(changed),
+                np.arange(common, max(len(self), len(previous))),
+            ]
+        )
+
+    def fingerprint(self) -> int:
+        """64-bit hash of the stored flights"""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update("\0".join(self.airports).encode())
+        digest.update("\0".join(self._flight_numbers).encode())
+        for column in self._columns():
+            digest.update(column.tobytes())
+        return int.from_bytes(digest.digest(), "big")
+
+    def flight_number(self, flight_id: int) -> str:
+        return self._flight_numbers[self.flight_number_ids[flight_id]]
+
+    def origin(self, flight_id: int) -> str:
+        return self.airports[self.origins[flight_id]]
+
+    def destination(self, flight_id: int) -> str:
+        return self.airports[self.destinations[flight_id]]
+
+    def departure_datetime(self, flight_id: int) -> datetime:
+        return from_epoch(
+            self.departures[flight_id], self.departure_offsets[flight_id]
+        )
+
+    def arrival_datetime(self, flight_id: int) -> datetime:
+        return from_epoch(
+            self.arrivals[flight_id], self.arrival_offsets[flight_id]
+        )
+
+    def get(self, flight_id: int) -> FlightEvent:
+        """Build the FlightEvent of a stored flight"""
+        return FlightEvent.model_construct(
+            flight_number=self.flight_number(flight_id),
+            departure_city=self.origin(flight_id),
+            arrival_city=self.destination(flight_id),
+            departure_datetime=self.departure_datetime(flight_id),
+            arrival_datetime=self.arrival_datetime(flight_id),
+        )
@@ -1,23 +1,41 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional
 from app.models.journey import PathFlight
 from ..flight_graph import FlightGraph
 
 
 class DefaultJourneyPathBuilder:
+    """
+    Builds PathFlights from the stored flights without validating them
+    again, reusing the one of a flight in every journey that contains it
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[int, PathFlight] = {}
+        self._graph: Optional[FlightGraph] = None
+        self._version: Optional[int] = None
+
     def build_path(
-        self, path: List[Tuple[str, str, str]], graph: FlightGraph
+        self, path: List[int], graph: FlightGraph
     ) -> List[PathFlight]:
-        flight_path = []
-        for edge in path:
-            flight = graph.get_flight_details(edge)
-            # Pydantic handles from_ correctly at runtime
-            flight_path.append(
-                PathFlight(
-                    flight_number=flight.flight_number,
-                    from_=flight.departure_city,  # type: ignore[call-arg]
-                    to=flight.arrival_city,
-                    departure_time=flight.departure_datetime,
-                    arrival_time=flight.arrival_datetime,
-                )
-            )
-        return flight_path
+        # Flight ids are only stable within a graph and its version
+        if graph is not self._graph or graph.version != self._version:
+            self._flights.clear()
+            self._graph = graph
+            self._version = graph.version
+        return [
+            self._flights.get(flight_id) or self._build(flight_id, graph)
+            for flight_id in path
+        ]
+
+    def _build(self, flight_id: int, graph: FlightGraph) -> PathFlight:
+        flights = graph.flights
+        # The stored flights were validated when they entered the graph
+        flight = PathFlight.model_construct(
+            flight_number=flights.flight_number(flight_id),
+            from_=flights.origin(flight_id),
+            to=flights.destination(flight_id),
+            departure_time=flights.departure_datetime(flight_id),
+            arrival_time=flights.arrival_datetime(flight_id),
+        )
+        self._flights[flight_id] = flight
+        return flight
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, List, Optional, Tuple
+
+from app.models.journey import Journey, JourneyCacheStats
+
+# Rough in-memory size of a cached journey and of each of its flights
+JOURNEY_BYTES = 200
+FLIGHT_BYTES = 600
+
+
+def estimate_size(journeys: List[Journey]) -> int:
+    """Approximate memory used by a list of journeys, in bytes"""
+    return sum(
+        JOURNEY_BYTES + FLIGHT_BYTES * len(journey.path)
+        for journey in journeys
+    )
+
+
+class JourneyCache:
+    """
+    In-process LRU cache of journey search results.
+
+    Entries are bounded by count and by estimated memory. The cache
+    belongs to a single graph version: looking up or storing a result for
+    another version drops every entry at once.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[List[Journey], int]] = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._lock = Lock()
+
+    def _check_version(self, version: int) -> None:
+        if version != self.version:
+            self._entries.clear()
+            self._size = 0
+            self.version = version
+
+    def get(self, key: Hashable, version: int) -> Optional[List[Journey]]:
+        """Get the journeys of a query, None on a miss"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def put(
+        self, key: Hashable, version: int, journeys: List[Journey]
+    ) -> None:
+        """Store the journeys of a query, evicting least recently used"""
+        size = estimate_size(journeys)
+        with self._lock:
+            self._check_version(version)
+            if size > self.max_bytes or self.max_entries < 1:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (list(journeys), size)
+            self._size += size
+            while (
+                len(self._entries) > self.max_entries
+                or self._size > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> JourneyCacheStats:
+        """Current usage and hit/miss counters"""
+        with self._lock:
+            return JourneyCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                entries=len(self._entries),
+                size_bytes=self._size,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+            )
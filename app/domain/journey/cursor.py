@@ -0,0 +1,86 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any, NamedTuple, Tuple
+
+from .exceptions import InvalidCursorError
+
+
+class JourneyCursor(NamedTuple):
+    """
+    Position after the last journey of a page.
+
+    Journeys are ordered by (total time, connections) and then by the
+    order the search found them in, which is stable for a graph version,
+    so the key and the flight ids of the last journey are enough to
+    resume the ordered search.
+    """
+
+    version: int
+    origin: str
+    destination: str
+    departure_date: date
+    # Total time in whole microseconds and number of connections
+    key: Tuple[int, int]
+    path: Tuple[int, ...]
+
+    def encode(self) -> str:
+        """Opaque URL-safe token of the cursor"""
+        data = json.dumps(
+            [
+                self.version,
+                self.origin,
+                self.destination,
+                self.departure_date.isoformat(),
+                list(self.key),
+                list(self.path),
+            ],
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "JourneyCursor":
+        """
+        Cursor of a token
+
+        Raises:
+            InvalidCursorError: If the token is not a journey cursor
+        """
+        try:
+            data = json.loads(
+                base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            )
+            if _is_cursor(data):
+                version, origin, destination, day, key, path = data
+                return cls(
+                    version=version,
+                    origin=origin,
+                    destination=destination,
+                    departure_date=date.fromisoformat(day),
+                    key=(key[0], key[1]),
+                    path=tuple(path),
+                )
+        except (binascii.Error, ValueError) as e:
+            raise InvalidCursorError("Invalid pagination cursor") from e
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+def _is_ints(values: Any) -> bool:
+    return isinstance(values, list) and all(
+        isinstance(value, int) for value in values
+    )
+
+
+def _is_cursor(data: Any) -> bool:
+    """Check that decoded JSON has the fields of an encoded cursor"""
+    return (
+        isinstance(data, list)
+        and len(data) == 6
+        and isinstance(data[0], int)
+        and all(isinstance(field, str) for field in data[1:4])
+        and _is_ints(data[4])
+        and len(data[4]) == 2
+        and _is_ints(data[5])
+    )
@@ -0,0 +1,20 @@
+class JourneySearchError(Exception):
+    """Base exception for journey search errors"""
+
+    pass
+
+
+class InvalidCursorError(JourneySearchError):
+    """Raised when a pagination cursor is malformed or from another search"""
+
+    pass
+
+
+class StaleCursorError(InvalidCursorError):
+    """Raised when the flight graph changed since a cursor was issued"""
+
+    def __init__(self) -> None:
+        super().__init__(
+            "The flight data changed since the cursor was issued, "
+            "restart the search without a cursor"
+        )
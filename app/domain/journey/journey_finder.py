@@ -1,14 +1,39 @@
-from datetime import date
-from typing import List
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 from app.models.journey import Journey
 from .protocols import (
     JourneyPathBuilder,
     JourneySorter,
     JourneyValidator,
+    PathSearcher,
+    RankedPathSearcher,
 )
 from ..flight_graph import FlightGraph
-from .preprocessors import PathPreprocessor
+from ..flight_graph.exceptions import AirportNotFoundError
+from .cache import JourneyCache
+from .cursor import JourneyCursor
+from .exceptions import InvalidCursorError, StaleCursorError
+from .searchers import (
+    BidirectionalPathSearcher,
+    ConnectionScanSearcher,
+    ExhaustivePathSearcher,
+    SearchMode,
+    TimeAwarePathSearcher,
+)
 
 
 class JourneyFinder:
@@ -25,6 +50,9 @@ class JourneyFinder:
         path_builder: JourneyPathBuilder,
         sorter: JourneySorter,
         max_flight_events: int = 2,
+        search_mode: SearchMode = SearchMode.EXHAUSTIVE,
+        vectorized_validation: bool = False,
+        cache: Optional[JourneyCache] = None,
     ):
         """
         Initialize with a flight graph to search on
@@ -35,36 +63,503 @@ class JourneyFinder:
             path_builder: Builder for journey paths
             sorter: Sorter for journeys
             max_flight_events: Maximum number of flight events allowed
+            search_mode: Engine used to search for candidate paths
+            vectorized_validation: Validate candidate paths of the
+                exhaustive search in NumPy batches
+            cache: Cache of search results, shared between finders
         """
         self.flight_graph = flight_graph
         self.validator = validator
         self.path_builder = path_builder
         self.sorter = sorter
         self.max_flight_events = max_flight_events
-        self.preprocessor = PathPreprocessor(flight_graph, validator)
+        self.search_mode = search_mode
+        self.vectorized_validation = vectorized_validation
+        self.cache = cache
+        self.searcher = self._create_searcher(search_mode)
+
+    def _create_searcher(self, search_mode: SearchMode) -> PathSearcher:
+        """Create the path searcher for the given search mode"""
+        if search_mode == SearchMode.TIME_AWARE:
+            return TimeAwarePathSearcher(self.flight_graph, self.validator)
+        if search_mode == SearchMode.BIDIRECTIONAL:
+            return BidirectionalPathSearcher(self.flight_graph, self.validator)
+        if search_mode == SearchMode.CONNECTION_SCAN:
+            return ConnectionScanSearcher(self.flight_graph, self.validator)
+        return ExhaustivePathSearcher(
+            self.flight_graph, self.validator, self.vectorized_validation
+        )
 
     def find_journeys(
-        self, origin: str, destination: str, departure_date: date
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        limit: Optional[int] = None,
     ) -> List[Journey]:
         """
         Find all possible journeys between origin and destination
         for a given departure date.
         Returns journeys ordered by number of connections (ascending).
+        With a limit, only the first `limit` journeys are returned.
+        """
+        return list(
+            self.iter_journeys(origin, destination, departure_date, limit)
+        )
+
+    def iter_journeys(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        limit: Optional[int] = None,
+    ) -> Iterator[Journey]:
+        """
+        Find the journeys of find_journeys one at a time, in the same order.
+        Each journey is only built when it is consumed. The airports are
+        checked right away, the search itself runs on the first journey.
+
+        Raises:
+            AirportNotFoundError: If origin or destination city doesn't exist
+        """
+        self.flight_graph.check_airports(origin, destination)
+        if self.cache is None:
+            return self._iter_journeys(
+                origin, destination, departure_date, limit
+            )
+
+        key = self._cache_key(origin, destination, departure_date, limit)
+        version = self.flight_graph.version
+        journeys = self.cache.get(key, version)
+        if journeys is not None:
+            return iter(journeys)
+        return self._iter_and_cache(
+            key,
+            version,
+            self._iter_journeys(origin, destination, departure_date, limit),
+        )
+
+    def _iter_and_cache(
+        self, key: Hashable, version: int, journeys: Iterator[Journey]
+    ) -> Iterator[Journey]:
+        """Cache the journeys of a query once all of them are consumed"""
+        consumed = []
+        for journey in journeys:
+            consumed.append(journey)
+            yield journey
+        if self.cache is not None:
+            self.cache.put(key, version, consumed)
+
+    def find_journeys_page(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Journey], Optional[str]]:
         """
-        all_paths = self.flight_graph.find_paths(
-            origin, destination, self.max_flight_events
+        Find a page of the journeys of find_journeys, in the same order.
+        Returns the page and the cursor of the next one, None on the last
+        page. A cursor resumes the ordered search right after the page it
+        was issued for, without building the earlier journeys again.
+        Pages are not cached, as the cursor is made from the flight ids
+        of the journeys, which cached journeys do not keep.
+
+        Raises:
+            AirportNotFoundError: If origin or destination city doesn't exist
+            InvalidCursorError: If the cursor belongs to another search
+            StaleCursorError: If the graph changed since the cursor was
+                issued
+        """
+        self.flight_graph.check_airports(origin, destination)
+        after = None
+        if cursor is not None:
+            after = JourneyCursor.decode(cursor)
+            if (after.origin, after.destination, after.departure_date) != (
+                origin,
+                destination,
+                departure_date,
+            ):
+                raise InvalidCursorError(
+                    "The cursor belongs to another search"
+                )
+            if after.version != self.flight_graph.version:
+                raise StaleCursorError()
+        # One extra journey tells whether there is a next page
+        found = list(
+            self._iter_found(
+                origin, destination, departure_date, limit + 1, after
+            )
         )
-        # Filter paths based on departure date and connection time
-        paths = self.preprocessor.preprocess(all_paths, departure_date)
 
-        journeys = []
-        for path in paths:
-            flight_path = self.path_builder.build_path(path, self.flight_graph)
-            journey = Journey(connections=len(path) - 1, path=flight_path)
+        journeys = [journey for _, journey in found]
+        if len(found) <= limit:
+            return journeys, None
+        path, journey = found[limit - 1]
+        return (
+            journeys[:limit],
+            self._cursor(
+                origin, destination, departure_date, path, journey
+            ).encode(),
+        )
+
+    def _cursor(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        path: List[int],
+        journey: Journey,
+    ) -> JourneyCursor:
+        """Cursor right after the journey of a path of a search"""
+        total_time = (
+            journey.path[-1].arrival_time - journey.path[0].departure_time
+        )
+        return JourneyCursor(
+            version=self.flight_graph.version,
+            origin=origin,
+            destination=destination,
+            departure_date=departure_date,
+            key=(total_time // timedelta(microseconds=1), journey.connections),
+            path=tuple(path),
+        )
+
+    def _cache_key(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        limit: Optional[int],
+    ) -> Hashable:
+        """Key of a query and the settings that affect its result"""
+        return (
+            origin,
+            destination,
+            departure_date,
+            limit,
+            self.max_flight_events,
+            self.search_mode,
+            self.validator.min_connection_time,
+            self.validator.max_connection_time,
+            self.validator.max_flight_time,
+        )
+
+    def find_journeys_to_many(
+        self,
+        origin: str,
+        destinations: Sequence[str],
+        departure_date: date,
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[Journey]]:
+        """
+        Find the journeys from an origin to several destinations.
+        Cached destinations are served from the cache and the rest share
+        a single search from the origin when the search mode allows it.
+
+        Raises:
+            AirportNotFoundError: If the origin or a destination doesn't
+                exist
+        """
+        results: Dict[str, List[Journey]] = {}
+        version = self.flight_graph.version
+        missing = []
+        for destination in dict.fromkeys(destinations):
+            journeys = None
+            if self.cache is not None:
+                journeys = self.cache.get(
+                    self._cache_key(
+                        origin, destination, departure_date, limit
+                    ),
+                    version,
+                )
+            if journeys is None:
+                missing.append(destination)
+            else:
+                results[destination] = journeys
+        if not missing:
+            return results
+
+        if self.searcher.ranked:
+            paths = cast(RankedPathSearcher, self.searcher).find_paths_to_many(
+                origin,
+                missing,
+                departure_date,
+                self.max_flight_events,
+                self._search_limit(limit),
+            )
+        else:
+            paths = {
+                destination: self.searcher.find_paths(
+                    origin,
+                    destination,
+                    departure_date,
+                    self.max_flight_events,
+                    self._search_limit(limit),
+                )
+                for destination in missing
+            }
+        for destination in missing:
+            journeys = self._build_journeys(paths[destination], limit)
+            if self.cache is not None:
+                self.cache.put(
+                    self._cache_key(
+                        origin, destination, departure_date, limit
+                    ),
+                    version,
+                    journeys,
+                )
+            results[destination] = journeys
+        return results
+
+    def find_journeys_by_day(
+        self,
+        origin: str,
+        destination: str,
+        first_day: date,
+        last_day: date,
+        limit: Optional[int] = None,
+    ) -> Dict[date, List[Journey]]:
+        """
+        Find the journeys departing on every date of a range, in date
+        order. Dates missing from the cache are searched in one sweep
+        over the departure index when the search mode allows it.
+
+        Raises:
+            AirportNotFoundError: If origin or destination city doesn't exist
+        """
+        self.flight_graph.check_airports(origin, destination)
+        days = [
+            first_day + timedelta(days=offset)
+            for offset in range((last_day - first_day).days + 1)
+        ]
+        results: Dict[date, List[Journey]] = {}
+        version = self.flight_graph.version
+        missing = []
+        for day in days:
+            journeys = None
+            if self.cache is not None:
+                journeys = self.cache.get(
+                    self._cache_key(origin, destination, day, limit), version
+                )
+            if journeys is None:
+                missing.append(day)
+            else:
+                results[day] = journeys
+
+        if missing and self.searcher.ranked:
+            paths = cast(RankedPathSearcher, self.searcher).find_paths_by_day(
+                origin,
+                destination,
+                missing[0],
+                missing[-1],
+                self.max_flight_events,
+                self._search_limit(limit),
+            )
+        else:
+            paths = {
+                day: self.searcher.find_paths(
+                    origin,
+                    destination,
+                    day,
+                    self.max_flight_events,
+                    self._search_limit(limit),
+                )
+                for day in missing
+            }
+        for day in missing:
+            journeys = self._build_journeys(paths[day], limit)
+            if self.cache is not None:
+                self.cache.put(
+                    self._cache_key(origin, destination, day, limit),
+                    version,
+                    journeys,
+                )
+            results[day] = journeys
+        return {day: results[day] for day in days}
+
+    def find_journeys_batch(
+        self,
+        queries: Sequence[Tuple[str, str, date]],
+        limit: Optional[int] = None,
+    ) -> List[Union[List[Journey], AirportNotFoundError]]:
+        """
+        Answer (origin, destination, departure date) queries in one pass.
+        Queries sharing origin and date are searched together. Results
+        follow the order of the queries, with the error of a query in
+        place of its journeys when one of its airports doesn't exist.
+        """
+        results: List[Union[List[Journey], AirportNotFoundError]] = [
+            [] for _ in queries
+        ]
+        groups: Dict[Tuple[str, date], List[int]] = defaultdict(list)
+        for index, (origin, destination, departure_date) in enumerate(queries):
+            try:
+                self.flight_graph.check_airports(origin, destination)
+            except AirportNotFoundError as e:
+                results[index] = e
+                continue
+            groups[(origin, departure_date)].append(index)
+
+        for (origin, departure_date), indexes in groups.items():
+            journeys = self.find_journeys_to_many(
+                origin,
+                [queries[index][1] for index in indexes],
+                departure_date,
+                limit,
+            )
+            for index in indexes:
+                results[index] = list(journeys[queries[index][1]])
+        return results
+
+    def _iter_journeys(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        limit: Optional[int],
+    ) -> Iterator[Journey]:
+        """Search and build the journeys of a query"""
+        for _, journey in self._iter_found(
+            origin, destination, departure_date, limit
+        ):
+            yield journey
+
+    def _iter_found(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        limit: Optional[int],
+        after: Optional[JourneyCursor] = None,
+    ) -> Iterator[Tuple[List[int], Journey]]:
+        """
+        Search and build the journeys of a query after a cursor, along
+        with their paths
+        """
+        # Only paths matching departure date and connection time are returned
+        if after is None:
+            paths = self.searcher.find_paths(
+                origin,
+                destination,
+                departure_date,
+                self.max_flight_events,
+                self._search_limit(limit),
+            )
+        elif self.searcher.ranked and self.sorter.by_total_time:
+            paths = cast(RankedPathSearcher, self.searcher).find_paths(
+                origin,
+                destination,
+                departure_date,
+                self.max_flight_events,
+                limit,
+                after=after.key,
+            )
+        else:
+            # Other searchers, or a ranked one with another order, cannot
+            # skip the journeys before the cursor
+            paths = self.searcher.find_paths(
+                origin, destination, departure_date, self.max_flight_events
+            )
+        yield from self._iter_built(paths, limit, after)
+
+    def _search_limit(self, limit: Optional[int]) -> Optional[int]:
+        """
+        Limit passed to the searcher, which may only skip paths when the
+        journeys are sorted by total time like its ranking
+        """
+        return limit if self.sorter.by_total_time else None
+
+    def _build_journeys(
+        self, paths: List[List[int]], limit: Optional[int]
+    ) -> List[Journey]:
+        """Build, validate and sort the journeys of the found paths"""
+        return [journey for _, journey in self._iter_built(paths, limit)]
+
+    def _iter_built(
+        self,
+        paths: List[List[int]],
+        limit: Optional[int],
+        after: Optional[JourneyCursor] = None,
+    ) -> Iterator[Tuple[List[int], Journey]]:
+        """
+        Build, validate and sort the journeys of the found paths, skipping
+        the ones up to a cursor. Each journey comes with its path.
+
+        With a sorter by total time the paths are ordered from the stored
+        times first, so journeys are built one at a time in their final
+        order and none is built before the cursor or past the limit.
+        """
+        if not self.sorter.by_total_time:
+            built: Dict[int, Tuple[List[int], Journey]] = {}
+            for path in paths:
+                journey = self._build_journey(path)
+                if self.validator.is_valid_total_time(journey):
+                    built[id(journey)] = (path, journey)
+            ranked = [
+                built[id(journey)]
+                for journey in self.sorter.sort(
+                    [journey for _, journey in built.values()]
+                )
+            ]
+            start = 0
+            if after is not None:
+                start = next(
+                    (
+                        position + 1
+                        for position, (path, _) in enumerate(ranked)
+                        if tuple(path) == after.path
+                    ),
+                    len(ranked),
+                )
+            end = None if limit is None else start + limit
+            yield from ranked[start:end]
+            return
+
+        flights = self.flight_graph.flights
+
+        def sort_key(path: List[int]) -> Tuple[int, int]:
+            # Total time in whole microseconds, as the sorter's timedelta
+            total_time = (
+                flights.arrivals[path[-1]] - flights.departures[path[0]]
+            )
+            return round(total_time * 1_000_000), len(path) - 1
+
+        ordered: Iterable[List[int]] = sorted(paths, key=sort_key)
+        if after is not None:
+            ordered = _after_cursor(ordered, after, sort_key)
+        found = 0
+        for path in ordered:
+            if limit is not None and found >= limit:
+                return
+            journey = self._build_journey(path)
             # Validate total journey time
             if not self.validator.is_valid_total_time(journey):
                 continue
+            found += 1
+            yield path, journey
+
+    def _build_journey(self, path: List[int]) -> Journey:
+        """Journey of a path of flight ids"""
+        flight_path = self.path_builder.build_path(path, self.flight_graph)
+        return Journey(connections=len(path) - 1, path=flight_path)
 
-            journeys.append(journey)
 
-        return self.sorter.sort(journeys)
+def _after_cursor(
+    paths: Iterable[List[int]],
+    cursor: JourneyCursor,
+    key: Callable[[List[int]], Tuple[int, int]],
+) -> Iterator[List[int]]:
+    """Ordered paths that come after the journey of a cursor"""
+    resumed = False
+    for path in paths:
+        if not resumed:
+            path_key = key(path)
+            if path_key < cursor.key:
+                continue
+            if path_key == cursor.key:
+                # Ties keep the search order, resume after the cursor path
+                resumed = tuple(path) == cursor.path
+                continue
+            resumed = True
+        yield path
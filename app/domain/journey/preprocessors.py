@@ -1,46 +1,123 @@
-from typing import List, Tuple
+from typing import Dict, List
 from datetime import date
 
+import numpy as np
+
 from app.domain.flight_graph import FlightGraph
+from app.domain.flight_graph.store import (
+    EPOCH_ORDINAL,
+    NAIVE_OFFSET,
+    SECONDS_PER_DAY,
+)
 from app.domain.journey.protocols import JourneyValidator
 
 
 class PathPreprocessor:
-    def __init__(self, graph: FlightGraph, validator: JourneyValidator):
+    def __init__(
+        self,
+        graph: FlightGraph,
+        validator: JourneyValidator,
+        vectorized: bool = False,
+    ):
+        """
+        Args:
+            graph: Graph the paths belong to
+            validator: Validator for journey constraints
+            vectorized: Validate paths in NumPy batches grouped by length.
+                Also applies the total journey time check.
+        """
         self.graph = graph
         self.validator = validator
+        self.vectorized = vectorized
 
     def preprocess(
-        self, paths: List[List[Tuple[str, str, str]]], departure_date: date
-    ) -> List[List[Tuple[str, str, str]]]:
+        self, paths: List[List[int]], departure_date: date
+    ) -> List[List[int]]:
         """Filter and transform paths before building journeys"""
+        if self.vectorized:
+            return self._preprocess_batch(paths, departure_date)
+
         valid_paths = []
         for path in paths:
             if self._is_valid_path(path, departure_date):
                 valid_paths.append(path)
         return valid_paths
 
-    def _is_valid_path(
-        self, path: List[Tuple[str, str, str]], departure_date: date
-    ) -> bool:
+    def _is_valid_path(self, path: List[int], departure_date: date) -> bool:
         """Quick validation of paths before building journeys"""
         if not path:
             return False
 
         # Validate first flight departure date
-        current = self.graph.get_flight_details(path[0])
+        flight_ids = path
         if not self.validator.is_valid_departure_date(
-            current.departure_datetime, departure_date
+            self.graph.flights.departure_datetime(flight_ids[0]),
+            departure_date,
         ):
             return False
 
-        # Validate connections
-        for i in range(len(path) - 1):
-            current = self.graph.get_flight_details(path[i])
-            next_flight = self.graph.get_flight_details(path[i + 1])
-            if not self.validator.is_valid_connection(
-                current.arrival_datetime, next_flight.departure_datetime
-            ):
+        # Validate connections against the precomputed transfer windows
+        transfers = self.graph.transfer_index(
+            self.validator.min_connection_time,
+            self.validator.max_connection_time,
+        )
+        for i in range(len(flight_ids) - 1):
+            if not transfers.is_transfer(flight_ids[i], flight_ids[i + 1]):
                 return False
 
         return True
+
+    def _preprocess_batch(
+        self, paths: List[List[int]], departure_date: date
+    ) -> List[List[int]]:
+        """
+        Validate paths of the same length together as NumPy arrays
+
+        The departure date, every connection window and the total journey
+        time are each checked with a single mask per path length.
+        """
+        by_length: Dict[int, List[int]] = {}
+        for index, path in enumerate(paths):
+            if path:
+                by_length.setdefault(len(path), []).append(index)
+
+        flights = self.graph.flights
+        departures = np.frombuffer(flights.departures, dtype=np.float64)
+        arrivals = np.frombuffer(flights.arrivals, dtype=np.float64)
+        offsets = np.frombuffer(flights.departure_offsets, dtype=np.int32)
+        min_connection = self.validator.min_connection_time.total_seconds()
+        max_connection = self.validator.max_connection_time.total_seconds()
+        max_flight_time = self.validator.max_flight_time.total_seconds()
+
+        valid = np.zeros(len(paths), dtype=bool)
+        for length, indices in by_length.items():
+            flight_ids = np.array(
+                [paths[index] for index in indices],
+                dtype=np.intp,
+            ).reshape(len(indices), length)
+            path_departures = departures[flight_ids]
+            path_arrivals = arrivals[flight_ids]
+
+            # First flight departs on the requested (local) date
+            first_offsets = offsets[flight_ids[:, 0]]
+            first_offsets = np.where(
+                first_offsets == NAIVE_OFFSET, 0, first_offsets
+            )
+            local_days = EPOCH_ORDINAL + np.floor_divide(
+                path_departures[:, 0] + first_offsets, SECONDS_PER_DAY
+            )
+            mask = local_days == departure_date.toordinal()
+
+            # Every connection is inside the connection window
+            waits = path_departures[:, 1:] - path_arrivals[:, :-1]
+            mask &= np.all(
+                (waits >= min_connection) & (waits <= max_connection), axis=1
+            )
+
+            # Total journey time is within limits
+            total_times = path_arrivals[:, -1] - path_departures[:, 0]
+            mask &= total_times <= max_flight_time
+
+            valid[indices] = mask
+
+        return [path for path, is_valid in zip(paths, valid) if is_valid]
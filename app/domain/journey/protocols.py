@@ -1,5 +1,5 @@
-from typing import Protocol, List, Tuple
-from datetime import datetime, date
+from typing import Dict, Iterable, Protocol, List, Optional, Tuple
+from datetime import datetime, date, timedelta
 
 from app.models.journey import Journey, PathFlight
 from ..flight_graph import FlightGraph
@@ -7,19 +7,92 @@ from ..flight_graph import FlightGraph
 
 class JourneyPathBuilder(Protocol):
     def build_path(
-        self, path: List[Tuple[str, str, str]], graph: FlightGraph
+        self, path: List[int], graph: FlightGraph
     ) -> List[PathFlight]:
         """Build a journey path from graph path"""
         ...
 
 
+class PathSearcher(Protocol):
+    # Whether the searcher also implements RankedPathSearcher
+    ranked: bool
+
+    def find_paths(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> List[List[int]]:
+        """
+        Find the paths that satisfy the journey time constraints
+
+        When a limit is given, searchers may skip paths that cannot rank
+        among the best `limit` journeys.
+        """
+        ...
+
+
+class RankedPathSearcher(PathSearcher, Protocol):
+    """
+    Searcher ranking paths by (total time, connections), so a search can
+    resume after a rank and serve several destinations or dates at once
+    """
+
+    def find_paths(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[List[int]]:
+        """
+        Find the paths that satisfy the journey time constraints, ranked
+        after the `after` key (total time in microseconds, connections)
+        """
+        ...
+
+    def find_paths_to_many(
+        self,
+        origin: str,
+        destinations: Iterable[str],
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[List[int]]]:
+        """Find the paths from an origin to several destinations at once"""
+        ...
+
+    def find_paths_by_day(
+        self,
+        origin: str,
+        destination: str,
+        first_day: date,
+        last_day: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> Dict[date, List[List[int]]]:
+        """Find the paths departing on every date of a range"""
+        ...
+
+
 class JourneySorter(Protocol):
+    # Whether journeys are sorted by total time, then connections, so they
+    # can be ordered from the stored flight times before being built
+    by_total_time: bool
+
     def sort(self, journeys: List[Journey]) -> List[Journey]:
         """Sort journeys by defined criteria"""
         ...
 
 
 class JourneyValidator(Protocol):
+    min_connection_time: timedelta
+    max_connection_time: timedelta
+    max_flight_time: timedelta
 
     def is_valid_connection(
         self, arrival_time: datetime, departure_time: datetime
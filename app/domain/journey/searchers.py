@@ -0,0 +1,750 @@
+import heapq
+from datetime import date
+from enum import Enum
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from app.domain.flight_graph import FlightGraph
+from app.domain.flight_graph.indexes import TransferIndex
+from app.domain.journey.preprocessors import PathPreprocessor
+from app.domain.journey.protocols import JourneyValidator
+
+
+class SearchMode(str, Enum):
+    """Available path search engines"""
+
+    EXHAUSTIVE = "exhaustive"
+    TIME_AWARE = "time_aware"
+    CONNECTION_SCAN = "connection_scan"
+    BIDIRECTIONAL = "bidirectional"
+
+
+class ExhaustivePathSearcher:
+    """
+    Enumerates every simple path in the graph and filters out the ones
+    that do not satisfy the departure date and connection constraints.
+    """
+
+    ranked = False
+
+    def __init__(
+        self,
+        graph: FlightGraph,
+        validator: JourneyValidator,
+        vectorized: bool = False,
+    ):
+        self.graph = graph
+        self.preprocessor = PathPreprocessor(graph, validator, vectorized)
+
+    def find_paths(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> List[List[int]]:
+        all_paths = self.graph.find_paths(origin, destination, max_flights)
+        return self.preprocessor.preprocess(all_paths, departure_date)
+
+
+class _BestPaths:
+    """
+    Bounded heap of the best complete paths by (total time, connections).
+
+    Ties are broken by discovery order, so the result is the same as
+    sorting every path found and keeping the first ones.
+
+    With a floor (total time in microseconds, connections), paths below it
+    are dropped and the ones tied with it are all kept on top of the
+    limit, so a page after a cursor at the floor can still be completed.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        max_total_time: float,
+        floor: Optional[Tuple[int, int]] = None,
+    ):
+        self.limit = limit
+        self.max_total_time = max_total_time
+        self.floor = floor
+        # Max-heap on (total time, connections, order) using negated keys
+        self._heap: List[Tuple[float, int, int, List[int]]] = []
+        self._ties: List[List[int]] = []
+        self._found = 0
+
+    def can_improve(self, total_time: float, connections: int) -> bool:
+        """Check if a path with these lower bounds could be kept"""
+        if total_time > self.max_total_time:
+            return False
+        if len(self._heap) < self.limit:
+            return True
+        worst_total_time, worst_connections = self._heap[0][:2]
+        return (total_time, connections) < (
+            -worst_total_time,
+            -worst_connections,
+        )
+
+    def add(
+        self, total_time: float, connections: int, path: List[int]
+    ) -> None:
+        """Offer a complete path to the heap"""
+        if self.floor is not None:
+            key = (round(total_time * 1_000_000), connections)
+            if key < self.floor:
+                return
+            if key == self.floor:
+                self._ties.append(list(path))
+                return
+        if not self.can_improve(total_time, connections):
+            return
+        entry = (-total_time, -connections, -self._found, list(path))
+        self._found += 1
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+
+    def paths(self) -> List[List[int]]:
+        """Kept paths, best first"""
+        return self._ties + [
+            entry[3] for entry in sorted(self._heap, reverse=True)
+        ]
+
+
+class _AllPaths:
+    """Every complete path, in discovery order"""
+
+    def __init__(self) -> None:
+        self._paths: List[List[int]] = []
+
+    def can_improve(self, total_time: float, connections: int) -> bool:
+        return True
+
+    def add(
+        self, total_time: float, connections: int, path: List[int]
+    ) -> None:
+        self._paths.append(list(path))
+
+    def paths(self) -> List[List[int]]:
+        return self._paths
+
+
+class TimeAwarePathSearcher:
+    """
+    Depth-first search that checks the departure date and the connection
+    window while expanding paths, so paths that would be rejected later
+    are never built.
+
+    First legs are looked up in the graph departure index and connections
+    follow the precomputed transfer index, so only flights departing on the
+    requested date or inside the connection window are visited. Returns the
+    same paths as ExhaustivePathSearcher, ordered by departure time instead
+    of insertion order.
+
+    With a limit, keeps a bounded heap of the best paths by (total time,
+    connections) and stops expanding a branch once it cannot beat the
+    current k-th best. Assumes flights arrive after they depart.
+    """
+
+    ranked = True
+
+    def __init__(self, graph: FlightGraph, validator: JourneyValidator):
+        self.graph = graph
+        self.validator = validator
+
+    def find_paths(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[List[int]]:
+        """
+        With a limit and an `after` key (total time in microseconds,
+        connections), keeps the best `limit` paths above the key plus
+        every path tied with it, to resume a paginated search.
+        """
+        self.graph.check_airports(origin, destination)
+        departures = {
+            departure_date: self.graph.departure_index.departures_on(
+                origin, departure_date
+            )
+        }
+        return self._search(
+            origin, [destination], departures, max_flights, limit, after
+        )[departure_date][destination]
+
+    def find_paths_to_many(
+        self,
+        origin: str,
+        destinations: Iterable[str],
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[List[int]]]:
+        """
+        Find the paths from an origin to several destinations at once
+
+        A single expansion from the origin serves every destination, and
+        each one gets the same paths as its own find_paths call.
+
+        Raises:
+            AirportNotFoundError: If the origin or a destination doesn't
+                exist
+        """
+        destinations = list(destinations)
+        for destination in destinations:
+            self.graph.check_airports(origin, destination)
+        departures = {
+            departure_date: self.graph.departure_index.departures_on(
+                origin, departure_date
+            )
+        }
+        return self._search(
+            origin, destinations, departures, max_flights, limit
+        )[departure_date]
+
+    def find_paths_by_day(
+        self,
+        origin: str,
+        destination: str,
+        first_day: date,
+        last_day: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> Dict[date, List[List[int]]]:
+        """
+        Find the paths departing on every date of a range
+
+        First legs of the whole range come from one scan of the departure
+        index, and each date gets the same paths as its own find_paths
+        call.
+
+        Raises:
+            AirportNotFoundError: If origin or destination doesn't exist
+        """
+        self.graph.check_airports(origin, destination)
+        departures = self.graph.departure_index.departures_by_day(
+            origin, first_day, last_day
+        )
+        results = self._search(
+            origin, [destination], departures, max_flights, limit
+        )
+        return {day: paths[destination] for day, paths in results.items()}
+
+    def _search(
+        self,
+        origin: str,
+        destinations: List[str],
+        departures: Mapping[date, Iterable[int]],
+        max_flights: int,
+        limit: Optional[int],
+        after: Optional[Tuple[int, int]] = None,
+    ) -> Dict[date, Dict[str, List[List[int]]]]:
+        """Expand the first legs of every date towards the destinations"""
+        flights = self.graph.flights
+        origin_id = flights.airport_id(origin)
+        destination_ids = {
+            flights.airport_id(destination) for destination in destinations
+        }
+        destination_ids.discard(origin_id)
+        if max_flights < 1:
+            destination_ids.clear()
+        max_total_time = self.validator.max_flight_time.total_seconds()
+        transfers = self.graph.transfer_index(
+            self.validator.min_connection_time,
+            self.validator.max_connection_time,
+        )
+
+        results: Dict[date, Dict[str, List[List[int]]]] = {}
+        for departure_date, flight_ids in departures.items():
+            targets: Dict[Optional[int], Union[_AllPaths, _BestPaths]] = {
+                destination_id: (
+                    _AllPaths()
+                    if limit is None
+                    else _BestPaths(limit, max_total_time, after)
+                )
+                for destination_id in destination_ids
+            }
+            for flight_id in flight_ids if targets else ():
+                if not self.validator.is_valid_departure_date(
+                    flights.departure_datetime(flight_id), departure_date
+                ):
+                    continue
+                self._extend(
+                    [flight_id],
+                    {origin_id},
+                    targets,
+                    max_flights,
+                    transfers,
+                    limit is not None,
+                )
+            results[departure_date] = {}
+            for destination in destinations:
+                target = targets.get(flights.airport_id(destination))
+                results[departure_date][destination] = (
+                    [] if target is None else target.paths()
+                )
+        return results
+
+    def _extend(
+        self,
+        path: List[int],
+        visited: Set[Optional[int]],
+        targets: Dict[Optional[int], Union[_AllPaths, _BestPaths]],
+        max_flights: int,
+        transfers: TransferIndex,
+        limited: bool,
+    ) -> None:
+        """Extend a time-feasible partial path with valid connections"""
+        flights = self.graph.flights
+        last_flight_id = path[-1]
+        airport_id = flights.destinations[last_flight_id]
+        if airport_id in visited:
+            return
+
+        elapsed = (
+            flights.arrivals[last_flight_id] - flights.departures[path[0]]
+        )
+        target = targets.get(airport_id)
+        if target is not None:
+            target.add(elapsed, len(path) - 1, path)
+            # Other destinations may still be reached through this one
+            if len(targets) == 1:
+                return
+        if len(path) >= max_flights:
+            return
+        # Reaching another destination takes at least one more flight
+        if limited and not any(
+            best.can_improve(elapsed, len(path))
+            for best_id, best in targets.items()
+            if best_id != airport_id
+        ):
+            return
+
+        visited.add(airport_id)
+        for flight_id in transfers.transfers(last_flight_id):
+            path.append(flight_id)
+            self._extend(
+                path, visited, targets, max_flights, transfers, limited
+            )
+            path.pop()
+        visited.remove(airport_id)
+
+
+class _Meeting(NamedTuple):
+    """Where and when backward rests can join a forward half"""
+
+    airports: Set[int]
+    earliest_departure: float
+    latest_departure: float
+
+
+class BidirectionalPathSearcher:
+    """
+    Meet-in-the-middle search for journeys with several legs.
+
+    Time-feasible partial paths are expanded forward from the origin and
+    backward from the destination, each up to half of the flight limit,
+    and joined at intermediate airports through the transfer index. Paths
+    with up to half of the flights are found by the forward side alone,
+    longer ones are the join of a forward half and a backward rest, so
+    every path is built once.
+
+    Returns the same paths as TimeAwarePathSearcher except the ones
+    exceeding the max journey time, which JourneyFinder rejects anyway
+    and which bound the backward expansion. Assumes flights arrive after
+    they depart.
+    """
+
+    ranked = False
+
+    def __init__(self, graph: FlightGraph, validator: JourneyValidator):
+        self.graph = graph
+        self.validator = validator
+
+    def find_paths(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> List[List[int]]:
+        self.graph.check_airports(origin, destination)
+        if max_flights < 1 or origin == destination:
+            return []
+
+        flights = self.graph.flights
+        origin_id = flights.airport_id(origin)
+        destination_id = flights.airport_id(destination)
+        if origin_id is None or destination_id is None:
+            return []
+        transfers = self.graph.transfer_index(
+            self.validator.min_connection_time,
+            self.validator.max_connection_time,
+        )
+        max_total_time = self.validator.max_flight_time.total_seconds()
+        forward_flights = (max_flights + 1) // 2
+        backward_flights = max_flights - forward_flights
+
+        paths: List[List[int]] = []
+        halves: List[Tuple[List[int], Set[int]]] = []
+        for flight_id in self.graph.departure_index.departures_on(
+            origin, departure_date
+        ):
+            if not self.validator.is_valid_departure_date(
+                flights.departure_datetime(flight_id), departure_date
+            ):
+                continue
+            self._extend_forward(
+                [flight_id],
+                {origin_id},
+                destination_id,
+                forward_flights,
+                max_total_time,
+                transfers,
+                paths,
+                halves,
+            )
+        if not halves or backward_flights < 1:
+            return paths
+
+        # Backward rests are bounded by the forward halves they can join:
+        # they depart after the earliest connection from a half, start at
+        # an airport where a half ends and arrive within the max journey
+        # time of the latest half
+        min_connection = self.validator.min_connection_time.total_seconds()
+        max_connection = self.validator.max_connection_time.total_seconds()
+        meeting = _Meeting(
+            airports={flights.destinations[path[-1]] for path, _ in halves},
+            earliest_departure=min(
+                flights.arrivals[path[-1]] for path, _ in halves
+            )
+            + min_connection,
+            latest_departure=max(
+                flights.arrivals[path[-1]] for path, _ in halves
+            )
+            + max_connection,
+        )
+        latest_arrival = (
+            max(flights.departures[path[0]] for path, _ in halves)
+            + max_total_time
+        )
+        rests: Dict[int, List[Tuple[List[int], Set[int]]]] = {}
+        for flight_id in self.graph.arrival_index.arrivals_between(
+            destination_id, meeting.earliest_departure, latest_arrival
+        ):
+            self._extend_backward(
+                [flight_id],
+                {destination_id},
+                origin_id,
+                backward_flights,
+                meeting,
+                max_total_time,
+                transfers,
+                rests,
+            )
+
+        for path, airports in halves:
+            departure = flights.departures[path[0]]
+            for next_flight_id in transfers.transfers(path[-1]):
+                for rest, rest_airports in rests.get(next_flight_id, ()):
+                    if flights.arrivals[
+                        rest[-1]
+                    ] - departure <= max_total_time and airports.isdisjoint(
+                        rest_airports
+                    ):
+                        paths.append(path + rest)
+        return paths
+
+    def _extend_forward(
+        self,
+        path: List[int],
+        visited: Set[int],
+        destination_id: int,
+        max_flights: int,
+        max_total_time: float,
+        transfers: TransferIndex,
+        paths: List[List[int]],
+        halves: List[Tuple[List[int], Set[int]]],
+    ) -> None:
+        """Extend a partial path from the origin up to max_flights"""
+        flights = self.graph.flights
+        last_flight_id = path[-1]
+        airport_id = flights.destinations[last_flight_id]
+        elapsed = (
+            flights.arrivals[last_flight_id] - flights.departures[path[0]]
+        )
+        if airport_id in visited or elapsed > max_total_time:
+            return
+        if airport_id == destination_id:
+            paths.append(list(path))
+            return
+
+        visited.add(airport_id)
+        if len(path) == max_flights:
+            halves.append((list(path), set(visited)))
+        else:
+            for flight_id in transfers.transfers(last_flight_id):
+                path.append(flight_id)
+                self._extend_forward(
+                    path,
+                    visited,
+                    destination_id,
+                    max_flights,
+                    max_total_time,
+                    transfers,
+                    paths,
+                    halves,
+                )
+                path.pop()
+        visited.remove(airport_id)
+
+    def _extend_backward(
+        self,
+        path: List[int],
+        visited: Set[int],
+        origin_id: int,
+        max_flights: int,
+        meeting: _Meeting,
+        max_total_time: float,
+        transfers: TransferIndex,
+        rests: Dict[int, List[Tuple[List[int], Set[int]]]],
+    ) -> None:
+        """
+        Extend a partial path to the destination with earlier flights
+
+        The path is kept in travel order, so its first flight is the one
+        being prepended to.
+        """
+        flights = self.graph.flights
+        first_flight_id = path[0]
+        airport_id = flights.origins[first_flight_id]
+        departure = flights.departures[first_flight_id]
+        elapsed = flights.arrivals[path[-1]] - departure
+        if (
+            airport_id in visited
+            or airport_id == origin_id
+            or departure < meeting.earliest_departure
+            or elapsed > max_total_time
+        ):
+            return
+        if (
+            airport_id in meeting.airports
+            and departure <= meeting.latest_departure
+        ):
+            rests.setdefault(first_flight_id, []).append(
+                (list(path), set(visited))
+            )
+        if len(path) == max_flights:
+            return
+
+        visited.add(airport_id)
+        min_connection = self.validator.min_connection_time.total_seconds()
+        max_connection = self.validator.max_connection_time.total_seconds()
+        # The range is padded and then checked with the transfer index,
+        # so both sides agree on which connections are valid
+        for flight_id in self.graph.arrival_index.arrivals_between(
+            airport_id,
+            departure - max_connection - 1,
+            departure - min_connection + 1,
+        ):
+            if not transfers.is_transfer(flight_id, first_flight_id):
+                continue
+            path.insert(0, flight_id)
+            self._extend_backward(
+                path,
+                visited,
+                origin_id,
+                max_flights,
+                meeting,
+                max_total_time,
+                transfers,
+                rests,
+            )
+            path.pop(0)
+        visited.remove(airport_id)
+
+
+class _ScanLabel(NamedTuple):
+    """Best way found to board a flight with a given number of legs"""
+
+    first_departure: float
+    parent: Optional[Tuple[int, int]]
+
+
+class ConnectionScanSearcher:
+    """
+    Connection Scan Algorithm over the time-sorted timetable of the graph.
+
+    Flights are scanned once in departure order. Each reachable flight keeps
+    the latest possible departure from the origin for every number of legs,
+    and pushes it to its feasible connections from the transfer index.
+
+    Instead of every valid path, returns the Pareto-optimal ones: no other
+    path departs later, arrives earlier and uses fewer flights. Assumes
+    connecting flights depart after the flight they connect from.
+    """
+
+    ranked = False
+
+    def __init__(self, graph: FlightGraph, validator: JourneyValidator):
+        self.graph = graph
+        self.validator = validator
+
+    def find_paths(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+        limit: Optional[int] = None,
+    ) -> List[List[int]]:
+        """Profile query: Pareto-optimal paths departing on the date"""
+        arrivals = self._scan(origin, destination, departure_date, max_flights)
+
+        profile: List[Tuple[float, float, int, List[int]]] = []
+        for first_departure, arrival, legs, path in sorted(
+            arrivals, key=lambda entry: (-entry[0], entry[1], entry[2])
+        ):
+            if any(kept[1] <= arrival and kept[2] <= legs for kept in profile):
+                continue
+            profile.append((first_departure, arrival, legs, path))
+        return [entry[3] for entry in profile]
+
+    def find_earliest_arrival(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+    ) -> Optional[List[int]]:
+        """Earliest-arrival query: path reaching the destination first"""
+        arrivals = self._scan(origin, destination, departure_date, max_flights)
+        if not arrivals:
+            return None
+        return min(
+            arrivals, key=lambda entry: (entry[1], -entry[0], entry[2])
+        )[3]
+
+    def _scan(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        max_flights: int,
+    ) -> List[Tuple[float, float, int, List[int]]]:
+        """
+        Scan the timetable from the first departure on the date
+
+        Returns (first departure, arrival, legs, path) for every label that
+        reaches the destination.
+        """
+        self.graph.check_airports(origin, destination)
+        if max_flights < 1 or origin == destination:
+            return []
+
+        flights = self.graph.flights
+        origin_id = flights.airport_id(origin)
+        destination_id = flights.airport_id(destination)
+        timetable = self.graph.connection_timetable
+        transfers = self.graph.transfer_index(
+            self.validator.min_connection_time,
+            self.validator.max_connection_time,
+        )
+        start, end = timetable.day_range(departure_date)
+
+        labels: Dict[int, Dict[int, _ScanLabel]] = {}
+        pending: Dict[int, Dict[int, _ScanLabel]] = {}
+        arrivals = []
+        for position in range(start, len(timetable)):
+            if position >= end and not pending:
+                break
+            flight_id = timetable.flight_ids[position]
+            flight_labels = pending.pop(flight_id, {})
+            if (
+                position < end
+                and flights.origins[flight_id] == origin_id
+                and self.validator.is_valid_departure_date(
+                    flights.departure_datetime(flight_id), departure_date
+                )
+            ):
+                flight_labels[1] = _ScanLabel(
+                    flights.departures[flight_id], None
+                )
+            if not flight_labels:
+                continue
+            labels[flight_id] = flight_labels
+
+            if flights.destinations[flight_id] == destination_id:
+                for legs, label in flight_labels.items():
+                    arrivals.append(
+                        (
+                            label.first_departure,
+                            flights.arrivals[flight_id],
+                            legs,
+                            self._build_path(labels, flight_id, legs),
+                        )
+                    )
+                continue
+
+            for legs, label in flight_labels.items():
+                if legs >= max_flights:
+                    continue
+                visited = self._visited_airports(labels, flight_id, legs)
+                for next_flight_id in transfers.transfers(flight_id):
+                    if flights.destinations[next_flight_id] in visited:
+                        continue
+                    next_labels = pending.setdefault(next_flight_id, {})
+                    current = next_labels.get(legs + 1)
+                    if (
+                        current is None
+                        or current.first_departure < label.first_departure
+                    ):
+                        next_labels[legs + 1] = _ScanLabel(
+                            label.first_departure, (flight_id, legs)
+                        )
+        return arrivals
+
+    def _visited_airports(
+        self,
+        labels: Dict[int, Dict[int, _ScanLabel]],
+        flight_id: int,
+        legs: int,
+    ) -> Set[int]:
+        """Airports visited by the path of a label, to keep paths simple"""
+        flights = self.graph.flights
+        visited = set()
+        for step in self._build_path(labels, flight_id, legs):
+            visited.add(flights.origins[step])
+            visited.add(flights.destinations[step])
+        return visited
+
+    def _build_path(
+        self,
+        labels: Dict[int, Dict[int, _ScanLabel]],
+        flight_id: int,
+        legs: int,
+    ) -> List[int]:
+        """Rebuild the path of a label following its parents"""
+        path = [flight_id]
+        parent = labels[flight_id][legs].parent
+        while parent is not None:
+            path.append(parent[0])
+            parent = labels[parent[0]][parent[1]].parent
+        path.reverse()
+        return path
@@ -5,6 +5,8 @@ from app.models.journey import Journey
 
 
 class TimeAndConnectionsSorter:
+    by_total_time = True
+
     def sort(self, journeys: List[Journey]) -> List[Journey]:
         def get_total_time(journey: Journey) -> timedelta:
             return (
@@ -1,11 +1,12 @@
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from fastapi import FastAPI
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
+from app.dependencies import create_graph_provider, create_http_client
 from app.routers.journey import router as journey_router
+from app.services.flight_events import FlightEventsAPIError
 
 
 load_dotenv()
@@ -13,10 +14,26 @@ load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    app.state.http_client = create_http_client()
+    app.state.graph_provider = create_graph_provider(app.state.http_client)
+    app.state.graph_provider.start()
     yield
+    await app.state.graph_provider.stop()
+    await app.state.http_client.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
 
+
+@app.exception_handler(FlightEventsAPIError)
+async def flight_events_unavailable(
+    request: Request, exc: FlightEventsAPIError
+) -> JSONResponse:
+    """No flight graph could be loaded yet"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+    )
+
+
 app.include_router(journey_router)
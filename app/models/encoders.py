@@ -0,0 +1,73 @@
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from pydantic_core import to_json
+
+from app.models.journey import Journey, JourneyQuery, PathFlight
+
+_path_flight_serializer = PathFlight.__pydantic_serializer__
+
+
+class JourneyEncoder:
+    """
+    Encodes journeys straight to the JSON bytes of their response models,
+    without validating them again.
+
+    Each flight is serialized once per encoder and its fragment is reused
+    by every journey sharing the same PathFlight, as the journeys of a
+    path builder do.
+    """
+
+    def __init__(self) -> None:
+        # The flight is kept with its fragment, so its id is not reused
+        self._fragments: Dict[int, Tuple[PathFlight, bytes]] = {}
+
+    def flight(self, flight: PathFlight) -> bytes:
+        """JSON of a flight, with the `from` alias"""
+        entry = self._fragments.get(id(flight))
+        if entry is None:
+            entry = (
+                flight,
+                _path_flight_serializer.to_json(flight, by_alias=True),
+            )
+            self._fragments[id(flight)] = entry
+        return entry[1]
+
+    def journey(self, journey: Journey) -> bytes:
+        """JSON of a journey"""
+        return b'{"connections":%d,"path":[%b]}' % (
+            journey.connections,
+            b",".join(map(self.flight, journey.path)),
+        )
+
+    def journeys(self, journeys: Iterable[Journey]) -> bytes:
+        """JSON array of journeys"""
+        return b"[%b]" % b",".join(map(self.journey, journeys))
+
+    def daily_journeys(
+        self, departure_date: date, journeys: Iterable[Journey]
+    ) -> bytes:
+        """JSON of the DailyJourneys of a date"""
+        return b'{"departure_date":%b,"journeys":%b}' % (
+            to_json(departure_date),
+            self.journeys(journeys),
+        )
+
+    def search_result(
+        self,
+        query: JourneyQuery,
+        journeys: Iterable[Journey],
+        error: Optional[str] = None,
+    ) -> bytes:
+        """JSON of the JourneySearchResult of a batch query"""
+        return (
+            b'{"from":%b,"to":%b,"departure_date":%b,"journeys":%b,'
+            b'"error":%b}'
+            % (
+                to_json(query.from_),
+                to_json(query.to),
+                to_json(query.departure_date),
+                self.journeys(journeys),
+                to_json(error),
+            )
+        )
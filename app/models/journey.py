@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import List, Optional
 from dataclasses import dataclass
 
 
@@ -21,3 +21,30 @@ class Journey:
 
     def __lt__(self, other: "Journey") -> bool:
         return self.connections < other.connections
+
+
+class DailyJourneys(BaseModel):
+    departure_date: date
+    journeys: List[Journey]
+
+
+class JourneyQuery(BaseModel):
+    from_: str = Field(..., alias="from")
+    to: str
+    departure_date: date
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class JourneySearchResult(JourneyQuery):
+    journeys: List[Journey] = []
+    error: Optional[str] = None
+
+
+class JourneyCacheStats(BaseModel):
+    hits: int
+    misses: int
+    entries: int
+    size_bytes: int
+    max_entries: int
+    max_bytes: int
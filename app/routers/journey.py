@@ -1,30 +1,209 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from datetime import date
+from typing import Iterable, List, Optional, Union
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    status,
+)
+from fastapi.responses import Response, StreamingResponse
+from datetime import date, timedelta
 
 from app.domain.journey.journey_finder import JourneyFinder
-from app.models.journey import Journey
-from app.dependencies import get_journey_finder
+from app.domain.journey.cache import JourneyCache
+from app.models.journey import (
+    DailyJourneys,
+    Journey,
+    JourneyCacheStats,
+    JourneyQuery,
+    JourneySearchResult,
+)
+from app.models.encoders import JourneyEncoder
+from app.dependencies import get_journey_cache, get_journey_finder
 from app.domain.flight_graph.exceptions import AirportNotFoundError
+from app.domain.journey.exceptions import (
+    InvalidCursorError,
+    StaleCursorError,
+)
 
 
 router = APIRouter(prefix="/journeys", tags=["journeys"])
 
+# Longest departure date range of a flexible-date search
+MAX_SEARCH_DAYS = 31
 
-@router.get("/search")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Response header with the cursor of the next page of a search
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _json(content: bytes) -> Response:
+    """Response with an already encoded JSON body"""
+    return Response(content=content, media_type="application/json")
+
+
+def _ndjson(items: Iterable[bytes]) -> StreamingResponse:
+    """Stream encoded items as newline delimited JSON, as they come"""
+    return StreamingResponse(
+        (item + b"\n" for item in items), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+@router.get(
+    "/search",
+    response_model=Union[List[Journey], List[DailyJourneys]],
+    responses={
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "headers": {
+                NEXT_CURSOR_HEADER: {
+                    "description": "Cursor of the next page, if any",
+                    "schema": {"type": "string"},
+                }
+            },
+        }
+    },
+)
 async def search_journeys(
     departure_date: date = Query(
         ..., description="Departure date (YYYY-MM-DD)"
     ),
     from_: str = Query(..., alias="from", description="Origin airport code"),
     to: str = Query(..., description="Destination airport code"),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum number of journeys to return"
+    ),
+    departure_date_to: Optional[date] = Query(
+        None, description="Search every departure date up to this one"
+    ),
+    flex_days: Optional[int] = Query(
+        None,
+        ge=0,
+        le=MAX_SEARCH_DAYS,
+        description="Also search this many days around the departure dates",
+    ),
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor of the next page, from the X-Next-Cursor header",
+    ),
+    accept: Optional[str] = Header(None),
     finder: JourneyFinder = Depends(get_journey_finder),
-) -> List[Journey]:
+) -> Response:
+    stream = accept is not None and NDJSON_MEDIA_TYPE in accept
+    encoder = JourneyEncoder()
     try:
-        return finder.find_journeys(
-            origin=from_, destination=to, departure_date=departure_date
-        )
+        if departure_date_to is None and flex_days is None:
+            if limit is None:
+                if cursor is not None:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail="cursor requires limit",
+                    )
+                journeys = finder.iter_journeys(
+                    origin=from_,
+                    destination=to,
+                    departure_date=departure_date,
+                )
+                if stream:
+                    return _ndjson(map(encoder.journey, journeys))
+                return _json(encoder.journeys(journeys))
+
+            page, next_cursor = finder.find_journeys_page(
+                origin=from_,
+                destination=to,
+                departure_date=departure_date,
+                limit=limit,
+                cursor=cursor,
+            )
+            response = (
+                _ndjson(map(encoder.journey, page))
+                if stream
+                else _json(encoder.journeys(page))
+            )
+            if next_cursor is not None:
+                response.headers[NEXT_CURSOR_HEADER] = next_cursor
+            return response
+
+        if cursor is not None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="cursor is not supported for date range searches",
+            )
+
+        window = timedelta(days=flex_days or 0)
+        try:
+            first_day = departure_date - window
+            last_day = (departure_date_to or departure_date) + window
+        except OverflowError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Date range exceeds the supported dates",
+            )
+        if last_day < first_day:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="departure_date_to must not precede departure_date",
+            )
+        if (last_day - first_day).days >= MAX_SEARCH_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Date range exceeds {MAX_SEARCH_DAYS} days",
+            )
+        days = [
+            encoder.daily_journeys(day, day_journeys)
+            for day, day_journeys in finder.find_journeys_by_day(
+                origin=from_,
+                destination=to,
+                first_day=first_day,
+                last_day=last_day,
+                limit=limit,
+            ).items()
+        ]
+        if stream:
+            return _ndjson(days)
+        return _json(b"[%b]" % b",".join(days))
     except AirportNotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=str(e)
         )
+    except StaleCursorError as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+
+
+@router.post("/search/batch", response_model=List[JourneySearchResult])
+async def search_journeys_batch(
+    queries: List[JourneyQuery],
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum number of journeys per query"
+    ),
+    finder: JourneyFinder = Depends(get_journey_finder),
+) -> Response:
+    results = finder.find_journeys_batch(
+        [(query.from_, query.to, query.departure_date) for query in queries],
+        limit=limit,
+    )
+    encoder = JourneyEncoder()
+    return _json(
+        b"[%b]"
+        % b",".join(
+            (
+                encoder.search_result(query, [], str(result))
+                if isinstance(result, AirportNotFoundError)
+                else encoder.search_result(query, result)
+            )
+            for query, result in zip(queries, results)
+        )
+    )
+
+
+@router.get("/cache/stats")
+async def journey_cache_stats(
+    cache: JourneyCache = Depends(get_journey_cache),
+) -> JourneyCacheStats:
+    return cache.stats()
@@ -1,4 +1,4 @@
-from .types import FlightEvent
+from .types import FlightEvent, FlightEventsFeed
 from .flight_events_api import FlightEventsAPIService
 from .exceptions import (
     FlightEventsAPIError,
@@ -14,3 +14,9 @@ class FlightEventsConfigError(FlightEventsError):
     """Raised when there's a configuration error"""
 
     pass
+
+
+class CircuitOpenError(FlightEventsAPIError):
+    """Raised when the API is not called because it keeps failing"""
+
+    pass
@@ -1,17 +1,217 @@
+import asyncio
 import httpx
-from typing import List
-from pydantic import ValidationError
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
 
-from .types import FlightEvent
+from .types import FlightEvent, FlightEventsFeed
 from .exceptions import FlightEventsAPIError
+from .json_stream import JSONArrayStream
+from .resilience import CircuitBreaker, HedgePolicy, RetryPolicy
+
+# Decodes and validates a whole response body in a single call
+_flight_events_adapter = TypeAdapter(List[FlightEvent])
 
 
 class FlightEventsAPIService:
     """Service to fetch flight events from external API"""
 
-    def __init__(self, api_url: str, timeout: float = 30.0):
+    def __init__(
+        self,
+        api_url: str,
+        timeout: float = 30.0,
+        client: Optional[httpx.AsyncClient] = None,
+        window_days: int = 0,
+        horizon_days: int = 30,
+        concurrency: int = 4,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        window_params: Tuple[str, str] = ("departure_from", "departure_to"),
+    ):
+        """
+        Args:
+            api_url: URL of the flight events feed
+            timeout: Request timeout when no client is given
+            client: Shared client, reused across calls and never closed
+                by the service. Its own timeouts apply.
+            window_days: Days of departures per request when fetching the
+                feed in date windows, 0 fetches it in a single request
+            horizon_days: Days of departures fetched in date windows,
+                starting today
+            concurrency: Maximum date windows fetched at once
+            retry: Retries of requests failing with a connection or
+                server error, 2 with jittered backoff by default
+            hedge: Send a duplicate of requests slower than usual
+            breaker: Stop calling the API while it keeps failing
+            window_params: Query parameters with the first and last
+                departure date of a window
+        """
         self.api_url = api_url
         self.timeout = timeout
+        self.client = client
+        self.window_days = window_days
+        self.horizon_days = horizon_days
+        self.concurrency = concurrency
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.hedge = hedge
+        self.breaker = breaker if breaker is not None else CircuitBreaker(0)
+        self.window_params = window_params
+
+    @asynccontextmanager
+    async def _get_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Shared client if there is one, or a client for a single call"""
+        if self.client is not None:
+            yield self.client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+
+    @property
+    def _request_options(self) -> Dict[str, Any]:
+        """Request arguments, none when the shared client's timeouts apply"""
+        if self.client is not None:
+            return {}
+        return {"timeout": self.timeout}
+
+    @property
+    def circuit_open(self) -> bool:
+        """Whether calls to the API are currently rejected"""
+        return self.breaker.is_open
+
+    async def _get(
+        self, client: httpx.AsyncClient, **kwargs: Any
+    ) -> httpx.Response:
+        """
+        GET the feed with the retry, hedging and circuit breaker policies
+
+        Connection errors and 5xx responses are failures. The response of
+        the last attempt is returned, so its status still has to be
+        checked.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            httpx.TransportError: If the last attempt failed to connect
+        """
+        self.breaker.check()
+        attempt = 0
+        while True:
+            try:
+                response = await self._hedged_get(client, **kwargs)
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                if not self._can_retry(attempt):
+                    raise
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if not self._can_retry(attempt):
+                    return response
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+    @asynccontextmanager
+    async def _stream(
+        self, client: httpx.AsyncClient
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Streamed GET of the feed with the retry and circuit breaker policies
+
+        Like _get, failing attempts are retried until the response
+        headers arrive, and the status still has to be checked. The body
+        is then read by the caller: a connection error while reading it
+        counts as a failure but is not retried, and success is recorded
+        once it was fully read. Streams are not hedged, as a duplicate
+        request would download the whole body again.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            httpx.TransportError: If the last attempt failed to connect
+        """
+        self.breaker.check()
+        attempt = 0
+        while True:
+            request = client.build_request(
+                "GET", self.api_url, **self._request_options
+            )
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                if not self._can_retry(attempt):
+                    raise
+            else:
+                if response.status_code < 500:
+                    break
+                self.breaker.record_failure()
+                if not self._can_retry(attempt):
+                    break
+                await response.aclose()
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+        try:
+            yield response
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        else:
+            if response.status_code < 500:
+                self.breaker.record_success()
+        finally:
+            await response.aclose()
+
+    def _can_retry(self, attempt: int) -> bool:
+        return attempt < self.retry.retries and not self.breaker.is_open
+
+    async def _hedged_get(
+        self, client: httpx.AsyncClient, **kwargs: Any
+    ) -> httpx.Response:
+        """GET the feed, sending a duplicate request if it is too slow"""
+        kwargs = {**self._request_options, **kwargs}
+        started = time.monotonic()
+        delay = self.hedge.delay() if self.hedge is not None else None
+        if delay is None:
+            response = await client.get(self.api_url, **kwargs)
+        else:
+            response = await self._race(client, delay, **kwargs)
+        if self.hedge is not None:
+            self.hedge.record(time.monotonic() - started)
+        return response
+
+    async def _race(
+        self, client: httpx.AsyncClient, delay: float, **kwargs: Any
+    ) -> httpx.Response:
+        """First successful response of a request and its late duplicate"""
+        pending = {asyncio.create_task(client.get(self.api_url, **kwargs))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                pending.add(
+                    asyncio.create_task(client.get(self.api_url, **kwargs))
+                )
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    if error is None:
+                        raise FlightEventsAPIError(
+                            "Hedged request finished without a response"
+                        )
+                    raise error
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def get_flight_events(self) -> List[FlightEvent]:
         """
@@ -20,15 +220,112 @@ class FlightEventsAPIService:
         Raises:
             FlightEventsAPIError: If there's an error with the API
         """
+        feed = await self.fetch_flight_events()
+        return feed.events or []
+
+    async def fetch_flight_events(
+        self, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> FlightEventsFeed:
+        """
+        Conditionally get flight events from the API
+
+        Args:
+            etag: ETag of the last feed, sent as If-None-Match
+            last_modified: Last-Modified of the last feed, sent as
+                If-Modified-Since
+
+        Returns:
+            The feed and its validators, without events if the API answered
+            304 Not Modified. Feeds fetched in date windows have no
+            validators.
+
+        Raises:
+            FlightEventsAPIError: If there's an error with the API
+        """
+        if self.window_days > 0:
+            today = datetime.now(timezone.utc).date()
+            return FlightEventsFeed(
+                events=await self.fetch_flight_events_between(
+                    today, today + timedelta(days=self.horizon_days - 1)
+                )
+            )
+
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.api_url, timeout=self.timeout)
+            async with self._get_client() as client:
+                response = await self._get(client, headers=headers)
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    return FlightEventsFeed(
+                        events=None, etag=etag, last_modified=last_modified
+                    )
                 response.raise_for_status()
 
-                raw_events = response.json()
-                return [
-                    FlightEvent.model_validate(event) for event in raw_events
+                return FlightEventsFeed(
+                    events=_flight_events_adapter.validate_json(
+                        response.content
+                    ),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+
+        except httpx.HTTPError as e:
+            raise FlightEventsAPIError(
+                f"Error fetching flight events: {str(e)}"
+            )
+        except ValidationError as e:
+            raise FlightEventsAPIError(
+                f"Error validating flight events: {str(e)}"
+            )
+
+    async def fetch_flight_events_between(
+        self, first_day: date, last_day: date
+    ) -> List[FlightEvent]:
+        """
+        Get the flights departing between two dates, both included
+
+        The range is split in windows of window_days (a single window if
+        it is 0) that are fetched concurrently, at most concurrency at a
+        time. A failed window is retried on its own, and events are
+        returned in window order.
+
+        Raises:
+            FlightEventsAPIError: If a window still fails after its retries
+        """
+        days = (last_day - first_day).days + 1
+        size = self.window_days or days
+        windows = [
+            (
+                first_day + timedelta(days=start),
+                first_day + timedelta(days=min(start + size, days) - 1),
+            )
+            for start in range(0, days, size)
+        ]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        try:
+            async with self._get_client() as client:
+
+                async def fetch(
+                    window: Tuple[date, date],
+                ) -> List[FlightEvent]:
+                    async with semaphore:
+                        return await self._fetch_window(client, *window)
+
+                tasks = [
+                    asyncio.create_task(fetch(window)) for window in windows
                 ]
+                try:
+                    chunks = await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
 
         except httpx.HTTPError as e:
             raise FlightEventsAPIError(
@@ -38,3 +335,60 @@ class FlightEventsAPIService:
             raise FlightEventsAPIError(
                 f"Error validating flight events: {str(e)}"
             )
+        return [event for chunk in chunks for event in chunk]
+
+    async def _fetch_window(
+        self, client: httpx.AsyncClient, first_day: date, last_day: date
+    ) -> List[FlightEvent]:
+        """Flights of a date window"""
+        start_param, end_param = self.window_params
+        params = {
+            start_param: first_day.isoformat(),
+            end_param: last_day.isoformat(),
+        }
+        response = await self._get(client, params=params)
+        response.raise_for_status()
+        events = _flight_events_adapter.validate_json(response.content)
+        # Windows may overlap if the API ignores the dates, keep each
+        # event in the window of its (local) departure date only
+        return [
+            event
+            for event in events
+            if first_day <= event.departure_datetime.date() <= last_day
+        ]
+
+    async def stream_flight_events(self) -> AsyncIterator[FlightEvent]:
+        """
+        Stream flight events from the API as the response arrives
+
+        The body is parsed a chunk at a time and every event is validated
+        and yielded as soon as it is complete, so the whole feed is never
+        held in memory. The request is retried and counted by the circuit
+        breaker until the body starts, but not hedged.
+
+        Raises:
+            FlightEventsAPIError: If there's an error with the API
+        """
+        parser = JSONArrayStream()
+        try:
+            async with self._get_client() as client:
+                async with self._stream(client) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        for event in parser.feed(chunk):
+                            yield FlightEvent.model_validate(event)
+            for event in parser.close():
+                yield FlightEvent.model_validate(event)
+
+        except httpx.HTTPError as e:
+            raise FlightEventsAPIError(
+                f"Error fetching flight events: {str(e)}"
+            )
+        except ValidationError as e:
+            raise FlightEventsAPIError(
+                f"Error validating flight events: {str(e)}"
+            )
+        except ValueError as e:
+            raise FlightEventsAPIError(
+                f"Error parsing flight events: {str(e)}"
+            )
@@ -0,0 +1,105 @@
+import codecs
+import json
+from typing import Any, List
+
+# Characters that can continue a number cut at the end of a chunk
+_NUMBER_CONTINUATION = set(".eE+-0123456789")
+
+
+class JSONArrayStream:
+    """
+    Incremental parser of a top level JSON array.
+
+    Bytes are fed as they arrive and every complete element is returned
+    as soon as it is parsed, so only the current partial element is kept
+    in memory.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self._empty = True
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """
+        Parse a chunk of the array and return its complete elements
+
+        Raises:
+            ValueError: If the data is not a JSON array
+        """
+        self._buffer += self._text.decode(chunk)
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        """
+        Parse the remaining data once the input is exhausted
+
+        Raises:
+            ValueError: If the array is incomplete or malformed
+        """
+        self._buffer += self._text.decode(b"", final=True)
+        elements = self._parse(final=True)
+        if not self._finished:
+            raise ValueError("Unexpected end of JSON array")
+        return elements
+
+    def _skip_whitespace(self, position: int) -> int:
+        while position < len(self._buffer) and self._buffer[position] in (
+            " \t\n\r"
+        ):
+            position += 1
+        return position
+
+    def _parse(self, final: bool) -> List[Any]:
+        elements: List[Any] = []
+        position = self._skip_whitespace(0)
+        if not self._started:
+            if position == len(self._buffer):
+                self._buffer = ""
+                return elements
+            if self._buffer[position] != "[":
+                raise ValueError("Expected a JSON array")
+            self._started = True
+            position = self._skip_whitespace(position + 1)
+
+        while not self._finished and position < len(self._buffer):
+            if self._empty and self._buffer[position] == "]":
+                self._finished = True
+                position += 1
+                break
+            try:
+                element, end = self._decoder.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # Partial element, wait for more data
+            # A number may continue in the next chunk, so an element is
+            # only complete once the separator after it has arrived
+            if (
+                not final
+                and isinstance(element, (int, float))
+                and self._buffer[end : end + 1] in _NUMBER_CONTINUATION
+            ):
+                break
+            separator = self._skip_whitespace(end)
+            if separator == len(self._buffer):
+                if final:
+                    raise ValueError("Unexpected end of JSON array")
+                break
+            if self._buffer[separator] == "]":
+                self._finished = True
+            elif self._buffer[separator] != ",":
+                raise ValueError(
+                    f"Expected ',' or ']' at position {separator}"
+                )
+            elements.append(element)
+            self._empty = False
+            position = self._skip_whitespace(separator + 1)
+
+        if self._finished and self._buffer[position:].strip():
+            raise ValueError("Extra data after JSON array")
+        self._buffer = self._buffer[position:]
+        return elements
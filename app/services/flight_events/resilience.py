@@ -0,0 +1,101 @@
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+from .exceptions import CircuitOpenError
+
+
+@dataclass
+class RetryPolicy:
+    """Retries with exponential backoff and full jitter"""
+
+    retries: int = 2
+    backoff: float = 0.5
+    max_backoff: float = 10.0
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after a failed attempt, counted from 0"""
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2**attempt)
+        )
+
+
+class HedgePolicy:
+    """
+    Decides when to send a duplicate of a slow request.
+
+    Keeps the latencies of recent requests and hedges once a request
+    takes longer than the given percentile of them. Nothing is hedged
+    until enough latencies are known.
+    """
+
+    def __init__(
+        self, percentile: float = 95, min_samples: int = 20, window: int = 200
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        """Add the latency of a completed request, in seconds"""
+        self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """Seconds before hedging a request, None to not hedge it"""
+        if len(self._latencies) < max(self.min_samples, 1):
+            return None
+        latencies = sorted(self._latencies)
+        rank = math.ceil(self.percentile / 100 * len(latencies)) - 1
+        return latencies[min(max(rank, 0), len(latencies) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing API for a while.
+
+    The circuit opens after failure_threshold consecutive failures and
+    rejects calls for reset_timeout seconds. The next call is then let
+    through: a success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        """
+        Args:
+            failure_threshold: Consecutive failures opening the circuit,
+                0 never opens it
+            reset_timeout: Seconds the circuit stays open
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return (
+            self._opened_at is not None
+            and time.monotonic() - self._opened_at < self.reset_timeout
+        )
+
+    def check(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If calls are currently rejected
+        """
+        if self.is_open:
+            raise CircuitOpenError(
+                f"Flight events API unavailable after {self.failures} "
+                "consecutive failures"
+            )
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if 0 < self.failure_threshold <= self.failures:
+            self._opened_at = time.monotonic()
@@ -1,4 +1,6 @@
+from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -8,3 +10,16 @@ class FlightEvent(BaseModel):
     arrival_city: str
     departure_datetime: datetime
     arrival_datetime: datetime
+
+
+@dataclass
+class FlightEventsFeed:
+    """Flight events of a feed response and its cache validators"""
+
+    events: Optional[List[FlightEvent]]  # None if the feed did not change
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.events is None
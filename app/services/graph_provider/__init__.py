@@ -0,0 +1,2 @@
+from .provider import FlightGraphProvider
+from .shared import SharedFlightGraphProvider
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from app.domain.flight_graph import FlightGraph
+from app.domain.flight_graph.exceptions import SnapshotError
+from app.services.flight_events import (
+    FlightEvent,
+    FlightEventsAPIError,
+    FlightEventsAPIService,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FlightGraphProvider:
+    """
+    Keeps the flight graph of the app and refreshes it from the API.
+
+    Refreshes send the ETag and Last-Modified of the last feed, so an
+    unchanged feed costs a 304 and no rebuild. With delta updates, a
+    changed feed is diffed against the current graph, and the new graph
+    only reindexes the airports of the flights that were added, changed
+    or removed.
+
+    Once started, a background task refreshes the graph before it
+    expires, and a single refresh runs at a time. New graphs are built
+    in a worker thread, so the event loop keeps serving requests, and
+    never by modifying the current graph: requests holding it are not
+    affected, and the complete new graph replaces it in one assignment.
+
+    With a snapshot path, every new graph is saved to disk and the last
+    snapshot is loaded on start, so requests are served right away while
+    the first refresh runs.
+    """
+
+    def __init__(
+        self,
+        service: FlightEventsAPIService,
+        ttl: float = 600,
+        connection_windows: Sequence[Tuple[timedelta, timedelta]] = (),
+        delta: bool = True,
+        stream: bool = False,
+        refresh_ahead: float = 60,
+        retry_interval: float = 30,
+        snapshot_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            service: Source of flight events
+            ttl: Seconds before the graph is refreshed
+            connection_windows: (min, max) connection times to build
+                transfer indexes for
+            delta: Derive the graph of a changed feed from the current
+                one instead of building it from scratch
+            stream: Build the graph while the feed is downloaded. Full
+                rebuild on every refresh, without conditional requests.
+            refresh_ahead: Seconds before expiry the background task
+                refreshes the graph
+            retry_interval: Seconds before the background task retries a
+                failed refresh
+            snapshot_path: File to save graph snapshots to and to warm
+                start from
+        """
+        self.service = service
+        self.ttl = ttl
+        self.connection_windows = connection_windows
+        self.delta = delta
+        self.stream = stream
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self.snapshot_path = snapshot_path
+        self.graph: Optional[FlightGraph] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task[FlightGraph]] = None
+        self._background_task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    async def get_graph(self) -> FlightGraph:
+        """
+        Current graph
+
+        Only the first call waits for the graph to be built. Once it
+        expired, the graph is still returned while a refresh runs, and
+        the last good graph keeps being served while the API circuit is
+        open.
+        """
+        if self.graph is None:
+            return await self.refresh()
+        if (
+            self.is_expired
+            and self._refresh_task is None
+            and not self.service.circuit_open
+        ):
+            self._start_refresh()
+        return self.graph
+
+    async def refresh(self) -> FlightGraph:
+        """
+        Fetch the feed and update the graph, joining a running refresh
+
+        Raises:
+            FlightEventsAPIError: If there's an error with the API
+        """
+        task = self._refresh_task or self._start_refresh()
+        # Cancelling a waiting request must not cancel the shared refresh
+        return await asyncio.shield(task)
+
+    def start(self) -> None:
+        """Load the last snapshot and start refreshing in the background"""
+        if self.graph is None and self.snapshot_path:
+            self.load_snapshot(self.snapshot_path)
+        if self._background_task is None:
+            self._background_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background refresh and any refresh in flight"""
+        for task in (self._background_task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError, FlightEventsAPIError):
+                    await task
+        self._background_task = None
+        self._refresh_task = None
+
+    def load_snapshot(self, path: str) -> bool:
+        """
+        Serve the graph of a snapshot until the next refresh
+
+        The snapshot is still refreshed conditionally, with the feed
+        validators saved along with it. Returns False if the snapshot is
+        missing or invalid.
+        """
+        try:
+            graph, metadata = FlightGraph.load_snapshot(path)
+        except SnapshotError as e:
+            logger.warning("Flight graph snapshot not loaded: %s", e)
+            return False
+        self.graph = graph
+        self.etag = metadata.get("etag")
+        self.last_modified = metadata.get("last_modified")
+        self._expires_at = 0.0
+        return True
+
+    async def _save_snapshot(self, graph: FlightGraph) -> bool:
+        if not self.snapshot_path:
+            return False
+        metadata = {"etag": self.etag, "last_modified": self.last_modified}
+        try:
+            await asyncio.to_thread(
+                graph.save_snapshot, self.snapshot_path, metadata
+            )
+        except OSError as e:
+            logger.warning("Flight graph snapshot not saved: %s", e)
+            return False
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            delay = self._expires_at - self.refresh_ahead - time.monotonic()
+            await asyncio.sleep(max(delay, 0))
+            try:
+                await self.refresh()
+            except FlightEventsAPIError:
+                # Already logged when the refresh finished
+                await asyncio.sleep(self.retry_interval)
+
+    def _start_refresh(self) -> "asyncio.Task[FlightGraph]":
+        task = asyncio.create_task(self._refresh())
+        task.add_done_callback(self._refresh_done)
+        self._refresh_task = task
+        return task
+
+    def _refresh_done(self, task: "asyncio.Task[FlightGraph]") -> None:
+        self._refresh_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Flight graph refresh failed: %s", task.exception())
+
+    async def _refresh(self) -> FlightGraph:
+        previous = self.graph
+        if self.stream:
+            # Each event is added as it arrives, so the feed is never held
+            # in memory. The graph is not shared until it is indexed.
+            graph = FlightGraph()
+            async for event in self.service.stream_flight_events():
+                graph.add_flight(event)
+            await asyncio.to_thread(self._index_graph, graph)
+        else:
+            graph = await self._fetch_graph()
+        self.graph = graph
+        self._expires_at = time.monotonic() + self.ttl
+        if previous is None or graph.version != previous.version:
+            await self._save_snapshot(graph)
+        return graph
+
+    async def _fetch_graph(self) -> FlightGraph:
+        """Conditionally fetch the feed and build its graph"""
+        has_graph = self.graph is not None
+        feed = await self.service.fetch_flight_events(
+            etag=self.etag if has_graph else None,
+            last_modified=self.last_modified if has_graph else None,
+        )
+        if self.graph is not None and feed.not_modified:
+            self.etag = feed.etag or self.etag
+            self.last_modified = feed.last_modified or self.last_modified
+            return self.graph
+        self.etag = feed.etag
+        self.last_modified = feed.last_modified
+        return await asyncio.to_thread(
+            self._build_graph,
+            self.graph if self.delta else None,
+            feed.events or [],
+        )
+
+    def _build_graph(
+        self, previous: Optional[FlightGraph], events: List[FlightEvent]
+    ) -> FlightGraph:
+        """
+        Build the graph of a feed, derived from the previous one if given
+
+        Runs in a worker thread. The previous graph is only read, and the
+        new one is complete, version included, when it is returned.
+        """
+        if previous is not None:
+            graph, _ = previous.with_flights(events, self.connection_windows)
+        else:
+            graph = FlightGraph()
+            graph.add_flights(events, self.connection_windows)
+        # The version fingerprints every flight, so it is computed here
+        # rather than on the event loop
+        logger.debug("Flight graph %x built", graph.version)
+        return graph
+
+    def _index_graph(self, graph: FlightGraph) -> None:
+        """Build the indexes and version of a streamed graph, in a thread"""
+        graph.build_indexes(self.connection_windows)
+        logger.debug("Flight graph %x built", graph.version)
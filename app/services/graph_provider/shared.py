@@ -0,0 +1,163 @@
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from contextlib import suppress
+from typing import Any, Optional
+
+from app.domain.flight_graph import FlightGraph
+from app.services.flight_events import (
+    FlightEventsAPIError,
+    FlightEventsAPIService,
+)
+from .provider import FlightGraphProvider
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFlightGraphProvider(FlightGraphProvider):
+    """
+    Flight graph shared by the worker processes of a host.
+
+    The worker holding an exclusive lock on the snapshot refreshes the
+    graph as a FlightGraphProvider, publishes every new graph as a
+    snapshot and then bumps a generation counter. The other workers never
+    call the API: they memory-map the published snapshot, so its pages
+    are shared through the page cache instead of copied, and reload it
+    when the generation changes. When the leader exits, its lock is
+    released and the next worker polling takes over.
+    """
+
+    def __init__(
+        self,
+        service: FlightEventsAPIService,
+        snapshot_path: str,
+        poll_interval: float = 1.0,
+        wait_timeout: float = 30.0,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            service: Source of flight events
+            snapshot_path: Snapshot shared by the workers. The lock and
+                generation files are created next to it.
+            poll_interval: Seconds between checks of the generation, and
+                attempts to take over the refresh
+            wait_timeout: Seconds a request waits for the first snapshot
+                before failing
+            kwargs: Refresh settings of FlightGraphProvider
+        """
+        super().__init__(service, snapshot_path=snapshot_path, **kwargs)
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.generation = 0
+        self._snapshot_path = snapshot_path
+        self._lock_file: Optional[int] = None
+        self._follow_task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this worker refreshes the graph"""
+        return self._lock_file is not None
+
+    @property
+    def generation_path(self) -> str:
+        return f"{self._snapshot_path}.generation"
+
+    async def get_graph(self) -> FlightGraph:
+        """
+        Current graph
+
+        Workers that do not refresh the graph wait for the first snapshot
+        to be published, up to wait_timeout.
+
+        Raises:
+            FlightEventsAPIError: If no snapshot was published in time
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while not self.is_leader:
+            if self.graph is not None:
+                return self.graph
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FlightEventsAPIError(
+                    "No flight graph was published by the refreshing worker"
+                )
+            await asyncio.sleep(min(self.poll_interval, remaining))
+        return await super().get_graph()
+
+    def start(self) -> None:
+        """Take the refresh over if possible, or follow the leader"""
+        if self._follow_task is not None:
+            return
+        if self._acquire_lock():
+            super().start()
+        else:
+            self._follow_task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        """Stop refreshing or following, releasing the lock if held"""
+        if self._follow_task is not None:
+            self._follow_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._follow_task
+            self._follow_task = None
+        await super().stop()
+        if self._lock_file is not None:
+            os.close(self._lock_file)
+            self._lock_file = None
+
+    def _acquire_lock(self) -> bool:
+        lock_file = os.open(
+            f"{self._snapshot_path}.lock", os.O_CREAT | os.O_RDWR
+        )
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_file)
+            return False
+        self._lock_file = lock_file
+        logger.info("Worker %s refreshes the flight graph", os.getpid())
+        return True
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self.generation_path) as file:
+                return int(file.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    async def _reload(self) -> None:
+        """
+        Load the published snapshot if its generation changed
+
+        Loading checksums the whole snapshot, so it runs in a worker
+        thread to keep the event loop serving requests.
+        """
+        generation = self._read_generation()
+        if generation == 0 or generation == self.generation:
+            return
+        if await asyncio.to_thread(self.load_snapshot, self._snapshot_path):
+            self.generation = generation
+
+    async def _follow(self) -> None:
+        while True:
+            await self._reload()
+            if self._acquire_lock():
+                self._follow_task = None
+                super().start()
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _save_snapshot(self, graph: FlightGraph) -> bool:
+        if not await super()._save_snapshot(graph):
+            return False
+        # Published after the snapshot was replaced, so followers never
+        # load an older snapshot for a newer generation
+        self.generation = self._read_generation() + 1
+        temporary_path = f"{self.generation_path}.{os.getpid()}"
+        with open(temporary_path, "w") as file:
+            file.write(str(self.generation))
+        os.replace(temporary_path, self.generation_path)
+        return True
@@ -0,0 +1,83 @@
+"""
+Compare per-event and bulk validation of a flight events feed.
+
+Usage:
+    python -m benchmarks.flight_events_validation [--events 100000]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.services.flight_events import FlightEvent
+
+AIRPORTS = ["BUE", "MAD", "LON", "PAR", "BER", "ROM", "NYC", "MIA"]
+
+flight_events_adapter = TypeAdapter(List[FlightEvent])
+
+
+def build_feed(events: int) -> bytes:
+    """Raw JSON body with the given number of flight events"""
+    start = datetime(2024, 9, 12)
+    feed = []
+    for index in range(events):
+        departure = start + timedelta(minutes=7 * index)
+        feed.append(
+            {
+                "flight_number": f"XX{index}",
+                "departure_city": AIRPORTS[index % len(AIRPORTS)],
+                "arrival_city": AIRPORTS[(index + 3) % len(AIRPORTS)],
+                "departure_datetime": departure.isoformat(),
+                "arrival_datetime": (
+                    departure + timedelta(hours=2)
+                ).isoformat(),
+            }
+        )
+    return json.dumps(feed).encode()
+
+
+def validate_per_event(content: bytes) -> List[FlightEvent]:
+    """Previous decoder: json parsing plus one model_validate per event"""
+    return [FlightEvent.model_validate(event) for event in json.loads(content)]
+
+
+def validate_bulk(content: bytes) -> List[FlightEvent]:
+    """Single TypeAdapter call over the raw bytes"""
+    return flight_events_adapter.validate_json(content)
+
+
+def measure(
+    decoder: Callable[[bytes], List[FlightEvent]], content: bytes, runs: int
+) -> float:
+    """Best wall time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        decoder(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    content = build_feed(args.events)
+    assert validate_bulk(content) == validate_per_event(content)
+
+    per_event = measure(validate_per_event, content, args.runs)
+    bulk = measure(validate_bulk, content, args.runs)
+    print(f"events:     {args.events}")
+    print(f"per event:  {per_event * 1000:.1f} ms")
+    print(f"bulk:       {bulk * 1000:.1f} ms")
+    print(f"speedup:    {per_event / bulk:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare building a flight graph one flight at a time and in bulk.
+
+Usage:
+    python -m benchmarks.graph_build [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from app.domain.flight_graph import FlightGraph
+from app.services.flight_events import FlightEvent
+
+AIRPORTS = [f"A{index:02d}" for index in range(60)]
+CONNECTION_WINDOWS = [(timedelta(hours=1), timedelta(hours=4))]
+
+
+def build_flights(count: int) -> List[FlightEvent]:
+    """Random flights over a month, 1% of them repeated"""
+    rng = random.Random(count)
+    start = datetime(2024, 9, 1)
+    flights = []
+    for index in range(count):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        departure = start + timedelta(minutes=rng.randrange(30 * 24 * 60))
+        flights.append(
+            FlightEvent(
+                flight_number=f"XX{index % (count // 2 or 1)}",
+                departure_city=origin,
+                arrival_city=destination,
+                departure_datetime=departure,
+                arrival_datetime=departure
+                + timedelta(minutes=rng.randrange(60, 900)),
+            )
+        )
+    flights.extend(rng.sample(flights, count // 100))
+    return flights
+
+
+def build_per_flight(flights: List[FlightEvent]) -> FlightGraph:
+    """Previous construction: add_flight per event, then the indexes"""
+    graph = FlightGraph()
+    for flight in flights:
+        graph.add_flight(flight)
+    graph.build_indexes(CONNECTION_WINDOWS)
+    return graph
+
+
+def build_bulk(flights: List[FlightEvent]) -> FlightGraph:
+    """Single add_flights call"""
+    graph = FlightGraph()
+    graph.add_flights(flights, CONNECTION_WINDOWS)
+    return graph
+
+
+def measure(
+    builder: Callable[[List[FlightEvent]], FlightGraph],
+    flights: List[FlightEvent],
+) -> float:
+    """Wall time of a build, in seconds"""
+    start = time.perf_counter()
+    builder(flights)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    print(f"{'flights':>10} {'per flight':>12} {'bulk':>10} {'speedup':>8}")
+    for size in map(int, args.sizes.split(",")):
+        flights = build_flights(size)
+        assert build_bulk(flights).version == build_per_flight(flights).version
+        per_flight = measure(build_per_flight, flights)
+        bulk = measure(build_bulk, flights)
+        print(
+            f"{size:>10} {per_flight:>11.2f}s {bulk:>9.2f}s "
+            f"{per_flight / bulk:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
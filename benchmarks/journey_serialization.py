@@ -0,0 +1,132 @@
+"""
+Compare validated and pre-encoded serialization of journey responses.
+
+Usage:
+    python -m benchmarks.journey_serialization [--journeys 20000]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, List
+
+from pydantic import TypeAdapter
+
+from app.domain.flight_graph import FlightGraph
+from app.domain.journey.builders import DefaultJourneyPathBuilder
+from app.models.encoders import JourneyEncoder
+from app.models.journey import Journey, PathFlight
+from app.services.flight_events import FlightEvent
+
+AIRPORTS = ["BUE", "MAD", "LON", "PAR", "BER", "ROM", "NYC", "MIA"]
+
+journeys_adapter = TypeAdapter(List[Journey])
+
+
+def build_graph(flights: int) -> FlightGraph:
+    """Graph with the given number of flights between a few airports"""
+    graph = FlightGraph()
+    start = datetime(2024, 9, 12)
+    events = []
+    for index in range(flights):
+        departure = start + timedelta(minutes=7 * index)
+        events.append(
+            FlightEvent(
+                flight_number=f"XX{index}",
+                departure_city=AIRPORTS[index % len(AIRPORTS)],
+                arrival_city=AIRPORTS[(index + 3) % len(AIRPORTS)],
+                departure_datetime=departure,
+                arrival_datetime=departure + timedelta(hours=2),
+            )
+        )
+    graph.add_flights(events)
+    return graph
+
+
+def validated_response(graph: FlightGraph, paths: List[List[int]]) -> bytes:
+    """Previous path: validated PathFlights, then FastAPI serialization"""
+    flights = graph.flights
+    journeys = [
+        Journey(
+            connections=len(path) - 1,
+            path=[
+                PathFlight.model_validate(
+                    {
+                        "flight_number": flights.flight_number(flight_id),
+                        "from": flights.origin(flight_id),
+                        "to": flights.destination(flight_id),
+                        "departure_time": flights.departure_datetime(
+                            flight_id
+                        ),
+                        "arrival_time": flights.arrival_datetime(flight_id),
+                    }
+                )
+                for flight_id in path
+            ],
+        )
+        for path in paths
+    ]
+    content = journeys_adapter.validate_python(journeys)
+    return json.dumps(
+        journeys_adapter.dump_python(content, mode="json", by_alias=True),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode()
+
+
+def encoded_response(graph: FlightGraph, paths: List[List[int]]) -> bytes:
+    """Constructed PathFlights, encoded with reused flight fragments"""
+    builder = DefaultJourneyPathBuilder()
+    journeys = [
+        Journey(
+            connections=len(path) - 1, path=builder.build_path(path, graph)
+        )
+        for path in paths
+    ]
+    return JourneyEncoder().journeys(journeys)
+
+
+def measure(
+    encode: Callable[[FlightGraph, List[List[int]]], Any],
+    graph: FlightGraph,
+    paths: List[List[int]],
+    runs: int,
+) -> float:
+    """Best wall time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        encode(graph, paths)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--journeys", type=int, default=20_000)
+    parser.add_argument("--flights", type=int, default=2_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    graph = build_graph(args.flights)
+    generator = random.Random(0)
+    paths = [
+        generator.sample(range(args.flights), generator.randint(1, 3))
+        for _ in range(args.journeys)
+    ]
+    assert validated_response(graph, paths) == encoded_response(graph, paths)
+
+    validated = measure(validated_response, graph, paths, args.runs)
+    encoded = measure(encoded_response, graph, paths, args.runs)
+    print(f"journeys:   {args.journeys}")
+    print(f"validated:  {validated * 1000:.1f} ms")
+    print(f"encoded:    {encoded * 1000:.1f} ms")
+    print(f"speedup:    {validated / encoded:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
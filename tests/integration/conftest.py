@@ -1,7 +1,6 @@
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
+from app.dependencies import create_graph_provider, create_http_client
 from app.main import app
 
 TEST_API_BASE_URL = "http://test"
@@ -9,8 +8,12 @@ TEST_API_BASE_URL = "http://test"
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def setup_test_cache():
-    FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    app.state.http_client = create_http_client()
+    app.state.graph_provider = create_graph_provider(app.state.http_client)
+    app.state.graph_provider.start()
     yield
+    await app.state.graph_provider.stop()
+    await app.state.http_client.aclose()
 
 
 @pytest_asyncio.fixture(scope="session")
@@ -1,10 +1,10 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List
 from app.domain.flight_graph import FlightGraph
 from app.services.flight_events import FlightEvent
 from app.domain.flight_graph.exceptions import (
-    EdgeNotFoundError,
+    FlightNotFoundError,
     AirportNotFoundError,
 )
 
@@ -37,60 +37,54 @@ def test_multiple_flights_same_route(flight_graph_with_flights: FlightGraph):
 
 
 def test_edge_key_uniqueness(flight_graph_with_flights: FlightGraph):
-    """Should create unique keys for flights with correct format"""
-    edges = list(flight_graph_with_flights.graph.edges(keys=True, data=True))
-
-    # Check key format: {flight_number}_{departure_datetime_iso}
-    for edge in edges:
-        key = edge[2]
+    """Should key edges by dense integer flight ids"""
+    edges = list(flight_graph_with_flights.graph.edges(keys=True))
 
-        flight = edge[3]["flight_event"]  # edge[3] is the data dict
-        expected_key = (
-            f"{flight.flight_number}_{flight.departure_datetime.isoformat()}"
-        )
-        assert key == expected_key
+    assert sorted(key for _, _, key in edges) == list(range(7))
+    for origin, destination, key in edges:
+        flight = flight_graph_with_flights.get_flight_details(key)
+        assert flight.departure_city == origin
+        assert flight.arrival_city == destination
 
 
 def test_get_flight_details(flight_graph_with_flights: FlightGraph):
     """Should get flight details correctly"""
-    edges = list(flight_graph_with_flights.graph.edges(keys=True))
-
-    flight = flight_graph_with_flights.get_flight_details(edges[0])
+    flight = flight_graph_with_flights.get_flight_details(0)
     assert flight.flight_number == "BA123"
     assert flight.departure_city == "BUE"
     assert flight.arrival_city == "LON"
     assert flight.departure_datetime == datetime(2024, 9, 12, 8, 0)
     assert flight.arrival_datetime == datetime(2024, 9, 12, 20, 0)
 
-    flight = flight_graph_with_flights.get_flight_details(edges[1])
+    flight = flight_graph_with_flights.get_flight_details(1)
     assert flight.flight_number == "AA100"
     assert flight.departure_city == "BUE"
     assert flight.arrival_city == "MAD"
     assert flight.departure_datetime == datetime(2024, 9, 12, 8, 0)
     assert flight.arrival_datetime == datetime(2024, 9, 12, 22, 0)
 
-    flight = flight_graph_with_flights.get_flight_details(edges[2])
+    flight = flight_graph_with_flights.get_flight_details(2)
     assert flight.flight_number == "AA100"
     assert flight.departure_city == "BUE"
     assert flight.arrival_city == "MAD"
     assert flight.departure_datetime == datetime(2024, 9, 13, 8, 0)
     assert flight.arrival_datetime == datetime(2024, 9, 13, 22, 0)
 
-    flight = flight_graph_with_flights.get_flight_details(edges[3])
+    flight = flight_graph_with_flights.get_flight_details(3)
     assert flight.flight_number == "AA101"
     assert flight.departure_city == "MAD"
     assert flight.arrival_city == "LON"
     assert flight.departure_datetime == datetime(2024, 9, 13, 10, 0)
     assert flight.arrival_datetime == datetime(2024, 9, 13, 12, 0)
 
-    flight = flight_graph_with_flights.get_flight_details(edges[4])
+    flight = flight_graph_with_flights.get_flight_details(4)
     assert flight.flight_number == "IB200"
     assert flight.departure_city == "MAD"
     assert flight.arrival_city == "BER"
     assert flight.departure_datetime == datetime(2024, 9, 13, 11, 0)
     assert flight.arrival_datetime == datetime(2024, 9, 13, 13, 30)
 
-    flight = flight_graph_with_flights.get_flight_details(edges[5])
+    flight = flight_graph_with_flights.get_flight_details(5)
     assert flight.flight_number == "LH300"
     assert flight.departure_city == "BER"
     assert flight.arrival_city == "LON"
@@ -98,19 +92,14 @@ def test_get_flight_details(flight_graph_with_flights: FlightGraph):
     assert flight.arrival_datetime == datetime(2024, 9, 13, 16, 30)
 
 
-def test_get_flight_details_of_nonexistent_edge(
+def test_get_flight_details_of_nonexistent_flight(
     flight_graph_with_flights: FlightGraph,
 ):
-    """Should raise an error if edge does not exist"""
-    with pytest.raises(EdgeNotFoundError) as exc_info:
-        flight_graph_with_flights.get_flight_details(
-            ("BUE", "BER", "BA123_2024-09-12T08:00:00")
-        )
+    """Should raise an error if flight does not exist"""
+    with pytest.raises(FlightNotFoundError) as exc_info:
+        flight_graph_with_flights.get_flight_details(7)
 
-    assert str(exc_info.value) == (
-        "Edge ('BUE', 'BER', 'BA123_2024-09-12T08:00:00')"
-        " does not exist in the graph"
-    )
+    assert str(exc_info.value) == "Flight 7 does not exist in the graph"
 
 
 def test_find_direct_flights(flight_graph_with_flights: FlightGraph):
@@ -121,7 +110,7 @@ def test_find_direct_flights(flight_graph_with_flights: FlightGraph):
 
     # Should find only the BUE->MAD->LON path
     assert len(paths) == 1
-    assert paths[0] == [("BUE", "LON", "BA123_2024-09-12T08:00:00")]
+    assert paths[0] == [0]
 
 
 def test_find_paths_with_connections(flight_graph_with_flights: FlightGraph):
@@ -136,15 +125,9 @@ def test_find_paths_with_connections(flight_graph_with_flights: FlightGraph):
     assert len(paths[1]) == 2  # Two segments (BUE->MAD->LON)
     assert len(paths[2]) == 2  # Two segments (BUE->MAD->LON)
 
-    assert paths[0] == [("BUE", "LON", "BA123_2024-09-12T08:00:00")]
-    assert paths[1] == [
-        ("BUE", "MAD", "AA100_2024-09-12T08:00:00"),
-        ("MAD", "LON", "AA101_2024-09-13T10:00:00"),
-    ]
-    assert paths[2] == [
-        ("BUE", "MAD", "AA100_2024-09-13T08:00:00"),
-        ("MAD", "LON", "AA101_2024-09-13T10:00:00"),
-    ]
+    assert paths[0] == [0]  # BA123
+    assert paths[1] == [1, 3]  # AA100 (2024-09-12), AA101
+    assert paths[2] == [2, 3]  # AA100 (2024-09-13), AA101
 
 
 def test_find_paths_nonexistent_origin(flight_graph_with_flights: FlightGraph):
@@ -192,3 +175,392 @@ def test_find_paths_no_route_between_existing_airports(
         max_flights=2,
     )
     assert len(paths) == 0
+
+
+def test_duplicate_flight_overwrites_stored_flight(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should keep a single stored flight for a repeated flight"""
+    flight_id = flight_graph_with_flights.add_flight(
+        FlightEvent(
+            flight_number="BA123",
+            departure_city="BUE",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 8, 0),
+            arrival_datetime=datetime(2024, 9, 12, 21, 0),
+        )
+    )
+
+    assert flight_id == 0
+    assert len(flight_graph_with_flights.flights) == 7
+    assert flight_graph_with_flights.graph.number_of_edges() == 7
+    flight = flight_graph_with_flights.get_flight_details(0)
+    assert flight.arrival_datetime == datetime(2024, 9, 12, 21, 0)
+
+
+def test_duplicate_flight_moves_edge(flight_graph_with_flights: FlightGraph):
+    """Should move the edge when a repeated flight changes its route"""
+    flight_graph_with_flights.add_flight(
+        FlightEvent(
+            flight_number="BA123",
+            departure_city="BUE",
+            arrival_city="MAD",
+            departure_datetime=datetime(2024, 9, 12, 8, 0),
+            arrival_datetime=datetime(2024, 9, 12, 20, 0),
+        )
+    )
+
+    assert not flight_graph_with_flights.graph.has_edge("BUE", "LON", 0)
+    assert flight_graph_with_flights.graph.has_edge("BUE", "MAD", 0)
+    assert flight_graph_with_flights.graph.number_of_edges() == 7
+
+
+def test_find_flight_id(flight_graph_with_flights: FlightGraph):
+    """Should look up flights by number and departure"""
+    find_flight_id = flight_graph_with_flights.find_flight_id
+
+    assert find_flight_id("AA100", datetime(2024, 9, 13, 8, 0)) == 2
+    assert find_flight_id("AA100", datetime(2024, 9, 14, 8, 0)) is None
+
+
+def test_flight_store_keeps_timezones(flight_graph: FlightGraph):
+    """Should rebuild stored datetimes with their original UTC offset"""
+    flight = FlightEvent.model_validate(
+        {
+            "flight_number": "IB6845",
+            "departure_city": "MAD",
+            "arrival_city": "BUE",
+            "departure_datetime": "2024-09-12T23:59:59Z",
+            "arrival_datetime": "2024-09-13T09:30:00.250000-03:00",
+        }
+    )
+    flight_graph.add_flight(flight)
+
+    stored = flight_graph.get_flight_details(0)
+    assert stored == flight
+    assert stored.arrival_datetime.utcoffset() == timedelta(hours=-3)
+
+
+def _flight_numbers(graph: FlightGraph, flight_ids) -> List[str]:
+    return [graph.flights.flight_number(flight_id) for flight_id in flight_ids]
+
+
+def test_departure_index_sorted_by_departure(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should index outgoing flights of each airport by departure time"""
+    departures = flight_graph_with_flights.departure_index.departures("MAD")
+
+    assert list(departures) == [3, 4]  # AA101, IB200
+    assert (
+        len(flight_graph_with_flights.departure_index.departures("TYO")) == 0
+    )
+
+
+def test_departure_index_departures_on(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should find the flights leaving an airport on a given date"""
+    index = flight_graph_with_flights.departure_index
+
+    departures = index.departures_on("BUE", datetime(2024, 9, 13).date())
+
+    assert departures == [2]  # AA100 (2024-09-13)
+    assert index.departures_on("BUE", datetime(2024, 9, 14).date()) == []
+
+
+def test_departure_index_departures_on_uses_local_date(
+    flight_graph: FlightGraph,
+):
+    """Should match departure dates in the flight's own timezone"""
+    flight = FlightEvent(
+        flight_number="LA800",
+        departure_city="SCL",
+        arrival_city="MAD",
+        departure_datetime=datetime.fromisoformat("2024-09-12T23:30:00-04:00"),
+        arrival_datetime=datetime.fromisoformat("2024-09-13T15:30:00+02:00"),
+    )
+    flight_graph.add_flight(flight)
+    index = flight_graph.departure_index
+
+    assert len(index.departures_on("SCL", datetime(2024, 9, 12).date())) == 1
+    assert index.departures_on("SCL", datetime(2024, 9, 13).date()) == []
+
+
+def test_departure_index_departures_by_day(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should match departures_on for every date of the range"""
+    index = flight_graph_with_flights.departure_index
+    first_day = datetime(2024, 9, 11).date()
+    days = [first_day + timedelta(days=offset) for offset in range(4)]
+
+    for airport in ["BUE", "MAD", "TYO"]:
+        assert index.departures_by_day(airport, days[0], days[-1]) == {
+            day: index.departures_on(airport, day) for day in days
+        }
+
+
+def test_departure_index_departures_between(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should find flights in an inclusive departure time range"""
+    index = flight_graph_with_flights.departure_index
+
+    departures = index.departures_between(
+        "MAD", datetime(2024, 9, 13, 10, 30), datetime(2024, 9, 13, 11, 0)
+    )
+
+    assert _flight_numbers(flight_graph_with_flights, departures) == ["IB200"]
+
+
+def test_departure_index_rebuilt_after_add_flight(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should include flights added after the index was built"""
+    flight_graph_with_flights.build_indexes()
+    flight_graph_with_flights.add_flight(
+        FlightEvent(
+            flight_number="IB201",
+            departure_city="MAD",
+            arrival_city="BER",
+            departure_datetime=datetime(2024, 9, 13, 9, 0),
+            arrival_datetime=datetime(2024, 9, 13, 11, 30),
+        )
+    )
+
+    departures = flight_graph_with_flights.departure_index.departures("MAD")
+
+    assert _flight_numbers(flight_graph_with_flights, departures) == [
+        "IB201",
+        "AA101",
+        "IB200",
+    ]
+
+
+def test_transfer_index_ranges(flight_graph_with_flights: FlightGraph):
+    """Should precompute the connections inside the window"""
+    transfers = flight_graph_with_flights.transfer_index(
+        timedelta(hours=1), timedelta(hours=14)
+    )
+
+    # AA100 arrives at MAD 2024-09-12 22:00, AA101 departs 12h later
+    connections = transfers.transfers(1)
+    assert _flight_numbers(flight_graph_with_flights, connections) == [
+        "AA101",
+        "IB200",
+    ]
+
+    # Flights arriving at MAD 2024-09-13 22:00 have no connections left
+    connections = transfers.transfers(2)
+    assert len(connections) == 0
+
+
+def test_transfer_index_is_transfer(flight_graph_with_flights: FlightGraph):
+    """Should check connections against the precomputed window"""
+    transfers = flight_graph_with_flights.transfer_index(
+        timedelta(hours=1), timedelta(hours=4)
+    )
+
+    # IB200 -> LH300
+    assert transfers.is_transfer(4, 5)
+    # AA100 (2024-09-12) -> AA101
+    assert not transfers.is_transfer(1, 3)
+    # BA123 -> AA101
+    assert not transfers.is_transfer(0, 3)
+
+
+def test_transfer_index_built_once_per_window(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should build transfer indexes with the graph and reuse them"""
+    window = (timedelta(hours=1), timedelta(hours=4))
+    flight_graph_with_flights.build_indexes(connection_windows=[window])
+
+    transfers = flight_graph_with_flights.transfer_index(*window)
+
+    assert flight_graph_with_flights.transfer_index(*window) is transfers
+
+
+def test_version_follows_flight_data(
+    flight_graph_with_flights: FlightGraph, sample_flights: List[FlightEvent]
+):
+    """Should share versions between equal graphs and change on updates"""
+    other_graph = FlightGraph()
+    for flight in sample_flights:
+        other_graph.add_flight(flight)
+    version = flight_graph_with_flights.version
+
+    assert other_graph.version == version
+
+    flight_graph_with_flights.add_flight(
+        FlightEvent(
+            flight_number="BA123",
+            departure_city="BUE",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 8, 0),
+            arrival_datetime=datetime(2024, 9, 12, 21, 0),
+        )
+    )
+    assert flight_graph_with_flights.version != version
+
+
+def test_remove_flight_moves_last_flight(
+    flight_graph_with_flights: FlightGraph,
+):
+    """Should give the removed id to the last flight"""
+    flight_graph_with_flights.remove_flight(1)
+
+    assert len(flight_graph_with_flights.flights) == 6
+    assert flight_graph_with_flights.graph.number_of_edges() == 6
+    assert flight_graph_with_flights.get_flight_details(1).flight_number == (
+        "NH100"
+    )
+    assert (
+        flight_graph_with_flights.find_flight_id(
+            "NH100",
+            flight_graph_with_flights.get_flight_details(1).departure_datetime,
+        )
+        == 1
+    )
+    assert (
+        flight_graph_with_flights.find_flight_id(
+            "AA100", datetime(2024, 9, 12, 8, 0)
+        )
+        is None
+    )
+    with pytest.raises(FlightNotFoundError):
+        flight_graph_with_flights.get_flight_details(6)
+
+
+def _delta_feed(sample_flights: List[FlightEvent]) -> List[FlightEvent]:
+    """Feed with a delayed, an added and a removed flight"""
+    delayed = sample_flights[0].model_copy(
+        update={"arrival_datetime": datetime(2024, 9, 12, 21, 0)}
+    )
+    added = FlightEvent(
+        flight_number="AF500",
+        departure_city="PAR",
+        arrival_city="LON",
+        departure_datetime=datetime(2024, 9, 13, 1, 0),
+        arrival_datetime=datetime(2024, 9, 13, 2, 0),
+    )
+    return [delayed, *sample_flights[1:-1], added]
+
+
+def test_with_flights(
+    flight_graph_with_flights: FlightGraph, sample_flights: List[FlightEvent]
+):
+    """Should only insert, update and remove the flights that changed"""
+    feed = _delta_feed(sample_flights)
+    version = flight_graph_with_flights.version
+
+    graph, changes = flight_graph_with_flights.with_flights(feed)
+
+    assert changes == (1, 1, 1)
+    flights = [
+        graph.get_flight_details(flight_id)
+        for flight_id in range(len(graph.flights))
+    ]
+    assert sorted(flights, key=repr) == sorted(feed, key=repr)
+    assert graph.graph.number_of_edges() == len(feed)
+    assert graph.version != version
+    assert graph.with_flights(feed) == (graph, (0, 0, 0))
+
+
+def test_with_flights_leaves_graph_untouched(
+    flight_graph_with_flights: FlightGraph, sample_flights: List[FlightEvent]
+):
+    """Should keep the original graph searchable as it was"""
+    graph = flight_graph_with_flights
+    version = graph.version
+    flights = [graph.get_flight_details(i) for i in range(len(graph.flights))]
+    departures = graph.departure_index.to_columns()
+
+    graph.with_flights(_delta_feed(sample_flights))
+
+    assert graph.version == version == graph.flights.fingerprint()
+    assert [
+        graph.get_flight_details(i) for i in range(len(graph.flights))
+    ] == flights
+    assert graph.departure_index.to_columns() == departures
+    assert graph.graph.number_of_edges() == len(flights)
+
+
+def test_with_flights_updates_indexes(
+    flight_graph_with_flights: FlightGraph, sample_flights: List[FlightEvent]
+):
+    """Should patch the indexes into those of a full build"""
+    window = (timedelta(hours=1), timedelta(hours=6))
+    flight_graph_with_flights.build_indexes([window])
+    feed = _delta_feed(sample_flights)
+    # Moves a flight between airports and removes the last one of NY
+    feed[3] = feed[3].model_copy(update={"departure_city": "BUE"})
+
+    graph, _ = flight_graph_with_flights.with_flights(feed)
+
+    rebuilt = FlightGraph(graph.flights)
+    rebuilt.build_indexes([window])
+    assert graph.version == rebuilt.version
+    for name in ("departure_index", "arrival_index", "connection_timetable"):
+        assert (
+            getattr(graph, name).to_columns()
+            == getattr(rebuilt, name).to_columns()
+        )
+    assert (
+        graph.transfer_index(*window).to_columns()
+        == rebuilt.transfer_index(*window).to_columns()
+    )
+
+
+def test_with_flights_drops_airports_without_flights(
+    flight_graph_with_flights: FlightGraph, sample_flights: List[FlightEvent]
+):
+    """Should not find airports whose last flight was removed"""
+    feed = _delta_feed(sample_flights)
+    graph, _ = flight_graph_with_flights.with_flights(feed)
+    rebuilt = FlightGraph()
+    rebuilt.add_flights(feed)
+
+    for flight_graph in (graph, rebuilt):
+        with pytest.raises(AirportNotFoundError) as exc_info:
+            flight_graph.check_airports("NY", "BUE")
+        assert str(exc_info.value) == "Origin city 'NY' not found"
+        with pytest.raises(AirportNotFoundError) as exc_info:
+            flight_graph.check_airports("BUE", "TYO")
+        assert str(exc_info.value) == "Destination city 'TYO' not found"
+        flight_graph.check_airports("BUE", "LON")
+
+
+def test_add_flights_matches_add_flight(
+    flight_graph_with_flights: FlightGraph, sample_flights: List[FlightEvent]
+):
+    """Should build the same graph as adding flights one by one"""
+    graph = FlightGraph()
+
+    assert graph.add_flights(sample_flights) == len(sample_flights)
+    assert graph.version == flight_graph_with_flights.version
+    assert graph.graph.number_of_edges() == len(sample_flights)
+    assert graph.departure_index.departures_on(
+        "BUE", datetime(2024, 9, 12).date()
+    ) == flight_graph_with_flights.departure_index.departures_on(
+        "BUE", datetime(2024, 9, 12).date()
+    )
+
+
+def test_add_flights_last_duplicate_wins(sample_flights: List[FlightEvent]):
+    """Should keep the last copy of a flight repeated in the feed"""
+    graph = FlightGraph()
+    delayed = sample_flights[0].model_copy(
+        update={"arrival_datetime": datetime(2024, 9, 12, 21, 0)}
+    )
+
+    added = graph.add_flights([*sample_flights, delayed])
+
+    assert added == len(sample_flights)
+    flight_id = graph.find_flight_id(
+        delayed.flight_number, delayed.departure_datetime
+    )
+    assert graph.get_flight_details(flight_id) == delayed
+    assert graph.add_flights(sample_flights[:1]) == 0
+    assert len(graph.flights) == len(sample_flights)
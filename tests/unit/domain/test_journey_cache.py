@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from app.domain.journey.cache import JourneyCache, estimate_size
+from app.models.journey import Journey, PathFlight
+
+
+def _journey(flight_number: str) -> Journey:
+    return Journey(
+        connections=0,
+        path=[
+            PathFlight(
+                flight_number=flight_number,
+                from_="BUE",
+                to="MAD",
+                departure_time=datetime(2024, 9, 12, 8, 0),
+                arrival_time=datetime(2024, 9, 12, 20, 0),
+            )
+        ],
+    )
+
+
+def test_get_and_put():
+    """Should count misses and hits"""
+    cache = JourneyCache()
+    journeys = [_journey("AA100")]
+
+    assert cache.get("BUE-MAD", 1) is None
+    cache.put("BUE-MAD", 1, journeys)
+
+    assert cache.get("BUE-MAD", 1) == journeys
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    assert stats.size_bytes == estimate_size(journeys)
+
+
+def test_evicts_least_recently_used():
+    """Should evict the least recently used entry when full"""
+    cache = JourneyCache(max_entries=2)
+    cache.put("a", 1, [_journey("AA100")])
+    cache.put("b", 1, [_journey("AA101")])
+    cache.get("a", 1)
+    cache.put("c", 1, [_journey("AA102")])
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    assert cache.get("c", 1) is not None
+
+
+def test_evicts_by_size():
+    """Should keep the estimated size under the memory limit"""
+    journeys = [_journey("AA100")]
+    cache = JourneyCache(max_bytes=2 * estimate_size(journeys))
+    for key in ("a", "b", "c"):
+        cache.put(key, 1, journeys)
+
+    assert cache.stats().entries == 2
+    assert cache.get("a", 1) is None
+
+    cache.put("large", 1, journeys * 3)
+    assert cache.get("large", 1) is None
+
+
+def test_new_version_drops_every_entry():
+    """Should invalidate all entries when the graph version changes"""
+    cache = JourneyCache()
+    cache.put("a", 1, [_journey("AA100")])
+    cache.put("b", 1, [_journey("AA101")])
+
+    assert cache.get("a", 2) is None
+    assert cache.stats().entries == 0
+    assert cache.version == 2
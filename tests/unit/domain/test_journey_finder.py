@@ -1,12 +1,22 @@
+import base64
 import pytest
 from datetime import datetime, timedelta
+from typing import List
 
+from app.domain.journey.cache import JourneyCache
+from app.domain.journey.cursor import JourneyCursor
+from app.domain.journey.exceptions import (
+    InvalidCursorError,
+    StaleCursorError,
+)
+from app.models.journey import Journey, PathFlight
 from app.domain.journey.journey_finder import JourneyFinder
 from app.domain.flight_graph import FlightGraph
 from app.services.flight_events import FlightEvent
 from app.domain.journey.validators import DefaultJourneyValidator
 from app.domain.journey.builders import DefaultJourneyPathBuilder
 from app.domain.journey.sorters import TimeAndConnectionsSorter
+from app.domain.journey.searchers import SearchMode
 from app.domain.flight_graph.exceptions import (
     AirportNotFoundError,
 )
@@ -200,3 +210,452 @@ def test_find_paths_both_airports_nonexistent(
             departure_date=datetime(2024, 9, 12).date(),
         )
     assert "Origin city 'YYY' not found" in str(exc_info.value)
+
+
+def test_time_aware_search_mode(complex_graph: FlightGraph):
+    """Should find the same journeys with the time-aware searches"""
+    validator = DefaultJourneyValidator(
+        min_connection_time=timedelta(hours=1),
+        max_connection_time=timedelta(hours=4),
+        max_flight_time=timedelta(hours=24),
+    )
+    finders = [
+        JourneyFinder(
+            flight_graph=complex_graph,
+            validator=validator,
+            path_builder=DefaultJourneyPathBuilder(),
+            sorter=TimeAndConnectionsSorter(),
+            max_flight_events=2,
+            search_mode=search_mode,
+        )
+        for search_mode in (
+            SearchMode.EXHAUSTIVE,
+            SearchMode.TIME_AWARE,
+            SearchMode.BIDIRECTIONAL,
+        )
+    ]
+
+    results = [
+        finder.find_journeys(
+            origin="BUE",
+            destination="LON",
+            departure_date=datetime(2024, 9, 12).date(),
+        )
+        for finder in finders
+    ]
+
+    assert len(results[0]) == 2
+    assert all(journeys == results[0] for journeys in results)
+
+
+def test_connection_scan_search_mode(complex_graph: FlightGraph):
+    """Should find the Pareto-optimal journeys with connection scan"""
+    validator = DefaultJourneyValidator(
+        min_connection_time=timedelta(hours=1),
+        max_connection_time=timedelta(hours=4),
+        max_flight_time=timedelta(hours=24),
+    )
+    finder = JourneyFinder(
+        flight_graph=complex_graph,
+        validator=validator,
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=2,
+        search_mode=SearchMode.CONNECTION_SCAN,
+    )
+
+    journeys = finder.find_journeys(
+        origin="BUE",
+        destination="LON",
+        departure_date=datetime(2024, 9, 12).date(),
+    )
+
+    # The direct flight departs later and arrives earlier than the connection
+    assert len(journeys) == 1
+    assert journeys[0].connections == 0
+    assert journeys[0].path[0].flight_number == "BA200"
+
+
+@pytest.mark.parametrize("search_mode", list(SearchMode))
+def test_find_journeys_with_limit(
+    complex_graph: FlightGraph, search_mode: SearchMode
+):
+    """Should return the first journeys of the full sorted result"""
+    validator = DefaultJourneyValidator(
+        min_connection_time=timedelta(hours=1),
+        max_connection_time=timedelta(hours=4),
+        max_flight_time=timedelta(hours=24),
+    )
+    finder = JourneyFinder(
+        flight_graph=complex_graph,
+        validator=validator,
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=2,
+        search_mode=search_mode,
+    )
+    departure_date = datetime(2024, 9, 12).date()
+
+    journeys = finder.find_journeys("BUE", "LON", departure_date)
+
+    for limit in range(1, len(journeys) + 2):
+        assert (
+            finder.find_journeys("BUE", "LON", departure_date, limit=limit)
+            == journeys[:limit]
+        )
+
+
+def test_find_journeys_uses_cache(complex_graph: FlightGraph):
+    """Should answer repeated queries from the cache until the graph changes"""
+    cache = JourneyCache()
+    finder = JourneyFinder(
+        flight_graph=complex_graph,
+        validator=DefaultJourneyValidator(
+            min_connection_time=timedelta(hours=1),
+            max_connection_time=timedelta(hours=4),
+            max_flight_time=timedelta(hours=24),
+        ),
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=2,
+        cache=cache,
+    )
+    departure_date = datetime(2024, 9, 12).date()
+
+    journeys = finder.find_journeys("BUE", "LON", departure_date)
+    assert finder.find_journeys("BUE", "LON", departure_date) == journeys
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    complex_graph.add_flight(
+        FlightEvent(
+            flight_number="BA202",
+            departure_city="BUE",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 12, 0),
+            arrival_datetime=datetime(2024, 9, 13, 2, 0),
+        )
+    )
+    journeys = finder.find_journeys("BUE", "LON", departure_date)
+    assert len(journeys) == 3
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.mark.parametrize("search_mode", list(SearchMode))
+@pytest.mark.parametrize("limit", [None, 1])
+def test_find_journeys_batch(
+    complex_graph: FlightGraph, search_mode: SearchMode, limit
+):
+    """Should answer each query as find_journeys, with errors per query"""
+    finder = JourneyFinder(
+        flight_graph=complex_graph,
+        validator=DefaultJourneyValidator(
+            min_connection_time=timedelta(hours=1),
+            max_connection_time=timedelta(hours=4),
+            max_flight_time=timedelta(hours=24),
+        ),
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=2,
+        search_mode=search_mode,
+    )
+    day = datetime(2024, 9, 12).date()
+    queries = [
+        ("BUE", "LON", day),
+        ("BUE", "XXX", day),
+        ("BUE", "MAD", day),
+        ("BUE", "LON", day + timedelta(days=1)),
+        ("BUE", "BUE", day),
+        ("BUE", "LON", day),
+    ]
+
+    results = finder.find_journeys_batch(queries, limit=limit)
+
+    assert isinstance(results[1], AirportNotFoundError)
+    assert "Destination city 'XXX' not found" in str(results[1])
+    for query, result in zip(queries, results):
+        if query[1] != "XXX":
+            assert result == finder.find_journeys(*query, limit=limit)
+    assert results[0]
+
+
+@pytest.mark.parametrize("search_mode", list(SearchMode))
+@pytest.mark.parametrize("limit", [None, 1])
+def test_find_journeys_by_day(
+    complex_graph: FlightGraph, search_mode: SearchMode, limit
+):
+    """Should answer every date of the range as find_journeys"""
+    cache = JourneyCache()
+    finder = JourneyFinder(
+        flight_graph=complex_graph,
+        validator=DefaultJourneyValidator(
+            min_connection_time=timedelta(hours=1),
+            max_connection_time=timedelta(hours=4),
+            max_flight_time=timedelta(hours=24),
+        ),
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=2,
+        search_mode=search_mode,
+        cache=cache,
+    )
+    first_day = datetime(2024, 9, 11).date()
+    last_day = datetime(2024, 9, 13).date()
+    expected = {
+        first_day
+        + timedelta(days=offset): finder.find_journeys(
+            "BUE", "LON", first_day + timedelta(days=offset), limit=limit
+        )
+        for offset in range(3)
+    }
+    cache.clear()
+
+    journeys = finder.find_journeys_by_day(
+        "BUE", "LON", first_day, last_day, limit=limit
+    )
+
+    assert journeys == expected
+    assert list(journeys) == sorted(expected)
+    assert journeys[datetime(2024, 9, 12).date()]
+    assert (
+        finder.find_journeys_by_day(
+            "BUE", "LON", first_day, last_day, limit=limit
+        )
+        == expected
+    )
+    assert cache.hits == 3
+
+
+def test_iter_journeys_yields_sorted_journeys(complex_graph: FlightGraph):
+    """Should yield the sorted journeys lazily and check airports eagerly"""
+    finder = JourneyFinder(
+        flight_graph=complex_graph,
+        validator=DefaultJourneyValidator(
+            min_connection_time=timedelta(hours=1),
+            max_connection_time=timedelta(hours=4),
+            max_flight_time=timedelta(hours=24),
+        ),
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=2,
+        cache=JourneyCache(),
+    )
+    departure_date = datetime(2024, 9, 12).date()
+    paths = finder.searcher.find_paths(
+        "BUE", "LON", departure_date, finder.max_flight_events
+    )
+    journeys = [
+        journey
+        for journey in map(finder._build_journey, paths)
+        if finder.validator.is_valid_total_time(journey)
+    ]
+
+    iterator = finder.iter_journeys("BUE", "LON", departure_date)
+    assert next(iterator) == TimeAndConnectionsSorter().sort(journeys)[0]
+    assert [next(iterator), *iterator] == TimeAndConnectionsSorter().sort(
+        journeys
+    )[1:]
+    assert finder.cache.stats().entries == 1
+    with pytest.raises(AirportNotFoundError):
+        finder.iter_journeys("BUE", "XXX", departure_date)
+
+
+def test_path_builder_reuses_flights(flight_graph_with_flights: FlightGraph):
+    """Should build each flight once per graph version"""
+    builder = DefaultJourneyPathBuilder()
+
+    first = builder.build_path([0, 1], flight_graph_with_flights)
+    second = builder.build_path([1], flight_graph_with_flights)
+
+    assert second[0] is first[1]
+    assert first[0] == PathFlight.model_validate(
+        {
+            "flight_number": flight_graph_with_flights.flights.flight_number(
+                0
+            ),
+            "from": flight_graph_with_flights.flights.origin(0),
+            "to": flight_graph_with_flights.flights.destination(0),
+            "departure_time": (
+                flight_graph_with_flights.flights.departure_datetime(0)
+            ),
+            "arrival_time": (
+                flight_graph_with_flights.flights.arrival_datetime(0)
+            ),
+        }
+    )
+    flight_graph_with_flights.add_flight(
+        FlightEvent(
+            flight_number="BA202",
+            departure_city="BUE",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 12, 0),
+            arrival_datetime=datetime(2024, 9, 13, 2, 0),
+        )
+    )
+    assert builder.build_path([1], flight_graph_with_flights)[0] is not (
+        first[1]
+    )
+
+
+@pytest.fixture
+def tied_graph():
+    """Creates a graph with many journeys sharing total time and legs"""
+    graph = FlightGraph()
+    airports = ["BUE", "MAD", "PAR", "LON"]
+    number = 0
+    for hour in range(8, 16):
+        for origin in airports[:-1]:
+            for destination in airports[1:]:
+                if origin == destination:
+                    continue
+                number += 1
+                departure = datetime(2024, 9, 12, hour, 0)
+                graph.add_flight(
+                    FlightEvent(
+                        flight_number=f"XX{number}",
+                        departure_city=origin,
+                        arrival_city=destination,
+                        departure_datetime=departure,
+                        arrival_datetime=departure
+                        + timedelta(hours=1 + number % 2),
+                    )
+                )
+    return graph
+
+
+def _paged_finder(graph: FlightGraph, search_mode: SearchMode):
+    return JourneyFinder(
+        flight_graph=graph,
+        validator=DefaultJourneyValidator(
+            min_connection_time=timedelta(hours=1),
+            max_connection_time=timedelta(hours=4),
+            max_flight_time=timedelta(hours=24),
+        ),
+        path_builder=DefaultJourneyPathBuilder(),
+        sorter=TimeAndConnectionsSorter(),
+        max_flight_events=3,
+        search_mode=search_mode,
+    )
+
+
+@pytest.mark.parametrize("search_mode", list(SearchMode))
+@pytest.mark.parametrize("limit", [1, 3])
+def test_find_journeys_page_walks_all_journeys(
+    tied_graph: FlightGraph, search_mode: SearchMode, limit: int
+):
+    """Should return every journey once, in order, across the pages"""
+    finder = _paged_finder(tied_graph, search_mode)
+    departure_date = datetime(2024, 9, 12).date()
+    expected = finder.find_journeys("BUE", "LON", departure_date)
+
+    journeys, cursor = finder.find_journeys_page(
+        "BUE", "LON", departure_date, limit
+    )
+    pages = 1
+    while cursor is not None:
+        assert len(journeys) == pages * limit
+        page, cursor = finder.find_journeys_page(
+            "BUE", "LON", departure_date, limit, cursor
+        )
+        journeys += page
+        pages += 1
+
+    assert len(expected) > limit
+    assert journeys == expected
+
+
+def test_find_journeys_page_cursor_from_paths(
+    tied_graph: FlightGraph, monkeypatch: pytest.MonkeyPatch
+):
+    """Should make cursors from the found paths, not flight lookups"""
+    finder = _paged_finder(tied_graph, SearchMode.TIME_AWARE)
+    departure_date = datetime(2024, 9, 12).date()
+
+    def find_flight_id(*args: object) -> None:
+        raise AssertionError("flight ids are looked up")
+
+    monkeypatch.setattr(tied_graph, "find_flight_id", find_flight_id)
+    journeys, cursor = finder.find_journeys_page(
+        "BUE", "LON", departure_date, 1
+    )
+
+    monkeypatch.undo()
+    assert cursor is not None
+    assert JourneyCursor.decode(cursor).path == tuple(
+        tied_graph.find_flight_id(flight.flight_number, flight.departure_time)
+        for flight in journeys[0].path
+    )
+
+
+class MostConnectionsSorter:
+    by_total_time = False
+
+    def sort(self, journeys: List[Journey]) -> List[Journey]:
+        return sorted(journeys, key=lambda journey: -journey.connections)
+
+
+@pytest.mark.parametrize("search_mode", list(SearchMode))
+def test_find_journeys_page_with_other_sorter(
+    tied_graph: FlightGraph, search_mode: SearchMode
+):
+    """Should page through the order of a sorter not by total time"""
+    finder = _paged_finder(tied_graph, search_mode)
+    finder.sorter = MostConnectionsSorter()
+    departure_date = datetime(2024, 9, 12).date()
+    expected = finder.find_journeys("BUE", "LON", departure_date)
+
+    journeys, cursor = finder.find_journeys_page(
+        "BUE", "LON", departure_date, 1
+    )
+    while cursor is not None:
+        page, cursor = finder.find_journeys_page(
+            "BUE", "LON", departure_date, 1, cursor
+        )
+        journeys += page
+
+    assert expected == MostConnectionsSorter().sort(expected)
+    assert journeys == expected
+
+
+def test_find_journeys_page_rejects_other_cursors(tied_graph: FlightGraph):
+    """Should reject malformed, foreign and stale cursors"""
+    finder = _paged_finder(tied_graph, SearchMode.TIME_AWARE)
+    departure_date = datetime(2024, 9, 12).date()
+    _, cursor = finder.find_journeys_page("BUE", "LON", departure_date, 2)
+
+    with pytest.raises(InvalidCursorError):
+        finder.find_journeys_page("BUE", "LON", departure_date, 2, "xyz")
+    with pytest.raises(InvalidCursorError):
+        finder.find_journeys_page("BUE", "PAR", departure_date, 2, cursor)
+
+    tied_graph.add_flight(
+        FlightEvent(
+            flight_number="BA202",
+            departure_city="BUE",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 12, 0),
+            arrival_datetime=datetime(2024, 9, 13, 2, 0),
+        )
+    )
+    with pytest.raises(StaleCursorError):
+        finder.find_journeys_page("BUE", "LON", departure_date, 2, cursor)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "null",
+        '{"version":1}',
+        '[1,"A0","A2","2024-03-20",{},[]]',
+        '[1,"A0","A2","2024-03-20",[1],[]]',
+        '[1,"A0","A2","2024-03-20",[1,0],["x"]]',
+        '[1,"A0",null,"2024-03-20",[1,0],[]]',
+        '[1,"A0","A2",20240320,[1,0],[]]',
+        '[1,"A0","A2","not a date",[1,0],[]]',
+    ],
+)
+def test_journey_cursor_rejects_malformed_tokens(data: str):
+    """Should reject tokens that do not hold the fields of a cursor"""
+    token = base64.urlsafe_b64encode(data.encode()).decode()
+
+    with pytest.raises(InvalidCursorError):
+        JourneyCursor.decode(token)
@@ -16,6 +16,10 @@ def validator():
     )
 
 
+# Flight ids of the graph fixture, in insertion order
+BA200, AA100, IB301, IB302, IB303 = range(5)
+
+
 @pytest.fixture
 def graph():
     graph = FlightGraph()
@@ -92,7 +96,7 @@ def test_invalid_empty_path(preprocessor: PathPreprocessor):
 
 def test_valid_direct_flight(preprocessor: PathPreprocessor):
     """Should accept valid direct flights"""
-    paths = [[("BUE", "LON", "BA200_2024-09-12T09:00:00")]]
+    paths = [[BA200]]
     departure_date = date(2024, 9, 12)
 
     valid_paths = preprocessor.preprocess(paths, departure_date)
@@ -104,8 +108,8 @@ def test_valid_connection(preprocessor: PathPreprocessor):
     """Should accept valid connections"""
     paths = [
         [
-            ("BUE", "MAD", "AA100_2024-09-12T08:00:00"),
-            ("MAD", "LON", "IB301_2024-09-12T23:30:00"),
+            AA100,
+            IB301,
         ]
     ]
     departure_date = date(2024, 9, 12)
@@ -119,12 +123,8 @@ def test_invalid_connection_time(preprocessor: PathPreprocessor):
     """Should filter out paths with invalid connection times"""
     paths = [
         [
-            ("BUE", "MAD", "AA100_2024-09-12T08:00:00"),
-            (
-                "MAD",
-                "LON",
-                "IB302_2024-09-12T22:30:00",
-            ),  # Too short connection
+            AA100,
+            IB302,  # Too short connection
         ]
     ]
     departure_date = date(2024, 9, 12)
@@ -134,7 +134,7 @@ def test_invalid_connection_time(preprocessor: PathPreprocessor):
 
 def test_invalid_departure_date(preprocessor: PathPreprocessor):
     """Should filter out paths starting before departure date"""
-    paths = [[("BUE", "MAD", "IB303_2024-09-11T08:00:00")]]  # Day before
+    paths = [[IB303]]  # Day before
     departure_date = date(2024, 9, 12)
 
     assert preprocessor.preprocess(paths, departure_date) == []
@@ -144,16 +144,16 @@ def test_mixed_valid_invalid_paths(preprocessor: PathPreprocessor):
     """Should filter invalid paths while keeping valid ones"""
     paths = [
         # Valid direct flight
-        [("BUE", "LON", "BA200_2024-09-12T09:00:00")],
+        [BA200],
         # Invalid connection
         [
-            ("BUE", "MAD", "AA100_2024-09-12T08:00:00"),
-            ("MAD", "LON", "IB302_2024-09-12T22:30:00"),
+            AA100,
+            IB302,
         ],
         # Valid connection
         [
-            ("BUE", "MAD", "AA100_2024-09-12T08:00:00"),
-            ("MAD", "LON", "IB301_2024-09-12T23:30:00"),
+            AA100,
+            IB301,
         ],
     ]
     departure_date = date(2024, 9, 12)
@@ -162,3 +162,67 @@ def test_mixed_valid_invalid_paths(preprocessor: PathPreprocessor):
     assert len(valid_paths) == 2
     assert valid_paths[0] == paths[0]  # Direct flight
     assert valid_paths[1] == paths[2]  # Valid connection
+
+
+@pytest.fixture
+def vectorized_preprocessor(
+    graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    return PathPreprocessor(graph, validator, vectorized=True)
+
+
+def test_vectorized_mixed_valid_invalid_paths(
+    preprocessor: PathPreprocessor, vectorized_preprocessor: PathPreprocessor
+):
+    """Should filter paths in batch exactly like the sequential check"""
+    paths = [
+        [BA200],
+        [],
+        [
+            AA100,
+            IB302,
+        ],
+        [IB303],
+        [
+            AA100,
+            IB301,
+        ],
+    ]
+    departure_date = date(2024, 9, 12)
+
+    valid_paths = vectorized_preprocessor.preprocess(paths, departure_date)
+
+    assert valid_paths == preprocessor.preprocess(paths, departure_date)
+    assert valid_paths == [paths[0], paths[4]]
+
+
+def test_vectorized_matches_sequential_for_all_paths(
+    graph: FlightGraph,
+    preprocessor: PathPreprocessor,
+    vectorized_preprocessor: PathPreprocessor,
+):
+    """Should keep the same paths as the sequential check for every date"""
+    paths = graph.find_paths("BUE", "LON", max_flights=2)
+
+    for day in (11, 12, 13):
+        departure_date = date(2024, 9, day)
+        assert vectorized_preprocessor.preprocess(
+            paths, departure_date
+        ) == preprocessor.preprocess(paths, departure_date)
+
+
+def test_vectorized_invalid_total_time(
+    graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should also filter out paths exceeding the max journey time"""
+    validator.max_flight_time = timedelta(hours=15)
+    preprocessor = PathPreprocessor(graph, validator, vectorized=True)
+    paths = [
+        [BA200],  # 14.5h
+        [
+            AA100,
+            IB301,
+        ],  # 18h
+    ]
+
+    assert preprocessor.preprocess(paths, date(2024, 9, 12)) == [paths[0]]
@@ -0,0 +1,411 @@
+import pytest
+from datetime import datetime, date, timedelta
+from typing import List
+
+from app.domain.flight_graph import FlightGraph
+from app.domain.flight_graph.exceptions import AirportNotFoundError
+from app.domain.journey.searchers import (
+    BidirectionalPathSearcher,
+    ConnectionScanSearcher,
+    ExhaustivePathSearcher,
+    TimeAwarePathSearcher,
+)
+from app.domain.journey.validators import DefaultJourneyValidator
+from app.services.flight_events import FlightEvent
+
+
+@pytest.fixture
+def validator():
+    return DefaultJourneyValidator(
+        min_connection_time=timedelta(hours=1),
+        max_connection_time=timedelta(hours=4),
+        max_flight_time=timedelta(hours=24),
+    )
+
+
+def _flight_numbers(graph: FlightGraph, paths) -> List[List[str]]:
+    return [
+        [graph.flights.flight_number(flight_id) for flight_id in path]
+        for path in paths
+    ]
+
+
+@pytest.fixture
+def hub_graph():
+    """Creates a graph with several daily frequencies through hubs"""
+    graph = FlightGraph()
+    flights = [
+        FlightEvent(
+            flight_number="BA200",
+            departure_city="BUE",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 9, 0),
+            arrival_datetime=datetime(2024, 9, 12, 23, 30),
+        ),
+        FlightEvent(
+            flight_number="AA100",
+            departure_city="BUE",
+            arrival_city="MAD",
+            departure_datetime=datetime(2024, 9, 12, 8, 0),
+            arrival_datetime=datetime(2024, 9, 12, 20, 0),
+        ),
+        FlightEvent(
+            flight_number="AA102",
+            departure_city="BUE",
+            arrival_city="MAD",
+            departure_datetime=datetime(2024, 9, 13, 8, 0),
+            arrival_datetime=datetime(2024, 9, 13, 20, 0),
+        ),
+        FlightEvent(
+            flight_number="IB301",
+            departure_city="MAD",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 22, 0),
+            arrival_datetime=datetime(2024, 9, 13, 0, 30),
+        ),
+        FlightEvent(
+            flight_number="IB302",
+            departure_city="MAD",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 12, 20, 30),
+            arrival_datetime=datetime(2024, 9, 12, 23, 0),
+        ),
+        FlightEvent(
+            flight_number="IB400",
+            departure_city="MAD",
+            arrival_city="PAR",
+            departure_datetime=datetime(2024, 9, 12, 21, 30),
+            arrival_datetime=datetime(2024, 9, 12, 23, 30),
+        ),
+        FlightEvent(
+            flight_number="AF500",
+            departure_city="PAR",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 13, 1, 0),
+            arrival_datetime=datetime(2024, 9, 13, 2, 0),
+        ),
+        FlightEvent(
+            flight_number="AF501",
+            departure_city="PAR",
+            arrival_city="MAD",
+            departure_datetime=datetime(2024, 9, 13, 1, 0),
+            arrival_datetime=datetime(2024, 9, 13, 3, 0),
+        ),
+        FlightEvent(
+            flight_number="IB303",
+            departure_city="MAD",
+            arrival_city="LON",
+            departure_datetime=datetime(2024, 9, 13, 5, 0),
+            arrival_datetime=datetime(2024, 9, 13, 7, 0),
+        ),
+    ]
+    for flight in flights:
+        graph.add_flight(flight)
+    return graph
+
+
+@pytest.mark.parametrize("max_flights", [1, 2, 3, 4])
+@pytest.mark.parametrize(
+    "departure_date", [date(2024, 9, 12), date(2024, 9, 13)]
+)
+def test_time_aware_matches_exhaustive(
+    hub_graph: FlightGraph,
+    validator: DefaultJourneyValidator,
+    max_flights: int,
+    departure_date: date,
+):
+    """Should return the same paths as the exhaustive search"""
+    exhaustive = ExhaustivePathSearcher(hub_graph, validator)
+    time_aware = TimeAwarePathSearcher(hub_graph, validator)
+
+    expected = exhaustive.find_paths("BUE", "LON", departure_date, max_flights)
+    paths = time_aware.find_paths("BUE", "LON", departure_date, max_flights)
+
+    assert sorted(paths) == sorted(expected)
+
+
+def test_time_aware_skips_invalid_connections(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should only expand connections inside the connection window"""
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+
+    paths = searcher.find_paths("BUE", "LON", date(2024, 9, 12), 3)
+
+    assert _flight_numbers(hub_graph, paths) == [
+        ["AA100", "IB400", "AF500"],
+        ["AA100", "IB301"],
+        ["BA200"],
+    ]
+
+
+def test_time_aware_same_origin_and_destination(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should not return paths when origin and destination are the same"""
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+
+    assert searcher.find_paths("MAD", "MAD", date(2024, 9, 12), 3) == []
+
+
+def test_time_aware_nonexistent_airport(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should raise AirportNotFoundError when an airport doesn't exist"""
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+
+    with pytest.raises(AirportNotFoundError) as exc_info:
+        searcher.find_paths("BUE", "XXX", date(2024, 9, 12), 2)
+    assert "Destination city 'XXX' not found" in str(exc_info.value)
+
+
+@pytest.fixture
+def profile_graph():
+    """Creates a graph with dominated and non-dominated journeys"""
+    graph = FlightGraph()
+    flights = [
+        (
+            "AA1",
+            "AEP",
+            "COR",
+            datetime(2024, 9, 12, 6),
+            datetime(2024, 9, 12, 20),
+        ),
+        (
+            "AA2",
+            "AEP",
+            "MDZ",
+            datetime(2024, 9, 12, 7),
+            datetime(2024, 9, 12, 9),
+        ),
+        (
+            "AA3",
+            "MDZ",
+            "COR",
+            datetime(2024, 9, 12, 10),
+            datetime(2024, 9, 12, 12),
+        ),
+        (
+            "AA4",
+            "MDZ",
+            "COR",
+            datetime(2024, 9, 12, 12),
+            datetime(2024, 9, 12, 14),
+        ),
+        (
+            "AA5",
+            "AEP",
+            "MDZ",
+            datetime(2024, 9, 12, 8),
+            datetime(2024, 9, 12, 10),
+        ),
+        (
+            "AA6",
+            "MDZ",
+            "COR",
+            datetime(2024, 9, 12, 11),
+            datetime(2024, 9, 12, 13),
+        ),
+        (
+            "AA7",
+            "AEP",
+            "COR",
+            datetime(2024, 9, 13, 6),
+            datetime(2024, 9, 13, 8),
+        ),
+    ]
+    for number, origin, destination, departure, arrival in flights:
+        graph.add_flight(
+            FlightEvent(
+                flight_number=number,
+                departure_city=origin,
+                arrival_city=destination,
+                departure_datetime=departure,
+                arrival_datetime=arrival,
+            )
+        )
+    return graph
+
+
+def test_connection_scan_profile(
+    profile_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should return only the Pareto-optimal paths"""
+    searcher = ConnectionScanSearcher(profile_graph, validator)
+
+    paths = searcher.find_paths("AEP", "COR", date(2024, 9, 12), 2)
+
+    assert sorted(_flight_numbers(profile_graph, paths)) == sorted(
+        [
+            ["AA1"],
+            ["AA2", "AA3"],
+            ["AA5", "AA6"],
+        ]
+    )
+
+
+def test_connection_scan_profile_subset_of_exhaustive(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should only return paths that the exhaustive search also returns"""
+    exhaustive = ExhaustivePathSearcher(hub_graph, validator)
+    connection_scan = ConnectionScanSearcher(hub_graph, validator)
+
+    expected = exhaustive.find_paths("BUE", "LON", date(2024, 9, 12), 3)
+    paths = connection_scan.find_paths("BUE", "LON", date(2024, 9, 12), 3)
+
+    assert _flight_numbers(hub_graph, paths) == [["BA200"]]
+    assert all(path in expected for path in paths)
+
+
+def test_connection_scan_respects_max_flights(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should not build paths longer than max_flights"""
+    searcher = ConnectionScanSearcher(hub_graph, validator)
+
+    assert searcher.find_paths("BUE", "PAR", date(2024, 9, 12), 1) == []
+    paths = searcher.find_paths("BUE", "PAR", date(2024, 9, 12), 2)
+    assert _flight_numbers(hub_graph, paths) == [["AA100", "IB400"]]
+
+
+def test_connection_scan_earliest_arrival(
+    profile_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should return the path arriving first"""
+    searcher = ConnectionScanSearcher(profile_graph, validator)
+
+    path = searcher.find_earliest_arrival("AEP", "COR", date(2024, 9, 12), 2)
+    assert _flight_numbers(profile_graph, [path]) == [["AA2", "AA3"]]
+    assert (
+        searcher.find_earliest_arrival("AEP", "COR", date(2024, 9, 14), 2)
+        is None
+    )
+
+
+def test_time_aware_limit_keeps_best_paths(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should only return the best paths by total time and connections"""
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+
+    paths = searcher.find_paths("BUE", "LON", date(2024, 9, 12), 3, limit=2)
+
+    assert _flight_numbers(hub_graph, paths) == [
+        ["BA200"],
+        ["AA100", "IB301"],
+    ]
+
+
+def test_time_aware_limit_skips_too_long_paths(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should not keep paths exceeding the max journey time"""
+    validator.max_flight_time = timedelta(hours=15)
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+
+    paths = searcher.find_paths("BUE", "LON", date(2024, 9, 12), 3, limit=5)
+
+    assert _flight_numbers(hub_graph, paths) == [["BA200"]]
+
+
+@pytest.mark.parametrize("max_flights", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize(
+    "departure_date", [date(2024, 9, 12), date(2024, 9, 13)]
+)
+@pytest.mark.parametrize("destination", ["LON", "PAR", "MAD"])
+def test_bidirectional_matches_time_aware(
+    hub_graph: FlightGraph,
+    validator: DefaultJourneyValidator,
+    max_flights: int,
+    departure_date: date,
+    destination: str,
+):
+    """Should return the same paths as the time-aware search"""
+    time_aware = TimeAwarePathSearcher(hub_graph, validator)
+    bidirectional = BidirectionalPathSearcher(hub_graph, validator)
+
+    expected = time_aware.find_paths(
+        "BUE", destination, departure_date, max_flights
+    )
+    paths = bidirectional.find_paths(
+        "BUE", destination, departure_date, max_flights
+    )
+
+    assert sorted(paths) == sorted(expected)
+
+
+def test_bidirectional_joins_halves(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should join forward and backward halves at intermediate airports"""
+    searcher = BidirectionalPathSearcher(hub_graph, validator)
+
+    paths = searcher.find_paths("BUE", "LON", date(2024, 9, 12), 3)
+
+    assert sorted(_flight_numbers(hub_graph, paths)) == [
+        ["AA100", "IB301"],
+        ["AA100", "IB400", "AF500"],
+        ["BA200"],
+    ]
+
+
+def test_bidirectional_skips_too_long_paths(
+    hub_graph: FlightGraph, validator: DefaultJourneyValidator
+):
+    """Should not return paths exceeding the max journey time"""
+    validator.max_flight_time = timedelta(hours=17)
+    searcher = BidirectionalPathSearcher(hub_graph, validator)
+
+    paths = searcher.find_paths("BUE", "LON", date(2024, 9, 12), 3)
+
+    assert sorted(_flight_numbers(hub_graph, paths)) == [
+        ["AA100", "IB301"],
+        ["BA200"],
+    ]
+
+
+@pytest.mark.parametrize("limit", [None, 1, 2])
+@pytest.mark.parametrize("max_flights", [1, 2, 3])
+def test_time_aware_to_many_matches_find_paths(
+    hub_graph: FlightGraph,
+    validator: DefaultJourneyValidator,
+    limit: int,
+    max_flights: int,
+):
+    """Should return the same paths as one search per destination"""
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+    destinations = ["LON", "MAD", "PAR", "BUE"]
+
+    paths = searcher.find_paths_to_many(
+        "BUE", destinations, date(2024, 9, 12), max_flights, limit
+    )
+
+    assert paths == {
+        destination: searcher.find_paths(
+            "BUE", destination, date(2024, 9, 12), max_flights, limit
+        )
+        for destination in destinations
+    }
+
+
+@pytest.mark.parametrize("limit", [None, 1])
+@pytest.mark.parametrize("destination", ["LON", "PAR", "MAD"])
+def test_time_aware_by_day_matches_find_paths(
+    hub_graph: FlightGraph,
+    validator: DefaultJourneyValidator,
+    limit: int,
+    destination: str,
+):
+    """Should return the same paths as one search per date"""
+    searcher = TimeAwarePathSearcher(hub_graph, validator)
+    days = [date(2024, 9, 11), date(2024, 9, 12), date(2024, 9, 13)]
+
+    paths = searcher.find_paths_by_day(
+        "BUE", destination, days[0], days[-1], 3, limit
+    )
+
+    assert paths == {
+        day: searcher.find_paths("BUE", destination, day, 3, limit)
+        for day in days
+    }
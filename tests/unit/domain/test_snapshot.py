@@ -0,0 +1,141 @@
+import pytest
+import struct
+from datetime import date, datetime, timedelta
+
+from app.domain.flight_graph import FlightGraph
+from app.domain.flight_graph.exceptions import SnapshotError
+from app.domain.flight_graph.snapshot import SNAPSHOT_VERSION
+from app.domain.journey.searchers import (
+    BidirectionalPathSearcher,
+    ConnectionScanSearcher,
+    TimeAwarePathSearcher,
+)
+from app.domain.journey.validators import DefaultJourneyValidator
+from app.services.flight_events import FlightEvent
+
+WINDOW = (timedelta(hours=1), timedelta(hours=4))
+
+
+@pytest.fixture
+def snapshot_path(flight_graph_with_flights: FlightGraph, tmp_path):
+    path = str(tmp_path / "graph.snapshot")
+    flight_graph_with_flights.build_indexes([WINDOW])
+    flight_graph_with_flights.save_snapshot(path, {"etag": '"v1"'})
+    return path
+
+
+def test_snapshot_round_trip(
+    flight_graph_with_flights: FlightGraph, snapshot_path: str
+):
+    """Should restore the same flights, version and metadata"""
+    graph, metadata = FlightGraph.load_snapshot(snapshot_path)
+
+    assert metadata == {"etag": '"v1"'}
+    assert graph.version == flight_graph_with_flights.version
+    assert graph.read_only
+    assert [
+        graph.get_flight_details(flight_id)
+        for flight_id in range(len(graph.flights))
+    ] == [
+        flight_graph_with_flights.get_flight_details(flight_id)
+        for flight_id in range(len(flight_graph_with_flights.flights))
+    ]
+    assert sorted(graph.graph.edges(keys=True)) == sorted(
+        flight_graph_with_flights.graph.edges(keys=True)
+    )
+    assert graph.find_flight_id("AA100", datetime(2024, 9, 13, 8, 0)) == 2
+
+
+@pytest.mark.parametrize(
+    "searcher_class",
+    [
+        TimeAwarePathSearcher,
+        ConnectionScanSearcher,
+        BidirectionalPathSearcher,
+    ],
+)
+def test_snapshot_restores_indexes(
+    flight_graph_with_flights: FlightGraph,
+    snapshot_path: str,
+    searcher_class,
+):
+    """Should search the restored graph like the original one"""
+    graph, _ = FlightGraph.load_snapshot(snapshot_path)
+    validator = DefaultJourneyValidator(
+        min_connection_time=WINDOW[0],
+        max_connection_time=WINDOW[1],
+        max_flight_time=timedelta(hours=24),
+    )
+
+    assert WINDOW in graph._transfer_indexes
+    for departure_date in (date(2024, 9, 12), date(2024, 9, 13)):
+        expected = searcher_class(
+            flight_graph_with_flights, validator
+        ).find_paths("BUE", "LON", departure_date, 2)
+        paths = searcher_class(graph, validator).find_paths(
+            "BUE", "LON", departure_date, 2
+        )
+        assert paths == expected
+
+
+def test_snapshot_is_read_only(snapshot_path: str):
+    """Should not allow changes to a restored graph"""
+    graph, _ = FlightGraph.load_snapshot(snapshot_path)
+
+    with pytest.raises(TypeError):
+        graph.add_flight(
+            FlightEvent(
+                flight_number="AF500",
+                departure_city="PAR",
+                arrival_city="LON",
+                departure_datetime=datetime(2024, 9, 13, 1, 0),
+                arrival_datetime=datetime(2024, 9, 13, 2, 0),
+            )
+        )
+
+
+def test_snapshot_of_restored_graph(snapshot_path: str, tmp_path):
+    """Should save a restored graph again"""
+    graph, _ = FlightGraph.load_snapshot(snapshot_path)
+    path = str(tmp_path / "copy.snapshot")
+
+    graph.save_snapshot(path)
+    copy, metadata = FlightGraph.load_snapshot(path)
+
+    assert copy.version == graph.version
+    assert metadata == {}
+
+
+def _corrupt(path: str, position: int, data: bytes) -> None:
+    with open(path, "r+b") as file:
+        file.seek(position)
+        file.write(data)
+
+
+def test_snapshot_rejects_corrupted_file(snapshot_path: str):
+    """Should detect changed bytes with the checksum"""
+    with open(snapshot_path, "rb") as file:
+        size = len(file.read())
+    _corrupt(snapshot_path, size - 1, b"\xff")
+
+    with pytest.raises(SnapshotError, match="corrupted"):
+        FlightGraph.load_snapshot(snapshot_path)
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    """Should reject files that are not snapshots"""
+    path = tmp_path / "graph.snapshot"
+    path.write_bytes(b"[]" * 20)
+
+    with pytest.raises(SnapshotError, match="not a flight graph snapshot"):
+        FlightGraph.load_snapshot(str(path))
+    with pytest.raises(SnapshotError, match="Cannot read"):
+        FlightGraph.load_snapshot(str(tmp_path / "missing.snapshot"))
+
+
+def test_snapshot_rejects_other_versions(snapshot_path: str):
+    """Should reject snapshots of another format version"""
+    _corrupt(snapshot_path, 8, struct.pack("<I", SNAPSHOT_VERSION + 1))
+
+    with pytest.raises(SnapshotError, match="Unsupported snapshot version"):
+        FlightGraph.load_snapshot(snapshot_path)
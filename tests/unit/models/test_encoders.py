@@ -0,0 +1,87 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.models.encoders import JourneyEncoder
+from app.models.journey import (
+    DailyJourneys,
+    Journey,
+    JourneyQuery,
+    JourneySearchResult,
+    PathFlight,
+)
+
+
+def _response_body(response_type: Any, content: Any) -> bytes:
+    """Body FastAPI renders for a validated response model"""
+    return json.dumps(
+        TypeAdapter(response_type).dump_python(
+            content, mode="json", by_alias=True
+        ),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode()
+
+
+@pytest.fixture
+def journeys() -> List[Journey]:
+    flights = []
+    for index, tz in enumerate(
+        [None, timezone.utc, timezone(timedelta(hours=-3))]
+    ):
+        departure = datetime(2024, 9, 12, 8, index, 0, 1500 * index, tz)
+        flights.append(
+            PathFlight.model_construct(
+                flight_number=f'IB"{index}ñ',
+                from_="MAD",
+                to="BUE",
+                departure_time=departure,
+                arrival_time=departure + timedelta(hours=12),
+            )
+        )
+    return [
+        Journey(connections=1, path=[flights[0], flights[1]]),
+        Journey(connections=0, path=[flights[2]]),
+        Journey(connections=1, path=[flights[1], flights[2]]),
+    ]
+
+
+def test_journeys_match_response_model(journeys: List[Journey]):
+    """Should encode the same bytes as the List[Journey] response"""
+    encoder = JourneyEncoder()
+
+    assert encoder.journeys(journeys) == _response_body(
+        List[Journey], journeys
+    )
+    assert b'"from":"MAD"' in encoder.journeys(journeys)
+    assert encoder.journeys([]) == b"[]"
+
+
+def test_daily_journeys_match_response_model(journeys: List[Journey]):
+    """Should encode the same bytes as the DailyJourneys response"""
+    day = date(2024, 9, 12)
+
+    assert JourneyEncoder().daily_journeys(day, journeys) == _response_body(
+        DailyJourneys, DailyJourneys(departure_date=day, journeys=journeys)
+    )
+
+
+@pytest.mark.parametrize("error", [None, "Destination city 'X\"' not found"])
+def test_search_result_matches_response_model(journeys: List[Journey], error):
+    """Should encode the same bytes as the JourneySearchResult response"""
+    query = JourneyQuery.model_validate(
+        {"from": "MAD", "to": "BUE", "departure_date": "2024-09-12"}
+    )
+    found = [] if error else journeys
+
+    assert JourneyEncoder().search_result(
+        query, found, error
+    ) == _response_body(
+        JourneySearchResult,
+        JourneySearchResult(**query.model_dump(), journeys=found, error=error),
+    )
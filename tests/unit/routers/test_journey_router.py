@@ -0,0 +1,259 @@
+import base64
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_journey_finder
+from app.domain.flight_graph import FlightGraph
+from app.domain.journey.builders import DefaultJourneyPathBuilder
+from app.domain.journey.journey_finder import JourneyFinder
+from app.domain.journey.searchers import SearchMode
+from app.domain.journey.sorters import TimeAndConnectionsSorter
+from app.domain.journey.validators import DefaultJourneyValidator
+from app.routers.journey import (
+    MAX_SEARCH_DAYS,
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    router,
+)
+from app.services.flight_events import FlightEvent
+
+SEARCH_URL = "/journeys/search?from=BUE&to=MAD&departure_date=2024-09-12"
+
+
+def _flight(number: str, day: int, hour: int) -> FlightEvent:
+    departure = datetime(2024, 9, day, hour, 0)
+    return FlightEvent(
+        flight_number=number,
+        departure_city="BUE",
+        arrival_city="MAD",
+        departure_datetime=departure,
+        arrival_datetime=departure + timedelta(hours=2, minutes=hour),
+    )
+
+
+@pytest.fixture
+def graph() -> FlightGraph:
+    graph = FlightGraph()
+    graph.add_flights(
+        [_flight(f"AA{hour}", 12, hour) for hour in range(8, 14)]
+        + [_flight("AA20", 13, 20)]
+    )
+    return graph
+
+
+@pytest.fixture
+def client(graph: FlightGraph) -> TestClient:
+    validator = DefaultJourneyValidator(
+        min_connection_time=timedelta(hours=1),
+        max_connection_time=timedelta(hours=4),
+        max_flight_time=timedelta(hours=24),
+    )
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_journey_finder] = lambda: JourneyFinder(
+        graph,
+        validator,
+        DefaultJourneyPathBuilder(),
+        TimeAndConnectionsSorter(),
+        search_mode=SearchMode.TIME_AWARE,
+    )
+    return TestClient(app)
+
+
+def _flight_numbers(journeys) -> list:
+    return [journey["path"][0]["flight_number"] for journey in journeys]
+
+
+def test_search_journeys(client: TestClient):
+    """Should return the journeys of the date as a JSON array"""
+    response = client.get(SEARCH_URL)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert _flight_numbers(response.json()) == [
+        f"AA{hour}" for hour in range(8, 14)
+    ]
+    assert response.json()[0] == {
+        "connections": 0,
+        "path": [
+            {
+                "flight_number": "AA8",
+                "from": "BUE",
+                "to": "MAD",
+                "departure_time": "2024-09-12T08:00:00",
+                "arrival_time": "2024-09-12T10:08:00",
+            }
+        ],
+    }
+
+
+def test_search_journeys_unknown_airport(client: TestClient):
+    """Should answer 404 for an unknown airport"""
+    response = client.get(SEARCH_URL.replace("to=MAD", "to=XXX"))
+
+    assert response.status_code == 404
+
+
+def test_search_journeys_batch(client: TestClient):
+    """Should answer every query, with an error for unknown airports"""
+    response = client.post(
+        "/journeys/search/batch?limit=2",
+        json=[
+            {"from": "BUE", "to": "MAD", "departure_date": "2024-09-12"},
+            {"from": "BUE", "to": "XXX", "departure_date": "2024-09-12"},
+        ],
+    )
+
+    assert response.status_code == 200
+    found, missing = response.json()
+    assert found["from"] == "BUE"
+    assert found["error"] is None
+    assert _flight_numbers(found["journeys"]) == ["AA8", "AA9"]
+    assert missing == {
+        "from": "BUE",
+        "to": "XXX",
+        "departure_date": "2024-09-12",
+        "journeys": [],
+        "error": "Destination city 'XXX' not found",
+    }
+
+
+def test_search_journeys_batch_invalid_limit(client: TestClient):
+    """Should answer 422 for a limit below one"""
+    response = client.post("/journeys/search/batch?limit=0", json=[])
+
+    assert response.status_code == 422
+
+
+def test_search_journeys_date_range(client: TestClient):
+    """Should return the journeys of every date of the range"""
+    response = client.get(f"{SEARCH_URL}&departure_date_to=2024-09-13")
+
+    assert response.status_code == 200
+    days = response.json()
+    assert [day["departure_date"] for day in days] == [
+        "2024-09-12",
+        "2024-09-13",
+    ]
+    assert len(days[0]["journeys"]) == 6
+    assert _flight_numbers(days[1]["journeys"]) == ["AA20"]
+
+
+def test_search_journeys_longest_date_range(client: TestClient):
+    """Should accept a range of exactly MAX_SEARCH_DAYS dates"""
+    response = client.get(f"{SEARCH_URL}&departure_date_to=2024-10-12")
+
+    assert response.status_code == 200
+    assert len(response.json()) == MAX_SEARCH_DAYS
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "&departure_date_to=2024-09-11",
+        "&departure_date_to=2024-10-13",
+        "&departure_date_to=2024-09-27&flex_days=10",
+        "&flex_days=-1",
+        "&flex_days=1000000000",
+        "&departure_date_to=9999-12-31&flex_days=1",
+        "&departure_date=0001-01-01&flex_days=1",
+    ],
+)
+def test_search_journeys_invalid_date_range(client: TestClient, query: str):
+    """Should answer 422 for reversed, too long or out of range dates"""
+    url = SEARCH_URL
+    if "departure_date=" in query:
+        url = url.replace("&departure_date=2024-09-12", "")
+    assert client.get(url + query).status_code == 422
+
+
+def test_search_journeys_ndjson(client: TestClient):
+    """Should stream one journey per line when NDJSON is accepted"""
+    response = client.get(
+        SEARCH_URL, headers={"Accept": f"{NDJSON_MEDIA_TYPE}, */*"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    assert [
+        json.loads(line) for line in response.text.splitlines()
+    ] == client.get(SEARCH_URL).json()
+
+
+def test_search_journeys_flex_days_ndjson(client: TestClient):
+    """Should stream one line per date around the departure date"""
+    response = client.get(
+        f"{SEARCH_URL}&flex_days=1&limit=1",
+        headers={"Accept": NDJSON_MEDIA_TYPE},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    days = [json.loads(line) for line in response.text.splitlines()]
+    assert [
+        (day["departure_date"], _flight_numbers(day["journeys"]))
+        for day in days
+    ] == [
+        ("2024-09-11", []),
+        ("2024-09-12", ["AA8"]),
+        ("2024-09-13", ["AA20"]),
+    ]
+
+
+@pytest.mark.parametrize("accept", ["application/json", NDJSON_MEDIA_TYPE])
+def test_search_journeys_pages(client: TestClient, accept: str):
+    """Should page through the journeys with the next cursor header"""
+    first = client.get(f"{SEARCH_URL}&limit=4", headers={"Accept": accept})
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    second = client.get(
+        f"{SEARCH_URL}&limit=4&cursor={cursor}", headers={"Accept": accept}
+    )
+
+    def journeys(response) -> list:
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    assert second.status_code == 200
+    assert NEXT_CURSOR_HEADER not in second.headers
+    pages = (
+        journeys(first) + journeys(second)
+        if accept == NDJSON_MEDIA_TYPE
+        else first.json() + second.json()
+    )
+    assert pages == client.get(SEARCH_URL).json()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "xyz",
+        # Decodes to a list whose key is an object instead of a pair
+        base64.urlsafe_b64encode(b'[1,"A0","A2","2024-03-20",{},[]]').decode(),
+    ],
+)
+def test_search_journeys_invalid_cursor(client: TestClient, cursor: str):
+    """Should answer 400 for a cursor that is not one"""
+    response = client.get(f"{SEARCH_URL}&limit=2&cursor={cursor}")
+
+    assert response.status_code == 400
+
+
+def test_search_journeys_stale_cursor(client: TestClient, graph: FlightGraph):
+    """Should answer 410 once the flights changed under a cursor"""
+    cursor = client.get(f"{SEARCH_URL}&limit=2").headers[NEXT_CURSOR_HEADER]
+    graph.add_flight(_flight("AA14", 12, 14))
+
+    response = client.get(f"{SEARCH_URL}&limit=2&cursor={cursor}")
+
+    assert response.status_code == 410
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["&cursor=xyz", "&limit=2&cursor=xyz&departure_date_to=2024-09-13"],
+)
+def test_search_journeys_cursor_unprocessable(client: TestClient, query: str):
+    """Should answer 422 for a cursor without limit or with a date range"""
+    assert client.get(SEARCH_URL + query).status_code == 422
@@ -1,13 +1,16 @@
+import asyncio
 import pytest
 import pytest_asyncio
 import httpx
-from datetime import datetime
+import json
+from datetime import date, datetime, timedelta
 from typing import List
 from unittest.mock import AsyncMock, Mock, patch
 
 from app.services.flight_events import FlightEvent
 from app.services.flight_events.flight_events_api import FlightEventsAPIService
 from app.services.flight_events.exceptions import FlightEventsAPIError
+from app.services.flight_events.resilience import RetryPolicy
 
 
 @pytest_asyncio.fixture
@@ -40,7 +43,7 @@ async def mock_httpx_client(sample_api_response):
     mock_client = AsyncMock()
     mock_response = Mock()
     mock_response.status_code = 200
-    mock_response.json.return_value = sample_api_response
+    mock_response.content = json.dumps(sample_api_response).encode()
     mock_response.raise_for_status.return_value = None
 
     mock_client.get.return_value = mock_response
@@ -59,7 +62,7 @@ async def test_get_flight_events_success(
 
         # Verify the API was called correctly
         mock_httpx_client.get.assert_called_once_with(
-            "http://test-api.com/flights", timeout=30.0
+            "http://test-api.com/flights", headers={}, timeout=30.0
         )
 
         # Verify response parsing
@@ -93,7 +96,7 @@ async def test_invalid_response_format(
     """Should handle invalid response format"""
     mock_response = Mock()
     mock_response.status_code = 200
-    mock_response.json.return_value = [{"invalid": "data"}]
+    mock_response.content = b'[{"invalid": "data"}]'
     mock_response.raise_for_status.return_value = None
     mock_httpx_client.get.return_value = mock_response
 
@@ -102,3 +105,258 @@ async def test_invalid_response_format(
             await api_service.get_flight_events()
 
         assert "validation error" in str(exc_info.value).lower()
+
+
+@pytest.mark.asyncio
+async def test_malformed_response_body(
+    api_service: FlightEventsAPIService, mock_httpx_client
+):
+    """Should handle a body that is not valid JSON"""
+    mock_httpx_client.get.return_value.content = b'[{"flight_number": '
+
+    with patch("httpx.AsyncClient", return_value=mock_httpx_client):
+        with pytest.raises(FlightEventsAPIError) as exc_info:
+            await api_service.get_flight_events()
+
+        assert "Error validating flight events" in str(exc_info.value)
+
+
+def _streaming_client(content: bytes, status_code: int = 200):
+    async def stream():
+        # Split the body in small chunks to cut events in the middle
+        for start in range(0, len(content), 16):
+            yield content[start : start + 16]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status_code, content=stream())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_stream_flight_events(
+    api_service: FlightEventsAPIService, sample_api_response
+):
+    """Should parse and validate events while the body is streamed"""
+    client = _streaming_client(json.dumps(sample_api_response).encode())
+
+    with patch("httpx.AsyncClient", return_value=client):
+        events = [event async for event in api_service.stream_flight_events()]
+
+    assert [event.flight_number for event in events] == ["AA100", "IB200"]
+    assert events[1].departure_datetime == datetime(2024, 9, 13, 10, 0)
+
+
+@pytest.mark.asyncio
+async def test_stream_flight_events_invalid_json(
+    api_service: FlightEventsAPIService, sample_api_response
+):
+    """Should raise FlightEventsAPIError on a truncated body"""
+    content = json.dumps(sample_api_response).encode()[:-10]
+    client = _streaming_client(content)
+
+    with patch("httpx.AsyncClient", return_value=client):
+        with pytest.raises(FlightEventsAPIError) as exc_info:
+            async for _ in api_service.stream_flight_events():
+                pass
+
+    assert "Error parsing flight events" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_stream_flight_events_http_error(
+    api_service: FlightEventsAPIService,
+):
+    """Should raise FlightEventsAPIError on an error response"""
+    client = _streaming_client(b"[]", status_code=500)
+    api_service.retry = RetryPolicy(backoff=0)
+
+    with patch("httpx.AsyncClient", return_value=client):
+        with pytest.raises(FlightEventsAPIError) as exc_info:
+            async for _ in api_service.stream_flight_events():
+                pass
+
+    assert "Error fetching flight events" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_get_flight_events_with_shared_client(sample_api_response):
+    """Should reuse the given client and leave it open"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=sample_api_response)
+
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), timeout=5.0
+    ) as client:
+        service = FlightEventsAPIService(
+            api_url="http://test-api.com/flights", client=client
+        )
+
+        for _ in range(2):
+            events = await service.get_flight_events()
+            assert len(events) == 2
+        assert not client.is_closed
+
+    assert [str(request.url) for request in requests] == [
+        "http://test-api.com/flights"
+    ] * 2
+    # The timeouts of the shared client apply, not the service's
+    assert requests[0].extensions["timeout"] == httpx.Timeout(5.0).as_dict()
+
+
+@pytest.mark.asyncio
+async def test_fetch_flight_events_not_modified():
+    """Should send the validators and return no events on a 304"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(304)
+
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), timeout=5.0
+    ) as client:
+        service = FlightEventsAPIService(
+            api_url="http://test-api.com/flights", client=client
+        )
+        feed = await service.fetch_flight_events(
+            etag='"v1"', last_modified="Thu, 12 Sep 2024 08:00:00 GMT"
+        )
+
+    assert feed.not_modified
+    assert feed.etag == '"v1"'
+    assert requests[0].headers["If-None-Match"] == '"v1"'
+    assert (
+        requests[0].headers["If-Modified-Since"]
+        == "Thu, 12 Sep 2024 08:00:00 GMT"
+    )
+
+
+def _windowed_service(handler, **kwargs) -> FlightEventsAPIService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return FlightEventsAPIService(
+        api_url="http://test-api.com/flights", client=client, **kwargs
+    )
+
+
+def _daily_event(day: str) -> dict:
+    return {
+        "flight_number": f"AA{day[-2:]}",
+        "departure_city": "BUE",
+        "arrival_city": "MAD",
+        "departure_datetime": f"{day}T08:00:00",
+        "arrival_datetime": f"{day}T20:00:00",
+    }
+
+
+@pytest.mark.asyncio
+async def test_fetch_flight_events_between_windows():
+    """Should fetch date windows concurrently and merge them in order"""
+    running = 0
+    max_running = 0
+    windows = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal running, max_running
+        first = date.fromisoformat(request.url.params["departure_from"])
+        last = date.fromisoformat(request.url.params["departure_to"])
+        windows.append((first, last))
+        running += 1
+        max_running = max(max_running, running)
+        # Later windows answer first
+        await asyncio.sleep(0.01 * (10 - first.day))
+        running -= 1
+        days = (last - first).days + 1
+        return httpx.Response(
+            200,
+            json=[
+                _daily_event((first + timedelta(days=i)).isoformat())
+                for i in range(days)
+            ],
+        )
+
+    service = _windowed_service(handler, window_days=2, concurrency=2)
+    events = await service.fetch_flight_events_between(
+        date(2024, 9, 1), date(2024, 9, 5)
+    )
+
+    assert sorted(windows) == [
+        (date(2024, 9, 1), date(2024, 9, 2)),
+        (date(2024, 9, 3), date(2024, 9, 4)),
+        (date(2024, 9, 5), date(2024, 9, 5)),
+    ]
+    assert max_running == 2
+    assert [event.flight_number for event in events] == [
+        "AA01",
+        "AA02",
+        "AA03",
+        "AA04",
+        "AA05",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_flight_events_between_retries_window():
+    """Should retry a window failing with a server error"""
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request.url.params["departure_from"])
+        if len(attempts) == 1:
+            return httpx.Response(503)
+        # Events outside the window are dropped
+        return httpx.Response(
+            200,
+            json=[_daily_event("2024-09-01"), _daily_event("2024-09-02")],
+        )
+
+    service = _windowed_service(
+        handler, window_days=1, retry=RetryPolicy(retries=1, backoff=0)
+    )
+    events = await service.fetch_flight_events_between(
+        date(2024, 9, 1), date(2024, 9, 1)
+    )
+
+    assert attempts == ["2024-09-01", "2024-09-01"]
+    assert [event.flight_number for event in events] == ["AA01"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_flight_events_between_client_error():
+    """Should not retry client errors"""
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        return httpx.Response(400)
+
+    service = _windowed_service(
+        handler, window_days=1, retry=RetryPolicy(retries=3, backoff=0)
+    )
+    with pytest.raises(FlightEventsAPIError) as exc_info:
+        await service.fetch_flight_events_between(
+            date(2024, 9, 1), date(2024, 9, 1)
+        )
+
+    assert "Error fetching flight events" in str(exc_info.value)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_flight_events_in_windows():
+    """Should fetch the horizon in windows when window_days is set"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=[])
+
+    service = _windowed_service(handler, window_days=7, horizon_days=30)
+    feed = await service.fetch_flight_events()
+
+    assert feed.events == []
+    assert feed.etag is None
+    assert len(requests) == 5
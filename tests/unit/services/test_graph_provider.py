@@ -0,0 +1,398 @@
+import asyncio
+import httpx
+import pytest
+import threading
+from typing import Any, Callable, List
+
+from app.domain.flight_graph import FlightGraph
+from app.services.flight_events.exceptions import FlightEventsAPIError
+from app.services.flight_events.flight_events_api import FlightEventsAPIService
+from app.services.flight_events.resilience import CircuitBreaker, RetryPolicy
+from app.services.graph_provider import (
+    FlightGraphProvider,
+    SharedFlightGraphProvider,
+)
+
+API_URL = "http://test-api.com/flights"
+
+
+class StubFeed:
+    """Flight events API answering 304 while its ETag matches"""
+
+    def __init__(self, events: List[dict]):
+        self.events = events
+        self.version = 1
+        self.requests: List[httpx.Request] = []
+
+    @property
+    def etag(self) -> str:
+        return f'"v{self.version}"'
+
+    def update(self, events: List[dict]) -> None:
+        self.events = events
+        self.version += 1
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(
+            200, json=self.events, headers={"ETag": self.etag}
+        )
+
+
+@pytest.fixture
+def events() -> List[dict]:
+    return [
+        {
+            "flight_number": "AA100",
+            "departure_city": "BUE",
+            "arrival_city": "MAD",
+            "departure_datetime": "2024-09-12T08:00:00",
+            "arrival_datetime": "2024-09-12T20:00:00",
+        },
+        {
+            "flight_number": "IB200",
+            "departure_city": "MAD",
+            "arrival_city": "LON",
+            "departure_datetime": "2024-09-12T22:00:00",
+            "arrival_datetime": "2024-09-13T00:30:00",
+        },
+    ]
+
+
+@pytest.fixture
+def feed(events: List[dict]) -> StubFeed:
+    return StubFeed(events)
+
+
+@pytest.fixture
+def provider(feed: StubFeed) -> FlightGraphProvider:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(feed.handler))
+    return FlightGraphProvider(
+        FlightEventsAPIService(api_url=API_URL, client=client)
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_graph_cached_until_expired(
+    provider: FlightGraphProvider, feed: StubFeed
+):
+    """Should only fetch the feed again once the graph expired"""
+    graph = await provider.get_graph()
+
+    assert await provider.get_graph() is graph
+    assert len(feed.requests) == 1
+    assert "If-None-Match" not in feed.requests[0].headers
+
+
+@pytest.mark.asyncio
+async def test_refresh_not_modified(
+    provider: FlightGraphProvider, feed: StubFeed
+):
+    """Should keep the graph untouched when the feed answers 304"""
+    graph = await provider.refresh()
+    version = graph.version
+
+    assert await provider.refresh() is graph
+    assert graph.version == version
+    assert feed.requests[1].headers["If-None-Match"] == '"v1"'
+    assert provider.etag == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_refresh_applies_delta(
+    provider: FlightGraphProvider, feed: StubFeed, events: List[dict]
+):
+    """Should derive the new graph from the changed flights"""
+    graph = await provider.refresh()
+    feed.update([{**events[0], "arrival_datetime": "2024-09-12T21:00:00"}])
+
+    new_graph = await provider.refresh()
+    assert new_graph is not graph
+    assert len(new_graph.flights) == 1
+    assert new_graph.get_flight_details(0).arrival_datetime.hour == 21
+    assert len(graph.flights) == len(events)
+    assert provider.etag == '"v2"'
+
+
+@pytest.mark.asyncio
+async def test_refresh_builds_graph_off_event_loop(
+    provider: FlightGraphProvider,
+    feed: StubFeed,
+    events: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Should build and derive graphs in a worker thread"""
+    threads: List[int] = []
+
+    def in_thread(method: Callable) -> Callable:
+        def record(*args: Any) -> Any:
+            threads.append(threading.get_ident())
+            return method(*args)
+
+        return record
+
+    for name in ("add_flights", "with_flights"):
+        monkeypatch.setattr(
+            FlightGraph, name, in_thread(getattr(FlightGraph, name))
+        )
+    await provider.refresh()
+    feed.update(events[:1])
+    await provider.refresh()
+
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_stream_indexes_graph_off_event_loop(
+    provider: FlightGraphProvider,
+    events: List[dict],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Should add streamed events as they arrive and index in a thread"""
+    threads: List[int] = []
+    build_indexes = FlightGraph.build_indexes
+
+    def record(graph: FlightGraph, *args: Any) -> None:
+        threads.append(threading.get_ident())
+        assert len(graph.flights) == len(events)
+        build_indexes(graph, *args)
+
+    monkeypatch.setattr(FlightGraph, "build_indexes", record)
+    provider.stream = True
+    graph = await provider.refresh()
+
+    assert len(threads) == 1
+    assert threading.get_ident() not in threads
+    assert len(graph.flights) == len(events)
+
+
+@pytest.mark.asyncio
+async def test_refresh_rebuilds_without_delta(
+    provider: FlightGraphProvider, feed: StubFeed, events: List[dict]
+):
+    """Should build a new graph for a changed feed when deltas are off"""
+    provider.delta = False
+    graph = await provider.refresh()
+    feed.update(events[:1])
+
+    new_graph = await provider.refresh()
+
+    assert new_graph is not graph
+    assert len(new_graph.flights) == 1
+    assert len(graph.flights) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_refresh(
+    provider: FlightGraphProvider, feed: StubFeed
+):
+    """Should fetch the feed once for concurrent first requests"""
+    graphs = await asyncio.gather(*(provider.get_graph() for _ in range(5)))
+
+    assert all(graph is graphs[0] for graph in graphs)
+    assert len(feed.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_graph_served_while_refreshing(
+    provider: FlightGraphProvider, feed: StubFeed, events: List[dict]
+):
+    """Should return the stale graph and refresh it in the background"""
+    provider.delta = False
+    graph = await provider.get_graph()
+    feed.update(events[:1])
+    provider.ttl = 0
+
+    await provider.refresh()
+    assert await provider.get_graph() is not graph
+    stale = provider.graph
+    feed.update(events)
+
+    assert await provider.get_graph() is stale
+    assert await provider.get_graph() is stale
+    new_graph = await provider.refresh()
+    assert new_graph is not stale
+    assert len(new_graph.flights) == 2
+    assert len(feed.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_background_refresh(
+    provider: FlightGraphProvider, feed: StubFeed
+):
+    """Should build the graph from the background task until stopped"""
+    provider.start()
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if provider.graph is not None:
+            break
+
+    assert provider.graph is not None
+    await provider.stop()
+    assert len(feed.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_start_from_snapshot(
+    feed: StubFeed, events: List[dict], tmp_path
+):
+    """Should serve the saved graph and refresh it conditionally"""
+    path = str(tmp_path / "graph.snapshot")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(feed.handler))
+    service = FlightEventsAPIService(api_url=API_URL, client=client)
+    graph = await FlightGraphProvider(service, snapshot_path=path).refresh()
+
+    provider = FlightGraphProvider(service, snapshot_path=path)
+    assert provider.load_snapshot(path)
+    assert provider.graph is not None
+    assert provider.graph.version == graph.version
+    assert provider.etag == '"v1"'
+
+    snapshot_graph = provider.graph
+    assert await provider.refresh() is snapshot_graph
+    feed.update(events[:1])
+    new_graph = await provider.refresh()
+    assert not new_graph.read_only
+    assert len(new_graph.flights) == 1
+    assert provider.load_snapshot(path)
+    assert provider.graph.version == new_graph.version
+
+
+def test_warm_start_without_snapshot(provider: FlightGraphProvider, tmp_path):
+    """Should start without a graph when there is no snapshot"""
+    assert not provider.load_snapshot(str(tmp_path / "missing.snapshot"))
+    assert provider.graph is None
+
+
+@pytest.fixture
+def workers(feed: StubFeed, tmp_path) -> List[SharedFlightGraphProvider]:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(feed.handler))
+    service = FlightEventsAPIService(api_url=API_URL, client=client)
+    path = str(tmp_path / "graph.snapshot")
+    return [
+        SharedFlightGraphProvider(service, path, poll_interval=0.01)
+        for _ in range(2)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_follower_attaches_to_published_graph(
+    workers: List[SharedFlightGraphProvider], feed: StubFeed
+):
+    """Should refresh from a single worker and share its snapshots"""
+    leader, follower = workers
+    leader.start()
+    follower.start()
+    try:
+        assert leader.is_leader
+        assert not follower.is_leader
+
+        graph = await asyncio.wait_for(follower.get_graph(), 1)
+        assert graph.read_only
+        assert graph.version == leader.graph.version
+        assert follower.generation == 1
+
+        feed.update(feed.events[:1])
+        await leader.refresh()
+        while follower.generation < 2:
+            await asyncio.sleep(0.01)
+        assert len((await follower.get_graph()).flights) == 1
+        assert len(feed.requests) == 2
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_follower_loads_snapshot_off_event_loop(
+    workers: List[SharedFlightGraphProvider],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Should load published snapshots in a worker thread"""
+    leader, follower = workers
+    threads: List[int] = []
+    load_snapshot = follower.load_snapshot
+
+    def record(path: str) -> bool:
+        threads.append(threading.get_ident())
+        return load_snapshot(path)
+
+    monkeypatch.setattr(follower, "load_snapshot", record)
+    leader.start()
+    follower.start()
+    try:
+        await asyncio.wait_for(follower.get_graph(), 1)
+
+        assert threads
+        assert threading.get_ident() not in threads
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_refresh(
+    workers: List[SharedFlightGraphProvider],
+):
+    """Should let another worker refresh once the leader stops"""
+    leader, follower = workers
+    leader.start()
+    await leader.get_graph()
+    follower.start()
+    try:
+        await leader.stop()
+        while not follower.is_leader:
+            await asyncio.sleep(0.01)
+
+        assert (await follower.get_graph()) is follower.graph
+    finally:
+        await follower.stop()
+
+
+@pytest.mark.asyncio
+async def test_follower_stops_waiting_for_first_graph(
+    workers: List[SharedFlightGraphProvider],
+):
+    """Should fail requests when the leader publishes no graph in time"""
+    leader, follower = workers
+    # Holds the lock without ever refreshing
+    assert leader._acquire_lock()
+    follower.wait_timeout = 0.05
+    follower.start()
+    try:
+        with pytest.raises(FlightEventsAPIError):
+            await asyncio.wait_for(follower.get_graph(), 1)
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_last_good_graph_served_while_circuit_open(feed: StubFeed):
+    """Should keep the last graph and stop refreshing while upstream fails"""
+    healthy = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not healthy:
+            return httpx.Response(503)
+        return feed.handler(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service = FlightEventsAPIService(
+        api_url=API_URL,
+        client=client,
+        retry=RetryPolicy(retries=0),
+        breaker=CircuitBreaker(failure_threshold=1),
+    )
+    provider = FlightGraphProvider(service, ttl=0)
+    graph = await provider.get_graph()
+    healthy = False
+
+    with pytest.raises(FlightEventsAPIError):
+        await provider.refresh()
+    assert service.circuit_open
+    assert await provider.get_graph() is graph
+    assert provider._refresh_task is None
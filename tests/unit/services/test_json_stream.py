@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.services.flight_events.json_stream import JSONArrayStream
+
+
+DOCUMENT = json.dumps(
+    [
+        {"flight_number": "AA100", "note": 'a,]"b'},
+        [1, {"c": None}],
+        "é 漢",
+        -2.5e3,
+        12345,
+        True,
+    ]
+).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64])
+def test_parses_elements_split_across_chunks(chunk_size: int):
+    """Should return every element once it is complete"""
+    parser = JSONArrayStream()
+    elements = []
+    for start in range(0, len(DOCUMENT), chunk_size):
+        elements += parser.feed(DOCUMENT[start : start + chunk_size])
+    elements += parser.close()
+
+    assert elements == json.loads(DOCUMENT)
+
+
+def test_returns_elements_as_they_arrive():
+    """Should not wait for the end of the array"""
+    parser = JSONArrayStream()
+
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b": 2}, 3") == [{"b": 2}]
+    assert parser.feed(b"4]") == [34]
+    assert parser.close() == []
+
+
+def test_empty_array():
+    """Should accept an empty array split in chunks"""
+    parser = JSONArrayStream()
+
+    assert parser.feed(b" [ ") == []
+    assert parser.feed(b"] ") == []
+    assert parser.close() == []
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b'{"a": 1}', b"[1,]", b"[1 2]", b"[1", b"[1] 2", b'[{"a": }]'],
+)
+def test_invalid_documents(content: bytes):
+    """Should raise ValueError when the data is not a complete array"""
+    parser = JSONArrayStream()
+
+    with pytest.raises(ValueError):
+        parser.feed(content)
+        parser.close()
@@ -0,0 +1,202 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+
+from app.services.flight_events.exceptions import (
+    CircuitOpenError,
+    FlightEventsAPIError,
+)
+from app.services.flight_events.flight_events_api import FlightEventsAPIService
+from app.services.flight_events.resilience import (
+    CircuitBreaker,
+    HedgePolicy,
+    RetryPolicy,
+)
+
+API_URL = "http://test-api.com/flights"
+
+
+@pytest.fixture
+def sample_event() -> dict:
+    return {
+        "flight_number": "AA100",
+        "departure_city": "BUE",
+        "arrival_city": "MAD",
+        "departure_datetime": "2024-09-12T08:00:00",
+        "arrival_datetime": "2024-09-12T20:00:00",
+    }
+
+
+def _service(handler, **kwargs) -> FlightEventsAPIService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return FlightEventsAPIService(api_url=API_URL, client=client, **kwargs)
+
+
+def test_retry_delay_is_jittered_and_bounded():
+    """Should wait a random time below the exponential backoff"""
+    policy = RetryPolicy(retries=5, backoff=1, max_backoff=3)
+
+    with patch("random.uniform", side_effect=lambda low, high: high):
+        assert [policy.delay(attempt) for attempt in range(4)] == [
+            1,
+            2,
+            3,
+            3,
+        ]
+    assert all(0 <= policy.delay(attempt) <= 3 for attempt in range(10))
+
+
+def test_hedge_delay_follows_percentile():
+    """Should only hedge once enough latencies are known"""
+    policy = HedgePolicy(percentile=90, min_samples=10)
+    for latency in range(1, 10):
+        policy.record(latency)
+    assert policy.delay() is None
+
+    policy.record(10)
+    assert policy.delay() == 9
+
+
+def test_circuit_breaker_opens_and_resets():
+    """Should reject calls after consecutive failures until the timeout"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.check()
+
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    with patch("time.monotonic", return_value=10**9):
+        breaker.check()
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_get_retries_server_errors():
+    """Should retry 5xx responses with backoff until one succeeds"""
+    responses = [httpx.Response(503), httpx.Response(502)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0) if responses else httpx.Response(200, json=[])
+
+    service = _service(handler, retry=RetryPolicy(retries=2, backoff=0))
+    feed = await service.fetch_flight_events()
+
+    assert feed.events == []
+    assert service.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_stops_calls():
+    """Should stop calling a failing API and fail fast"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("Connection refused")
+
+    service = _service(
+        handler,
+        retry=RetryPolicy(retries=5, backoff=0),
+        breaker=CircuitBreaker(failure_threshold=3),
+    )
+    with pytest.raises(FlightEventsAPIError) as exc_info:
+        await service.fetch_flight_events()
+    assert "Connection refused" in str(exc_info.value)
+    assert len(calls) == 3
+    assert service.circuit_open
+
+    with pytest.raises(CircuitOpenError):
+        await service.fetch_flight_events()
+    assert len(calls) == 3
+
+
+async def _stream_events(service: FlightEventsAPIService) -> list:
+    return [event async for event in service.stream_flight_events()]
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_server_errors(sample_event: dict):
+    """Should retry a streamed feed until its body starts"""
+    responses = [httpx.Response(503)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if responses:
+            return responses.pop(0)
+        return httpx.Response(200, json=[sample_event])
+
+    service = _service(handler, retry=RetryPolicy(retries=1, backoff=0))
+
+    assert len(await _stream_events(service)) == 1
+    assert service.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_opens_circuit():
+    """Should count streamed feed failures and then fail fast"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("Connection refused")
+
+    service = _service(
+        handler,
+        retry=RetryPolicy(retries=5, backoff=0),
+        breaker=CircuitBreaker(failure_threshold=2),
+    )
+    with pytest.raises(FlightEventsAPIError):
+        await _stream_events(service)
+    assert len(calls) == 2
+    assert service.circuit_open
+
+    with pytest.raises(CircuitOpenError):
+        await _stream_events(service)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_body_failure_not_retried():
+    """Should count a broken body as a failure without retrying it"""
+    calls = []
+
+    async def body():
+        yield b"["
+        raise httpx.ReadError("Connection reset")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, content=body())
+
+    service = _service(handler, retry=RetryPolicy(retries=3, backoff=0))
+    with pytest.raises(FlightEventsAPIError):
+        await _stream_events(service)
+
+    assert len(calls) == 1
+    assert service.breaker.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request():
+    """Should send a duplicate of a slow request and use the first answer"""
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1)
+            return httpx.Response(200, json=[{"slow": True}])
+        return httpx.Response(200, json=[])
+
+    hedge = HedgePolicy(min_samples=1)
+    hedge.record(0.01)
+    service = _service(handler, hedge=hedge)
+
+    feed = await asyncio.wait_for(service.fetch_flight_events(), 0.5)
+
+    assert feed.events == []
+    assert calls == 2